@@ -2,8 +2,13 @@ DATA_POINT_FQN_METADATA_KEY = "_data_point_fqn"
 
 DATA_POINT_HASH_METADATA_KEY = "_data_point_hash"
 
+DATA_SOURCE_FQN_METADATA_KEY = "_data_source_fqn"
+
 DEFAULT_BATCH_SIZE = 100
 
 DEFAULT_BATCH_SIZE_FOR_VECTOR_STORE = 1000
 
 FQN_SEPARATOR = "::"
+
+# Data source fqn of a parent data ingestion run, which ingests all data sources of a collection
+ALL_DATA_SOURCES_FQN = "*"
@@ -1,6 +1,12 @@
 import argparse
 
-from backend.types.core import DataIngestionMode
+from backend.types.core import (
+    ChunkFlushConfig,
+    DataIngestionMode,
+    FanOutIngestionConfig,
+    IngestionPipelineConfig,
+    ParseExecutionConfig,
+)
 
 from backend.types.collection import IngestDataToCollectionDto
 
@@ -61,6 +67,41 @@ def parse_args_ingest_total_collection() -> IngestDataToCollectionDto:
         default="100",
         help="Batch size for processing documents",
     )
+    parser.add_argument(
+        "--pipeline_config",
+        type=str,
+        required=False,
+        default="",
+        help="JSON encoded staged pipeline configuration. If empty, batches are processed one after another",
+    )
+    parser.add_argument(
+        "--parse_execution_config",
+        type=str,
+        required=False,
+        default="",
+        help="JSON encoded parser execution configuration, e.g. to parse files in a pool of worker processes",
+    )
+    parser.add_argument(
+        "--chunk_flush_config",
+        type=str,
+        required=False,
+        default="",
+        help="JSON encoded chunk flushing configuration, to upsert chunks whenever a chunk count or byte budget is reached",
+    )
+    parser.add_argument(
+        "--fan_out_config",
+        type=str,
+        required=False,
+        default="",
+        help="JSON encoded fan out configuration, to ingest all associated data sources concurrently",
+    )
+    parser.add_argument(
+        "--resume_data_ingestion_run_name",
+        type=str,
+        required=False,
+        default="",
+        help="Name of a failed data ingestion run to resume from its checkpoint",
+    )
     args = parser.parse_args()
 
     return IngestDataToCollectionDto(
@@ -70,4 +111,25 @@ def parse_args_ingest_total_collection() -> IngestDataToCollectionDto:
         raise_error_on_failure=args.raise_error_on_failure == "True",
         run_as_job=args.run_as_job == "True",
         batch_size=int(args.batch_size),
+        pipeline_config=(
+            IngestionPipelineConfig.model_validate_json(args.pipeline_config)
+            if args.pipeline_config
+            else None
+        ),
+        chunk_flush_config=(
+            ChunkFlushConfig.model_validate_json(args.chunk_flush_config)
+            if args.chunk_flush_config
+            else None
+        ),
+        parse_execution_config=(
+            ParseExecutionConfig.model_validate_json(args.parse_execution_config)
+            if args.parse_execution_config
+            else ParseExecutionConfig()
+        ),
+        fan_out_config=(
+            FanOutIngestionConfig.model_validate_json(args.fan_out_config)
+            if args.fan_out_config
+            else None
+        ),
+        resume_data_ingestion_run_name=args.resume_data_ingestion_run_name or None,
     )
@@ -0,0 +1,100 @@
+import json
+from typing import List, Optional
+
+from langchain.docstore.document import Document
+from langchain.embeddings.base import Embeddings
+
+from backend.indexer.collections.progress import IngestionRunProgressReporter
+from backend.indexer.collections.types import CollectionDataIngestionConfig
+from backend.logger import logger
+from backend.modules.vector_db.client import VECTOR_STORE_CLIENT
+from backend.types.core import ChunkFlushConfig, DataIngestionMode
+from backend.utils import run_in_executor
+
+
+def get_document_size_bytes(document: Document) -> int:
+    """
+    Approximate in-memory size of a chunk: its text plus its serialized metadata,
+    which dominates for parsers that attach page images
+    """
+    return len(document.page_content.encode("utf-8")) + len(
+        json.dumps(document.metadata, default=str)
+    )
+
+
+class ChunkBuffer:
+    """
+    Buffers the chunks of parsed data points and upserts them to the vector store once
+    the chunk count or byte budget of the flush config is reached. Without a flush
+    config chunks are only upserted on an explicit flush, i.e. once per loader batch.
+
+    Chunks are added one data point at a time and a flush never splits a data point,
+    since an incremental upsert replaces all vectors of the data points it sees. The
+    buffer lives for the whole run and tracks the peak number of bytes it held.
+    """
+
+    def __init__(
+        self,
+        inputs: CollectionDataIngestionConfig,
+        embeddings: Embeddings,
+        config: Optional[ChunkFlushConfig] = None,
+        progress: Optional[IngestionRunProgressReporter] = None,
+    ):
+        self.inputs = inputs
+        self.embeddings = embeddings
+        self.config = config
+        self.progress = progress
+        self.documents: List[Document] = []
+        self.buffered_bytes = 0
+        self.peak_buffered_bytes = 0
+        self.flushed_count = 0
+
+    async def aadd(self, chunks: List[Document]):
+        """
+        Adds all chunks of a data point and flushes if the buffer is over budget
+        """
+        self.documents.extend(chunks)
+        self.buffered_bytes += sum(get_document_size_bytes(chunk) for chunk in chunks)
+        self.peak_buffered_bytes = max(self.peak_buffered_bytes, self.buffered_bytes)
+        if self.config is not None and (
+            len(self.documents) >= self.config.max_chunks
+            or self.buffered_bytes >= self.config.max_bytes
+        ):
+            await self.aflush()
+
+    async def aflush(self):
+        """
+        Upserts all buffered chunks to the vector store
+        """
+        if not self.documents:
+            return
+        logger.info(
+            f"Upserting {len(self.documents)} documents ({self.buffered_bytes} bytes) to vector store"
+        )
+        # Embedding and writing block, keep them off the event loop
+        await run_in_executor(
+            None,
+            VECTOR_STORE_CLIENT.upsert_documents,
+            collection_name=self.inputs.collection_name,
+            documents=self.documents,
+            embeddings=self.embeddings,
+            incremental=(
+                self.inputs.data_ingestion_mode == DataIngestionMode.INCREMENTAL
+            ),
+        )
+        self.flushed_count += len(self.documents)
+        if self.progress is not None:
+            # The vector store embeds the chunks as part of the upsert
+            self.progress.increment(
+                chunks_embedded=len(self.documents),
+                vectors_written=len(self.documents),
+                bytes_written=self.buffered_bytes,
+            )
+        self.clear()
+
+    def clear(self):
+        """
+        Drops all buffered chunks without upserting them
+        """
+        self.documents = []
+        self.buffered_bytes = 0
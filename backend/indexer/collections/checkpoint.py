@@ -0,0 +1,186 @@
+from typing import Dict, Iterator, List, Optional, Set
+
+from backend.indexer.collections.progress import IngestionRunProgressReporter
+from backend.indexer.collections.types import CollectionDataIngestionConfig
+from backend.logger import logger
+from backend.modules.metadata_store.collections.prismastore import CollectionPrismaStore
+from backend.modules.vector_db.client import VECTOR_STORE_CLIENT
+from backend.modules.vector_db.data_point_index import DataPointVectorIndex
+from backend.types.collection import CollectionDataIngestionRunCheckpoint
+from backend.types.core import DataIngestionMode, DataPointVector, LoadedDataPoint
+from backend.utils import run_in_executor
+
+
+class IngestionRunCheckpointer:
+    """
+    Records the data points ingested by a run, batch by batch, so an interrupted run can
+    be resumed without redoing completed work.
+
+    In FULL mode the run is a three-way diff of the loader listing against the vectors
+    already in the collection: unchanged data points (every existing vector carries the
+    current hash) are skipped and keep their vectors, added and changed ones are
+    ingested, and the vectors of removed ones are deleted at the end of the run.
+
+    The outdated vectors of a changed data point are deleted when the data point is
+    committed, rather than all at once at the end of the run. A checkpointed data point
+    therefore never has outdated copies left behind, which lets a resumed run tell them
+    apart from the vectors written by the interrupted attempt.
+
+    The existing vectors are held as a `DataPointVectorIndex`, data points are dropped
+    from it as they are committed.
+    """
+
+    def __init__(
+        self,
+        inputs: CollectionDataIngestionConfig,
+        client: CollectionPrismaStore,
+        existing_data_point_vectors: DataPointVectorIndex,
+        checkpoint: Optional[CollectionDataIngestionRunCheckpoint] = None,
+        progress: Optional[IngestionRunProgressReporter] = None,
+    ):
+        self.inputs = inputs
+        self.client = client
+        self.progress = progress
+        # data point fqn -> hash of everything ingested by this run so far, across
+        # attempts
+        self.completed: Dict[str, str] = (
+            dict(checkpoint.data_point_fqn_to_hash) if checkpoint else {}
+        )
+        # Number of data points yielded by the loader, including the skipped ones
+        self.loader_cursor = 0
+        self.resumed_loader_cursor = checkpoint.loader_cursor if checkpoint else 0
+        # Data points still at the source that are not ingested again: completed by an
+        # earlier attempt, or unchanged since the last run in FULL mode
+        self.skipped: Set[str] = set()
+        self.existing_data_point_fqns: Set[str] = set(existing_data_point_vectors)
+        self.added_count = 0
+        self.changed_count = 0
+        # Vectors still in the collection that the run has not replaced, only tracked in
+        # FULL mode
+        self.outdated_vectors = (
+            existing_data_point_vectors
+            if inputs.data_ingestion_mode == DataIngestionMode.FULL
+            else DataPointVectorIndex()
+        )
+
+    def skip_completed(
+        self, loaded_data_points_batch_iterator: Iterator[List[LoadedDataPoint]]
+    ) -> Iterator[List[LoadedDataPoint]]:
+        """
+        Filters out data points already ingested by an earlier attempt of the run with
+        the same hash and, in FULL mode, data points whose vectors are up to date
+        """
+        if self.completed:
+            logger.info(
+                f"Resuming data ingestion run {self.inputs.data_ingestion_run_name}: "
+                f"{len(self.completed)} data points already ingested, loader was at {self.resumed_loader_cursor}"
+            )
+        # Imported here to avoid a circular import with the indexer module
+        from backend.indexer.collections.indexer import remove_local_files
+
+        # The counters of a resumed run already include the data points its earlier
+        # attempts loaded
+        counted_from = (
+            self.resumed_loader_cursor
+            if self.progress is not None and self.progress.resumed
+            else 0
+        )
+        for loaded_data_points_batch in loaded_data_points_batch_iterator:
+            loaded_count = 0
+            skipped_count = 0
+            pending_data_points = []
+            for loaded_data_point in loaded_data_points_batch:
+                self.loader_cursor += 1
+                counted = self.loader_cursor > counted_from
+                loaded_count += counted
+                data_point_fqn = loaded_data_point.data_point_fqn
+                completed_hash = self.completed.get(data_point_fqn)
+                if (
+                    completed_hash == loaded_data_point.data_point_hash
+                    or self._is_unchanged(loaded_data_point)
+                ):
+                    self.skipped.add(data_point_fqn)
+                    skipped_count += counted
+                    remove_local_files(loaded_data_point)
+                    continue
+                if data_point_fqn in self.existing_data_point_fqns:
+                    self.changed_count += 1
+                else:
+                    self.added_count += 1
+                pending_data_points.append(loaded_data_point)
+            if self.progress is not None:
+                self.progress.increment(
+                    data_points_loaded=loaded_count,
+                    data_points_skipped=skipped_count,
+                )
+            if pending_data_points:
+                yield pending_data_points
+
+    def _is_unchanged(self, loaded_data_point: LoadedDataPoint) -> bool:
+        # A data point with vectors of mixed hashes was only partially rewritten, ingest
+        # it again
+        return self.outdated_vectors.is_unchanged(
+            loaded_data_point.data_point_fqn, loaded_data_point.data_point_hash
+        )
+
+    async def acommit(self, loaded_data_points: List[LoadedDataPoint]):
+        """
+        Marks the data points as ingested. In FULL mode their outdated vectors are
+        deleted first.
+        """
+        if not loaded_data_points:
+            return
+        outdated_vectors: List[DataPointVector] = []
+        for loaded_data_point in loaded_data_points:
+            # With deterministic point ids, vectors carrying the current hash were just
+            # overwritten in place, and the upsert already deleted any stale ones
+            outdated_vectors.extend(
+                self.outdated_vectors.pop(
+                    loaded_data_point.data_point_fqn,
+                    keep_hash=(
+                        loaded_data_point.data_point_hash
+                        if VECTOR_STORE_CLIENT.deterministic_point_ids
+                        else None
+                    ),
+                )
+            )
+        if outdated_vectors:
+            await run_in_executor(
+                None,
+                VECTOR_STORE_CLIENT.delete_data_point_vectors,
+                collection_name=self.inputs.collection_name,
+                data_point_vectors=outdated_vectors,
+            )
+        data_point_fqn_to_hash = {
+            loaded_data_point.data_point_fqn: loaded_data_point.data_point_hash
+            for loaded_data_point in loaded_data_points
+        }
+        await self.client.acreate_data_ingestion_run_checkpoint(
+            collection_name=self.inputs.collection_name,
+            data_ingestion_run_name=self.inputs.data_ingestion_run_name,
+            data_point_fqn_to_hash=data_point_fqn_to_hash,
+            loader_cursor=self.loader_cursor,
+        )
+        self.completed.update(data_point_fqn_to_hash)
+
+    def get_outdated_data_point_vectors(self) -> List[DataPointVector]:
+        """
+        Vectors still to be deleted at the end of a FULL run: data points no longer at
+        the source. Vectors of data points skipped because an earlier attempt ingested
+        them are kept.
+        """
+        return list(
+            self.outdated_vectors.iter_data_point_vectors(
+                self.get_removed_data_point_fqns()
+            )
+        )
+
+    def get_removed_data_point_fqns(self) -> List[str]:
+        """
+        Data points that have vectors in the collection but are no longer at the source
+        """
+        return [
+            data_point_fqn
+            for data_point_fqn in self.outdated_vectors
+            if data_point_fqn not in self.skipped
+        ]
@@ -0,0 +1,348 @@
+"""
+Deletes the orphaned vectors of a collection: vectors of data sources no longer associated with
+it, and superseded copies of data points, left behind by failed or interrupted ingestion runs.
+
+How to run:
+
+python -m backend.indexer.collections.garbage_collection \
+--collection_name creditcard
+
+Add --delete to delete the orphaned vectors, by default they are only reported
+Add --batch_size to set the number of vectors listed and deleted at a time
+Add --max_deletes_per_second to throttle the deletes
+Add --no_compact to skip compacting the collection after deleting
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, Iterable, Iterator, List, Set
+
+from backend.constants import ALL_DATA_SOURCES_FQN
+from backend.logger import logger
+from backend.modules.metadata_store.client import get_client
+from backend.modules.metadata_store.collections.prismastore import CollectionPrismaStore
+from backend.modules.vector_db.client import VECTOR_STORE_CLIENT
+from backend.modules.vector_db.data_point_index import DataPointVectorIndex
+from backend.types.collection import (
+    CollectionDataIngestionRun,
+    CollectionGarbageCollectionReport,
+    GarbageCollectCollectionDto,
+)
+from backend.types.core import Collection, DataIngestionRunStatus, DataPointVector
+from backend.utils import get_data_source_fqn, run_in_executor
+
+# Statuses of data ingestion runs that no longer write to the collection
+FINISHED_DATA_INGESTION_RUN_STATUSES = {
+    DataIngestionRunStatus.COMPLETED,
+    DataIngestionRunStatus.FETCHING_EXISTING_VECTORS_FAILED,
+    DataIngestionRunStatus.DATA_INGESTION_FAILED,
+    DataIngestionRunStatus.DATA_CLEANUP_FAILED,
+    DataIngestionRunStatus.ERROR,
+}
+# Number of unresolved data points listed by fqn in the report
+MAX_REPORTED_DATA_POINT_FQNS = 1000
+
+
+def _batched(
+    data_point_vectors: Iterable[DataPointVector], batch_size: int
+) -> Iterator[List[DataPointVector]]:
+    batch: List[DataPointVector] = []
+    for data_point_vector in data_point_vectors:
+        batch.append(data_point_vector)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _aget_latest_data_ingestion_runs(
+    client: CollectionPrismaStore, collection_name: str
+) -> Dict[str, CollectionDataIngestionRun]:
+    """
+    Latest data ingestion run of each data source fqn, including ALL_DATA_SOURCES_FQN
+    """
+    latest_runs: Dict[str, CollectionDataIngestionRun] = {}
+    # Most recent first
+    for data_ingestion_run in await client.aget_data_ingestion_runs(
+        collection_name=collection_name
+    ):
+        latest_runs.setdefault(data_ingestion_run.data_source_fqn, data_ingestion_run)
+    return latest_runs
+
+
+async def _aget_latest_data_point_hashes(
+    client: CollectionPrismaStore,
+    collection: Collection,
+    latest_runs: Dict[str, CollectionDataIngestionRun],
+    report: CollectionGarbageCollectionReport,
+) -> Dict[str, str]:
+    """
+    Latest hash of the data points written by the last run of each associated data source, if
+    that run was interrupted: it is the last writer of those data points and its checkpoint
+    records their hashes. Checkpoints of completed runs are deleted, their data points are
+    not partially rewritten. Data sources with a run in progress are added to the report as
+    skipped and left out.
+    """
+    fan_out_run = latest_runs.get(ALL_DATA_SOURCES_FQN)
+    fan_out_in_progress = (
+        fan_out_run is not None
+        and fan_out_run.status not in FINISHED_DATA_INGESTION_RUN_STATUSES
+    )
+    data_point_fqn_to_hash: Dict[str, str] = {}
+    for data_source_fqn in collection.associated_data_sources:
+        data_ingestion_run = latest_runs.get(data_source_fqn)
+        if fan_out_in_progress or (
+            data_ingestion_run is not None
+            and data_ingestion_run.status not in FINISHED_DATA_INGESTION_RUN_STATUSES
+        ):
+            report.skipped_data_source_fqns.append(data_source_fqn)
+            continue
+        if (
+            data_ingestion_run is None
+            or data_ingestion_run.status == DataIngestionRunStatus.COMPLETED
+        ):
+            continue
+        checkpoint = await client.aget_data_ingestion_run_checkpoint(
+            data_ingestion_run_name=data_ingestion_run.name
+        )
+        data_point_fqn_to_hash.update(checkpoint.data_point_fqn_to_hash)
+    return data_point_fqn_to_hash
+
+
+async def _adelete_data_point_vectors(
+    inputs: GarbageCollectCollectionDto,
+    data_point_vectors: Iterable[DataPointVector],
+    report: CollectionGarbageCollectionReport,
+):
+    """
+    Deletes the vectors batch by batch, at most `max_deletes_per_second` on average
+    """
+    started_at = time.monotonic()
+    deleted_count = 0
+    for batch in _batched(data_point_vectors, inputs.batch_size):
+        await run_in_executor(
+            None,
+            VECTOR_STORE_CLIENT.delete_data_point_vectors,
+            collection_name=inputs.collection_name,
+            data_point_vectors=batch,
+            batch_size=inputs.batch_size,
+        )
+        deleted_count += len(batch)
+        report.deleted_vector_count += len(batch)
+        logger.info(
+            f"Garbage collection of {inputs.collection_name}: deleted {report.deleted_vector_count} vectors"
+        )
+        if inputs.max_deletes_per_second:
+            delay = (
+                started_at
+                + deleted_count / inputs.max_deletes_per_second
+                - time.monotonic()
+            )
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+
+async def garbage_collect_collection(
+    inputs: GarbageCollectCollectionDto,
+    collection: Collection,
+    client: CollectionPrismaStore,
+) -> CollectionGarbageCollectionReport:
+    """
+    Cross checks the data points of all vectors in the collection against the data sources
+    associated with it and the latest hashes of their data points, and deletes the orphans
+    unless it is a dry run:
+    - vectors of data sources no longer associated with the collection
+    - vectors of a data point carrying another hash than its latest one, next to vectors
+      with the latest hash
+
+    Vectors without data point metadata are not managed by ingestion and are left as they are.
+
+    Args:
+        inputs (GarbageCollectCollectionDto): Garbage collection configuration
+        collection (Collection): Collection to garbage collect
+        client (CollectionPrismaStore): Metadata store holding its data ingestion runs
+
+    Returns:
+        CollectionGarbageCollectionReport: Orphaned vectors found, and deleted unless it was a dry run
+    """
+    started_at = time.time()
+    report = CollectionGarbageCollectionReport(
+        collection_name=inputs.collection_name, dry_run=inputs.dry_run
+    )
+    latest_runs = await _aget_latest_data_ingestion_runs(
+        client=client, collection_name=inputs.collection_name
+    )
+    latest_data_point_hashes = await _aget_latest_data_point_hashes(
+        client=client, collection=collection, latest_runs=latest_runs, report=report
+    )
+    index: DataPointVectorIndex = await run_in_executor(
+        None,
+        VECTOR_STORE_CLIENT.get_data_point_vector_index,
+        collection_name=inputs.collection_name,
+        data_source_fqn=None,
+        batch_size=inputs.batch_size,
+    )
+    report.vector_count = index.vector_count
+    report.data_point_count = len(index)
+    # A run started while the vectors were listed may have rewritten data points only partially,
+    # their vectors with the new hash must not be taken for superseded ones
+    runs_started = {
+        data_source_fqn
+        for data_source_fqn, data_ingestion_run in (
+            await _aget_latest_data_ingestion_runs(
+                client=client, collection_name=inputs.collection_name
+            )
+        ).items()
+        if latest_runs.get(data_source_fqn) is None
+        or latest_runs[data_source_fqn].name != data_ingestion_run.name
+    }
+    for data_source_fqn in collection.associated_data_sources:
+        if (
+            data_source_fqn in runs_started or ALL_DATA_SOURCES_FQN in runs_started
+        ) and data_source_fqn not in report.skipped_data_source_fqns:
+            report.skipped_data_source_fqns.append(data_source_fqn)
+
+    # A data source associated while the vectors were listed may already have fresh vectors,
+    # they must not be taken for orphans
+    current_collection = await client.aget_collection_by_name(inputs.collection_name)
+    associated_data_source_fqns: Set[str] = set(collection.associated_data_sources)
+    if current_collection is not None:
+        associated_data_source_fqns.update(current_collection.associated_data_sources)
+    skipped_data_source_fqns: Set[str] = set(report.skipped_data_source_fqns)
+    unassociated_data_point_fqns: List[str] = []
+    # data point fqn -> latest hash, for the data points with superseded vectors
+    superseded_data_points: Dict[str, str] = {}
+    for data_point_fqn in index:
+        data_source_fqn = get_data_source_fqn(data_point_fqn)
+        if data_source_fqn not in associated_data_source_fqns:
+            unassociated_data_point_fqns.append(data_point_fqn)
+            continue
+        hashes = index.get_hashes(data_point_fqn)
+        if len(hashes) < 2 or data_source_fqn in skipped_data_source_fqns:
+            continue
+        latest_hash = latest_data_point_hashes.get(data_point_fqn)
+        if latest_hash in hashes:
+            superseded_data_points[data_point_fqn] = latest_hash
+        else:
+            report.unresolved_data_point_count += 1
+            if len(report.unresolved_data_point_fqns) < MAX_REPORTED_DATA_POINT_FQNS:
+                report.unresolved_data_point_fqns.append(data_point_fqn)
+
+    for data_point_fqn in unassociated_data_point_fqns:
+        data_source_fqn = get_data_source_fqn(data_point_fqn)
+        vector_count = index.get_vector_count(data_point_fqn)
+        unassociated_vector_counts = report.unassociated_vector_counts
+        unassociated_vector_counts[data_source_fqn] = (
+            unassociated_vector_counts.get(data_source_fqn, 0) + vector_count
+        )
+    superseded_vectors: List[DataPointVector] = []
+    for data_point_fqn, latest_hash in superseded_data_points.items():
+        superseded_vectors.extend(index.pop(data_point_fqn, keep_hash=latest_hash))
+    report.superseded_data_point_count = len(superseded_data_points)
+    report.superseded_vector_count = len(superseded_vectors)
+    logger.info(
+        f"Garbage collection of {inputs.collection_name}: "
+        f"{sum(report.unassociated_vector_counts.values())} vectors of "
+        f"{len(report.unassociated_vector_counts)} unassociated data sources, "
+        f"{report.superseded_vector_count} superseded vectors of {report.superseded_data_point_count} data points, "
+        f"{report.unresolved_data_point_count} unresolved data points"
+    )
+
+    if not inputs.dry_run:
+        await _adelete_data_point_vectors(
+            inputs=inputs,
+            data_point_vectors=index.iter_data_point_vectors(
+                unassociated_data_point_fqns
+            ),
+            report=report,
+        )
+        await _adelete_data_point_vectors(
+            inputs=inputs, data_point_vectors=superseded_vectors, report=report
+        )
+        if inputs.compact and report.deleted_vector_count:
+            await run_in_executor(
+                None,
+                VECTOR_STORE_CLIENT.compact_collection,
+                collection_name=inputs.collection_name,
+            )
+            report.compacted = True
+    report.duration_seconds = time.time() - started_at
+    return report
+
+
+async def run_garbage_collection(
+    inputs: GarbageCollectCollectionDto,
+) -> CollectionGarbageCollectionReport:
+    """
+    Garbage collects the collection as an ingestion job or from the command line
+
+    Args:
+        inputs (GarbageCollectCollectionDto): Garbage collection configuration
+
+    Returns:
+        CollectionGarbageCollectionReport: Orphaned vectors found, and deleted unless it was a dry run
+    """
+    client = CollectionPrismaStore(await get_client())
+    collection = await client.aget_collection_by_name(inputs.collection_name)
+    if collection is None:
+        raise ValueError(f"Collection {inputs.collection_name} does not exist")
+    report = await garbage_collect_collection(
+        inputs=inputs, collection=collection, client=client
+    )
+    logger.info(
+        f"Garbage collection of {inputs.collection_name} done: {report.model_dump_json()}"
+    )
+    return report
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Report, and optionally delete, the orphaned vectors of a collection"
+    )
+    parser.add_argument(
+        "--collection_name", type=str, help="Collection name", required=True
+    )
+    parser.add_argument(
+        "--delete",
+        help="Delete the orphaned vectors instead of only reporting them",
+        required=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        help="Number of vectors listed and deleted at a time",
+        required=False,
+        default=1000,
+    )
+    parser.add_argument(
+        "--max_deletes_per_second",
+        type=float,
+        help="Maximum number of vectors deleted per second",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--no_compact",
+        help="Do not compact the collection after deleting",
+        required=False,
+        action="store_true",
+    )
+    args = parser.parse_args()
+
+    report = await run_garbage_collection(
+        GarbageCollectCollectionDto(
+            collection_name=args.collection_name,
+            dry_run=not args.delete,
+            batch_size=args.batch_size,
+            max_deletes_per_second=args.max_deletes_per_second,
+            compact=not args.no_compact,
+        )
+    )
+    print(report.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
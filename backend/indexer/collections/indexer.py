@@ -1,37 +1,75 @@
+import asyncio
+import multiprocessing as mp
 import os
 import tempfile
 from concurrent.futures import Executor
-from typing import Dict, List, Optional
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Union
 
 from fastapi import HTTPException
 from fastapi.responses import JSONResponse
+from langchain.docstore.document import Document
+from langchain.embeddings.base import Embeddings
+from pydantic import BaseModel
 from truefoundry.deploy import trigger_job
 
-from backend.constants import DATA_POINT_FQN_METADATA_KEY, DATA_POINT_HASH_METADATA_KEY
-from backend.indexer.collections.types import CollectionDataIngestionConfig
+from backend.constants import (
+    ALL_DATA_SOURCES_FQN,
+    DATA_POINT_FQN_METADATA_KEY,
+    DATA_POINT_HASH_METADATA_KEY,
+    DATA_SOURCE_FQN_METADATA_KEY,
+)
+from backend.indexer.collections.buffer import ChunkBuffer
+from backend.indexer.collections.checkpoint import IngestionRunCheckpointer
+from backend.indexer.collections.pipeline import CollectionIngestionPipeline
+from backend.indexer.collections.progress import IngestionRunProgressReporter
+from backend.indexer.collections.scheduler import IngestionJobScheduler
+from backend.indexer.collections.types import (
+    CollectionDataIngestionConfig,
+    CollectionFanOutIngestionConfig,
+)
 from backend.logger import logger
 from backend.modules.dataloaders.loader import get_loader_for_data_source
 from backend.modules.metadata_store.client import get_client
 from backend.modules.metadata_store.collections.prismastore import CollectionPrismaStore
-
+from backend.modules.model_gateway.embedding_budget import (
+    BudgetedEmbeddings,
+    EmbeddingBudget,
+)
 from backend.modules.model_gateway.model_gateway import model_gateway
 from backend.modules.parsers.parser import get_parser_for_extension
 from backend.modules.vector_db.client import VECTOR_STORE_CLIENT
-from backend.indexer.indexer import get_data_point_fqn_to_hash_map
 from backend.settings import settings
+from backend.types.collection import (
+    CollectionDataIngestionRun,
+    CreateCollectionDataIngestionRun,
+    IngestDataToCollectionDto,
+)
 from backend.types.core import (
+    AssociatedDataSources,
+    Collection,
     DataIngestionMode,
     DataIngestionRunStatus,
+    FanOutIngestionConfig,
+    IngestionJob,
     LoadedDataPoint,
+    ParseExecutionMode,
 )
-from backend.types.core import Collection
-from backend.types.collection import (
-    CreateCollectionDataIngestionRun,
-    IngestDataToCollectionDto,
-)
+from backend.utils import AsyncProcessPoolExecutor, run_in_executor
+
+# Runs in these states can be resumed from their checkpoint
+RESUMABLE_DATA_INGESTION_RUN_STATUSES = [
+    DataIngestionRunStatus.FETCHING_EXISTING_VECTORS_FAILED,
+    DataIngestionRunStatus.DATA_INGESTION_FAILED,
+    DataIngestionRunStatus.DATA_CLEANUP_FAILED,
+    DataIngestionRunStatus.ERROR,
+]
 
 
-async def sync_data_source_to_collection(inputs: CollectionDataIngestionConfig):
+async def sync_data_source_to_collection(
+    inputs: CollectionDataIngestionConfig,
+    embedding_budget: Optional[EmbeddingBudget] = None,
+):
     """
     Synchronizes the data source to the collection by performing the following steps:
     1. Updates the data ingestion run status to indicate that existing vectors are being fetched.
@@ -39,12 +77,20 @@ async def sync_data_source_to_collection(inputs: CollectionDataIngestionConfig):
     3. Logs the total number of existing data point vectors in the collection.
     4. Updates the data ingestion run status to indicate that data ingestion has started.
     5. Calls the _sync_data_source_to_collection function to perform the actual data ingestion.
+       Every ingested batch is checkpointed, so a failed run can be resumed where it stopped.
+       In FULL mode, data points whose vectors are up to date are skipped and keep their vectors.
     6. Updates the data ingestion run status to indicate the completion of data ingestion.
-    7. If the data ingestion mode is set to FULL, deletes the outdated data point vectors from the vector store.
-    8. Updates the data ingestion run status to indicate the completion of data cleanup.
+    7. If the data ingestion mode is set to FULL, deletes the vectors of data points removed from the source.
+    8. Updates the data ingestion run status to indicate the completion of data cleanup
+       and deletes the checkpoint of the run.
+
+    Progress counters and intermediate status changes are written to the run about once per second,
+    in a single update; failed and final statuses are written right away. A resumed run carries on
+    from the counters of its earlier attempts.
 
     Args:
         inputs (CollectionDataIngestionConfig): The configuration for data ingestion.
+        embedding_budget (Optional[EmbeddingBudget]): Embedding request budget shared with other runs, if any.
 
     Raises:
         Exception: If any error occurs during data ingestion or cleanup.
@@ -54,66 +100,226 @@ async def sync_data_source_to_collection(inputs: CollectionDataIngestionConfig):
     """
     client = await get_client()
     client = CollectionPrismaStore(client)
-    await client.aupdate_data_ingestion_run_status(
+    resumed_progress = None
+    if inputs.resume_from_checkpoint:
+        data_ingestion_run = await client.aget_data_ingestion_run(
+            data_ingestion_run_name=inputs.data_ingestion_run_name, no_cache=True
+        )
+        if data_ingestion_run is not None:
+            resumed_progress = data_ingestion_run.progress
+    async with IngestionRunProgressReporter(
+        client=client,
         data_ingestion_run_name=inputs.data_ingestion_run_name,
-        status=DataIngestionRunStatus.FETCHING_EXISTING_VECTORS,
+        progress=resumed_progress,
+    ) as progress:
+        await _sync_data_source_to_collection_with_progress(
+            inputs=inputs,
+            client=client,
+            progress=progress,
+            embedding_budget=embedding_budget,
+        )
+    await client.adelete_data_ingestion_run_checkpoint(
+        data_ingestion_run_name=inputs.data_ingestion_run_name
     )
+
+
+async def _sync_data_source_to_collection_with_progress(
+    inputs: CollectionDataIngestionConfig,
+    client: CollectionPrismaStore,
+    progress: IngestionRunProgressReporter,
+    embedding_budget: Optional[EmbeddingBudget] = None,
+):
+    # Intermediate statuses are written together with the progress counters,
+    # failed and final ones right away
+    await progress.aset_status(DataIngestionRunStatus.FETCHING_EXISTING_VECTORS)
     try:
-        existing_data_point_vectors = VECTOR_STORE_CLIENT.list_data_point_vectors(
+        existing_data_point_vectors = await run_in_executor(
+            None,
+            VECTOR_STORE_CLIENT.get_data_point_vector_index,
             collection_name=inputs.collection_name,
             data_source_fqn=inputs.data_source.fqn,
         )
-        previous_snapshot = get_data_point_fqn_to_hash_map(
-            data_point_vectors=existing_data_point_vectors
-        )
+        previous_snapshot = existing_data_point_vectors.get_data_point_fqn_to_hash_map()
 
         logger.info(
-            f"Total existing data point vectors in collection {inputs.collection_name}: {len(existing_data_point_vectors)}"
+            f"Total existing data point vectors in collection {inputs.collection_name}: "
+            f"{existing_data_point_vectors.vector_count} of {len(existing_data_point_vectors)} data points"
+        )
+        checkpointer = IngestionRunCheckpointer(
+            inputs=inputs,
+            client=client,
+            existing_data_point_vectors=existing_data_point_vectors,
+            checkpoint=(
+                await client.aget_data_ingestion_run_checkpoint(
+                    data_ingestion_run_name=inputs.data_ingestion_run_name
+                )
+                if inputs.resume_from_checkpoint
+                else None
+            ),
+            progress=progress,
         )
     except Exception as e:
         logger.exception(e)
-        await client.aupdate_data_ingestion_run_status(
-            data_ingestion_run_name=inputs.data_ingestion_run_name,
-            status=DataIngestionRunStatus.FETCHING_EXISTING_VECTORS_FAILED,
+        await progress.aset_status(
+            DataIngestionRunStatus.FETCHING_EXISTING_VECTORS_FAILED
         )
         raise e
 
-    await client.aupdate_data_ingestion_run_status(
-        data_ingestion_run_name=inputs.data_ingestion_run_name,
-        status=DataIngestionRunStatus.DATA_INGESTION_STARTED,
-    )
+    await progress.aset_status(DataIngestionRunStatus.DATA_INGESTION_STARTED)
     try:
         await _sync_data_source_to_collection(
             inputs=inputs,
             previous_snapshot=previous_snapshot,
+            checkpointer=checkpointer,
+            embedding_budget=embedding_budget,
+            progress=progress,
+        )
+        # Backends that defer index maintenance during bulk writes build it once per run
+        await run_in_executor(
+            None,
+            VECTOR_STORE_CLIENT.flush_collection,
+            collection_name=inputs.collection_name,
         )
     except Exception as e:
         logger.exception(e)
-        await client.aupdate_data_ingestion_run_status(
-            data_ingestion_run_name=inputs.data_ingestion_run_name,
-            status=DataIngestionRunStatus.DATA_INGESTION_FAILED,
-        )
+        await progress.aset_status(DataIngestionRunStatus.DATA_INGESTION_FAILED)
         raise e
+    await progress.aset_status(DataIngestionRunStatus.DATA_INGESTION_COMPLETED)
+    logger.info(
+        f"Data ingestion run {inputs.data_ingestion_run_name}: added={checkpointer.added_count}, "
+        f"changed={checkpointer.changed_count}, skipped={len(checkpointer.skipped)}"
+    )
+    # Delete the vectors of data points removed from the source
+    if inputs.data_ingestion_mode == DataIngestionMode.FULL:
+        await progress.aset_status(DataIngestionRunStatus.DATA_CLEANUP_STARTED)
+        try:
+            # Outdated vectors of changed data points were deleted as they were checkpointed
+            logger.info(
+                f"Deleting vectors of {len(checkpointer.get_removed_data_point_fqns())} data points removed from the source"
+            )
+            await run_in_executor(
+                None,
+                VECTOR_STORE_CLIENT.delete_data_point_vectors,
+                collection_name=inputs.collection_name,
+                data_point_vectors=checkpointer.get_outdated_data_point_vectors(),
+            )
+        except Exception as e:
+            logger.exception(e)
+            await progress.aset_status(DataIngestionRunStatus.DATA_CLEANUP_FAILED)
+            raise e
+    await progress.aset_status(DataIngestionRunStatus.COMPLETED)
+
+
+async def sync_data_sources_to_collection(inputs: CollectionFanOutIngestionConfig):
+    """
+    Ingests several data sources of a collection concurrently, each in its own child run.
+    At most `max_parallel_sources` data sources are ingested at a time and all of them share
+    one embedding request budget. The parent run completes once every child run has completed,
+    and ends in ERROR if any of them failed.
+
+    With `shadow_reindex`, the data sources are ingested into a new shadow collection that
+    replaces the collection once all of them are ingested. A failed run leaves the collection
+    untouched and keeps the shadow collection, so resuming the run continues filling it.
+
+    Args:
+        inputs (CollectionFanOutIngestionConfig): The configuration of the parent and child runs.
+
+    Raises:
+        Exception: If any of the data sources failed to ingest.
+
+    Returns:
+        None
+    """
+    client = await get_client()
+    client = CollectionPrismaStore(client)
     await client.aupdate_data_ingestion_run_status(
         data_ingestion_run_name=inputs.data_ingestion_run_name,
-        status=DataIngestionRunStatus.DATA_INGESTION_COMPLETED,
+        status=DataIngestionRunStatus.DATA_INGESTION_STARTED,
     )
-    # Delete the outdated data point vectors from the vector store
-    if inputs.data_ingestion_mode == DataIngestionMode.FULL:
+    parallel_sources = asyncio.Semaphore(inputs.fan_out_config.max_parallel_sources)
+    embedding_budget = EmbeddingBudget(
+        max_concurrent_requests=inputs.fan_out_config.max_concurrent_embedding_requests
+    )
+    shadow_collection_name = None
+    if inputs.fan_out_config.shadow_reindex:
+        try:
+            shadow_collection_name = await _create_shadow_collection(inputs)
+        except Exception as e:
+            logger.exception(e)
+            await client.aupdate_data_ingestion_run_status(
+                data_ingestion_run_name=inputs.data_ingestion_run_name,
+                status=DataIngestionRunStatus.ERROR,
+            )
+            raise e
+
+    async def _sync_child(child_inputs: CollectionDataIngestionConfig):
+        if shadow_collection_name is not None:
+            child_inputs = child_inputs.model_copy(
+                update={"collection_name": shadow_collection_name}
+            )
+        if inputs.resume_from_checkpoint:
+            child_data_ingestion_run = await client.aget_data_ingestion_run(
+                data_ingestion_run_name=child_inputs.data_ingestion_run_name,
+                no_cache=True,
+            )
+            if child_data_ingestion_run.status == DataIngestionRunStatus.COMPLETED:
+                logger.info(
+                    f"Skipping completed data ingestion run {child_inputs.data_ingestion_run_name}"
+                )
+                return
+            child_inputs = child_inputs.model_copy(
+                update={"resume_from_checkpoint": True}
+            )
+        async with parallel_sources:
+            await sync_data_source_to_collection(
+                child_inputs, embedding_budget=embedding_budget
+            )
+
+    results = await asyncio.gather(
+        *(
+            _sync_child(child_inputs)
+            for child_inputs in inputs.data_source_ingestion_configs
+        ),
+        return_exceptions=True,
+    )
+    failed_data_ingestion_run_names = [
+        child_inputs.data_ingestion_run_name
+        for child_inputs, result in zip(inputs.data_source_ingestion_configs, results)
+        if isinstance(result, BaseException)
+    ]
+    if failed_data_ingestion_run_names:
+        logger.error(
+            f"Failed data ingestion runs of {inputs.data_ingestion_run_name}: {failed_data_ingestion_run_names}"
+        )
+        await client.alog_errors_for_data_ingestion_run(
+            data_ingestion_run_name=inputs.data_ingestion_run_name,
+            errors={"failed_data_ingestion_runs": failed_data_ingestion_run_names},
+        )
         await client.aupdate_data_ingestion_run_status(
             data_ingestion_run_name=inputs.data_ingestion_run_name,
-            status=DataIngestionRunStatus.DATA_CLEANUP_STARTED,
+            status=DataIngestionRunStatus.ERROR,
         )
+        raise Exception(
+            f"Failed to ingest {len(failed_data_ingestion_run_names)} of {len(results)} data sources"
+        )
+    if shadow_collection_name is not None:
         try:
-            VECTOR_STORE_CLIENT.delete_data_point_vectors(
+            await run_in_executor(
+                None,
+                VECTOR_STORE_CLIENT.swap_shadow_collection,
                 collection_name=inputs.collection_name,
-                data_point_vectors=existing_data_point_vectors,
+                shadow_collection_name=shadow_collection_name,
+                expected_point_count=await _get_written_vector_count(client, inputs),
             )
         except Exception as e:
             logger.exception(e)
+            await client.alog_errors_for_data_ingestion_run(
+                data_ingestion_run_name=inputs.data_ingestion_run_name,
+                errors={"shadow_collection_swap": str(e)},
+            )
             await client.aupdate_data_ingestion_run_status(
                 data_ingestion_run_name=inputs.data_ingestion_run_name,
-                status=DataIngestionRunStatus.DATA_CLEANUP_FAILED,
+                status=DataIngestionRunStatus.ERROR,
             )
             raise e
     await client.aupdate_data_ingestion_run_status(
@@ -122,8 +328,69 @@ async def sync_data_source_to_collection(inputs: CollectionDataIngestionConfig):
     )
 
 
+async def _get_written_vector_count(
+    client: CollectionPrismaStore, inputs: CollectionFanOutIngestionConfig
+) -> Optional[int]:
+    """
+    Number of vectors the child runs wrote, which a shadow collection must hold before it is
+    swapped in. None for a resumed run: data points an interrupted attempt wrote but did not
+    checkpoint are written again, so the count no longer matches the collection.
+    """
+    if inputs.resume_from_checkpoint:
+        return None
+    child_data_ingestion_runs = await client.aget_child_data_ingestion_runs(
+        parent_data_ingestion_run_name=inputs.data_ingestion_run_name
+    )
+    return sum(
+        child_data_ingestion_run.progress.vectors_written
+        if child_data_ingestion_run.progress is not None
+        else 0
+        for child_data_ingestion_run in child_data_ingestion_runs
+    )
+
+
+async def _create_shadow_collection(inputs: CollectionFanOutIngestionConfig) -> str:
+    """
+    Creates the shadow collection a re-index of the collection is ingested into, named after
+    the parent run so that resuming the run reuses it
+    """
+    embedder_config = inputs.data_source_ingestion_configs[0].embedder_config
+    shadow_collection_name = await run_in_executor(
+        None,
+        VECTOR_STORE_CLIENT.create_shadow_collection,
+        collection_name=inputs.collection_name,
+        shadow_id=inputs.data_ingestion_run_name,
+        embeddings=model_gateway.get_embedder_from_model_config(
+            model_name=embedder_config.name
+        ),
+        vector_index_config=embedder_config.vector_index_config,
+    )
+    logger.info(
+        f"Re-indexing collection {inputs.collection_name} into shadow collection {shadow_collection_name}"
+    )
+    return shadow_collection_name
+
+
+async def run_ingestion(
+    ingestion_config: Union[
+        CollectionDataIngestionConfig, CollectionFanOutIngestionConfig
+    ]
+):
+    """
+    Runs a single data source ingestion or a concurrent ingestion of several data sources
+    """
+    if isinstance(ingestion_config, CollectionFanOutIngestionConfig):
+        await sync_data_sources_to_collection(ingestion_config)
+    else:
+        await sync_data_source_to_collection(ingestion_config)
+
+
 async def _sync_data_source_to_collection(
-    inputs: CollectionDataIngestionConfig, previous_snapshot: Dict[str, str] = None
+    inputs: CollectionDataIngestionConfig,
+    previous_snapshot: Dict[str, str] = None,
+    checkpointer: Optional[IngestionRunCheckpointer] = None,
+    embedding_budget: Optional[EmbeddingBudget] = None,
+    progress: Optional[IngestionRunProgressReporter] = None,
 ):
     """
     Synchronizes data from a data source to a collection.
@@ -131,6 +398,9 @@ async def _sync_data_source_to_collection(
     Args:
         inputs (CollectionDataIngestionConfig): The configuration for data ingestion.
         previous_snapshot (Dict[str, str], optional): A dictionary mapping data point FQNs to their hashes. Defaults to None.
+        checkpointer (Optional[IngestionRunCheckpointer]): Records ingested batches and skips the ones an earlier attempt completed.
+        embedding_budget (Optional[EmbeddingBudget]): Embedding request budget shared with other runs, if any.
+        progress (Optional[IngestionRunProgressReporter]): Live progress of the run, if reported.
 
     Raises:
         Exception: If failed to ingest any data points.
@@ -145,7 +415,9 @@ async def _sync_data_source_to_collection(
     failed_data_point_fqns = []
     documents_ingested_count = 0
     # Create a temp dir to store the data
-    with tempfile.TemporaryDirectory() as tmp_dirname:
+    with tempfile.TemporaryDirectory() as tmp_dirname, _get_parse_pool(
+        inputs
+    ) as parse_pool:
         # Load the data from the source to the dest dir
         logger.info("Loading data from data source")
         data_source_loader = get_loader_for_data_source(inputs.data_source.type)
@@ -156,24 +428,69 @@ async def _sync_data_source_to_collection(
             batch_size=inputs.batch_size,
             data_ingestion_mode=inputs.data_ingestion_mode,
         )
+        if checkpointer is not None:
+            loaded_data_points_batch_iterator = checkpointer.skip_completed(
+                loaded_data_points_batch_iterator
+            )
 
-        for loaded_data_points_batch in loaded_data_points_batch_iterator:
-            try:
-                await ingest_data_points(
-                    inputs=inputs,
-                    loaded_data_points=loaded_data_points_batch,
-                    documents_ingested_count=documents_ingested_count,
-                )
-                documents_ingested_count = documents_ingested_count + len(
-                    loaded_data_points_batch
-                )
-            except Exception as e:
-                logger.exception(e)
-                if inputs.raise_error_on_failure:
-                    raise e
-                failed_data_point_fqns.extend(
-                    [doc.data_point_fqn for doc in loaded_data_points_batch]
-                )
+        if inputs.pipeline_config is not None:
+            logger.info(f"Running staged ingestion pipeline: {inputs.pipeline_config}")
+            failed_data_point_fqns = await CollectionIngestionPipeline(
+                inputs=inputs,
+                embeddings=_get_embeddings(inputs, embedding_budget=embedding_budget),
+                parse_pool=parse_pool,
+                checkpointer=checkpointer,
+                progress=progress,
+            ).run(loaded_data_points_batch_iterator)
+        else:
+            chunk_buffer = ChunkBuffer(
+                inputs=inputs,
+                embeddings=_get_embeddings(inputs, embedding_budget=embedding_budget),
+                config=inputs.chunk_flush_config,
+                progress=progress,
+            )
+            for loaded_data_points_batch in loaded_data_points_batch_iterator:
+                try:
+                    timed_out_data_point_fqns = set(
+                        await ingest_data_points(
+                            inputs=inputs,
+                            loaded_data_points=loaded_data_points_batch,
+                            documents_ingested_count=documents_ingested_count,
+                            parse_pool=parse_pool,
+                            chunk_buffer=chunk_buffer,
+                            progress=progress,
+                        )
+                    )
+                    failed_data_point_fqns.extend(timed_out_data_point_fqns)
+                    if checkpointer is not None:
+                        await checkpointer.acommit(
+                            [
+                                loaded_data_point
+                                for loaded_data_point in loaded_data_points_batch
+                                if loaded_data_point.data_point_fqn
+                                not in timed_out_data_point_fqns
+                            ]
+                        )
+                    documents_ingested_count = documents_ingested_count + len(
+                        loaded_data_points_batch
+                    )
+                except Exception as e:
+                    logger.exception(e)
+                    if inputs.raise_error_on_failure:
+                        raise e
+                    # Do not write the leftovers of a failed batch with the next one
+                    chunk_buffer.clear()
+                    failed_data_point_fqns.extend(
+                        [doc.data_point_fqn for doc in loaded_data_points_batch]
+                    )
+                    if progress is not None:
+                        progress.increment(
+                            data_points_failed=len(loaded_data_points_batch)
+                        )
+            logger.info(
+                f"Data ingestion run {inputs.data_ingestion_run_name}: upserted {chunk_buffer.flushed_count} documents, "
+                f"peak buffered bytes: {chunk_buffer.peak_buffered_bytes}"
+            )
 
         if len(failed_data_point_fqns) > 0:
             logger.error(
@@ -189,37 +506,34 @@ async def _sync_data_source_to_collection(
             )
 
 
-async def ingest_data_points(
+def _get_embeddings(
     inputs: CollectionDataIngestionConfig,
-    loaded_data_points: List[LoadedDataPoint],
-    documents_ingested_count: int,
-):
+    embedding_budget: Optional[EmbeddingBudget] = None,
+) -> Embeddings:
+    embeddings = model_gateway.get_embedder_from_model_config(
+        model_name=inputs.embedder_config.name
+    )
+    if embedding_budget is not None:
+        embeddings = BudgetedEmbeddings(embeddings=embeddings, budget=embedding_budget)
+    return embeddings
+
+
+async def parse_loaded_data_point(
+    inputs: CollectionDataIngestionConfig,
+    loaded_data_point: LoadedDataPoint,
+) -> List[Document]:
     """
-    Ingests data points into the vector store for a given batch.
+    Parses a single loaded data point into chunks and tags every chunk with the data point fqn and hash.
+    The local files of the data point are deleted once parsing is done.
 
     Args:
         inputs (CollectionDataIngestionConfig): The configuration for data ingestion.
-        loaded_data_points (List[LoadedDataPoint]): The list of loaded data points to be ingested.
-        documents_ingested_count (int): The count of documents already ingested.
+        loaded_data_point (LoadedDataPoint): The loaded data point to be parsed.
 
     Returns:
-        None: If no documents are found to index in the given batch.
-
-    Raises:
-        None
-
+        List[Document]: The chunks of the data point. Empty if no parser is found for the file extension.
     """
-    embeddings = model_gateway.get_embedder_from_model_config(
-        model_name=inputs.embedder_config.name
-    )
-    documents_to_be_upserted = []
-    logger.info(
-        f"Processing {len(loaded_data_points)} new documents and completed: {documents_ingested_count}"
-    )
-    for index, loaded_data_point in enumerate(loaded_data_points):
-        logger.info(
-            f"[{index+1}/{len(loaded_data_points)}/{documents_ingested_count}] Parsing [{index+1}/{len(loaded_data_points)}] new document"
-        )
+    try:
         # Get parser for required file extension
         parser = get_parser_for_extension(
             file_extension=loaded_data_point.file_extension,
@@ -229,7 +543,7 @@ async def ingest_data_points(
             logger.warning(
                 f"Could not parse data point {loaded_data_point.data_point_fqn} as no parser found for file extension: {loaded_data_point.file_extension}"
             )
-            continue
+            return []
         # chunk the given document
         chunks = await parser.get_chunks(
             filepath=loaded_data_point.local_filepath,
@@ -244,54 +558,237 @@ async def ingest_data_points(
                 {
                     f"{DATA_POINT_FQN_METADATA_KEY}": loaded_data_point.data_point_fqn,
                     f"{DATA_POINT_HASH_METADATA_KEY}": loaded_data_point.data_point_hash,
+                    f"{DATA_SOURCE_FQN_METADATA_KEY}": loaded_data_point.data_source_fqn,
                 }
             )
-            documents_to_be_upserted.append(chunk)
         logger.info("%s -> %s chunks", loaded_data_point.local_filepath, len(chunks))
+        return chunks
+    finally:
+        remove_local_files(loaded_data_point)
+
+
+def remove_local_files(loaded_data_point: LoadedDataPoint):
+    """
+    Deletes the files of a loaded data point from the temp dir once it is processed or skipped
+    """
+    # delete the file from temp dir after processing
+    try:
+        if loaded_data_point.local_filepath:
+            os.remove(loaded_data_point.local_filepath)
+            logger.debug(
+                f"Processing done! Deleting file {loaded_data_point.local_filepath}"
+            )
+    except Exception as e:
+        logger.exception(
+            f"Failed to delete file {loaded_data_point.local_filepath} after processing. Error: {e}"
+        )
+    # delete the local_filepath from the loaded_data_point object
+    try:
+        if loaded_data_point.local_metadata_file_path:
+            os.remove(loaded_data_point.local_metadata_file_path)
+            logger.debug(
+                f"Processing done! Deleting file {loaded_data_point.local_metadata_file_path}"
+            )
+    except Exception as e:
+        logger.exception(
+            f"Failed to delete file {loaded_data_point.local_metadata_file_path} after processing. Error: {e}"
+        )
+
+
+@contextmanager
+def _get_parse_pool(inputs: CollectionDataIngestionConfig):
+    """
+    Yields the worker pool used to parse data points, or None if data points are to be parsed inline.
+    """
+    if inputs.parse_execution_config.mode != ParseExecutionMode.PROCESS_POOL:
+        yield None
+        return
+    logger.info(
+        f"Parsing data points in a pool of {inputs.parse_execution_config.workers} worker processes"
+    )
+    parse_pool = AsyncProcessPoolExecutor(
+        max_workers=inputs.parse_execution_config.workers,
+        # Setting to spawn because we don't want to fork - it can cause issues with the event loop
+        mp_context=mp.get_context("spawn"),
+    )
+    try:
+        yield parse_pool
+    finally:
+        # Do not wait on workers still busy with a file that already timed out
+        parse_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def get_parse_slots(
+    inputs: CollectionDataIngestionConfig, parse_pool: Optional[Executor]
+) -> Optional[asyncio.Semaphore]:
+    """
+    One slot per worker of the parse pool, None if data points are parsed inline
+    """
+    if parse_pool is None:
+        return None
+    return asyncio.Semaphore(inputs.parse_execution_config.workers)
+
+
+async def parse_data_point(
+    inputs: CollectionDataIngestionConfig,
+    loaded_data_point: LoadedDataPoint,
+    parse_pool: Optional[Executor] = None,
+    parse_slots: Optional[asyncio.Semaphore] = None,
+) -> List[Document]:
+    """
+    Parses a loaded data point inline or in the given worker pool, honouring the per file timeout.
+    With `parse_slots`, the data point is only submitted once a worker is free, so the
+    timeout does not include the time spent waiting behind other data points.
+
+    Args:
+        inputs (CollectionDataIngestionConfig): The configuration for data ingestion.
+        loaded_data_point (LoadedDataPoint): The loaded data point to be parsed.
+        parse_pool (Optional[Executor]): Worker pool to parse in. Parses on the event loop if None.
+        parse_slots (Optional[asyncio.Semaphore]): Free workers of the pool, see `get_parse_slots`.
+
+    Raises:
+        TimeoutError: If parsing takes longer than the configured timeout.
+
+    Returns:
+        List[Document]: The chunks of the data point.
+    """
+    timeout = inputs.parse_execution_config.timeout
+    try:
+        async with parse_slots if parse_slots is not None else nullcontext():
+            if parse_pool is None:
+                parsing = parse_loaded_data_point(
+                    inputs=inputs, loaded_data_point=loaded_data_point
+                )
+            else:
+                parsing = asyncio.wrap_future(
+                    parse_pool.submit(
+                        parse_loaded_data_point,
+                        inputs=inputs,
+                        loaded_data_point=loaded_data_point,
+                    )
+                )
+            return await asyncio.wait_for(parsing, timeout=timeout)
+    except asyncio.TimeoutError:
+        # A worker that is already running cannot be interrupted, its result is discarded
+        raise TimeoutError(
+            f"Parsing data point {loaded_data_point.data_point_fqn} timed out after {timeout} seconds"
+        )
 
-        # delete the file from temp dir after processing
+
+async def ingest_data_points(
+    inputs: CollectionDataIngestionConfig,
+    loaded_data_points: List[LoadedDataPoint],
+    documents_ingested_count: int,
+    parse_pool: Optional[Executor] = None,
+    chunk_buffer: Optional[ChunkBuffer] = None,
+    progress: Optional[IngestionRunProgressReporter] = None,
+) -> List[str]:
+    """
+    Ingests data points into the vector store for a given batch.
+    Chunks are upserted as they are parsed whenever the buffer reaches its flush budget,
+    and the rest once the batch is parsed. A data point that times out while parsing fails
+    on its own, the rest of the batch is still ingested.
+
+    Args:
+        inputs (CollectionDataIngestionConfig): The configuration for data ingestion.
+        loaded_data_points (List[LoadedDataPoint]): The list of loaded data points to be ingested.
+        documents_ingested_count (int): The count of documents already ingested.
+        parse_pool (Optional[Executor]): Worker pool to parse the data points in parallel. Parses one by one if None.
+        chunk_buffer (Optional[ChunkBuffer]): Run wide chunk buffer. A new one is created for the batch if None.
+        progress (Optional[IngestionRunProgressReporter]): Live progress of the run, if reported.
+
+    Returns:
+        List[str]: Fully qualified names of the data points whose parsing timed out.
+
+    Raises:
+        TimeoutError: If parsing a data point times out and `raise_error_on_failure` is set.
+
+    """
+    if chunk_buffer is None:
+        chunk_buffer = ChunkBuffer(
+            inputs=inputs,
+            embeddings=_get_embeddings(inputs),
+            config=inputs.chunk_flush_config,
+            progress=progress,
+        )
+    docs_to_index_count = 0
+    failed_data_point_fqns: List[str] = []
+
+    async def _parse(
+        loaded_data_point: LoadedDataPoint, **kwargs
+    ) -> Optional[List[Document]]:
         try:
-            if loaded_data_point.local_filepath:
-                os.remove(loaded_data_point.local_filepath)
-                logger.debug(
-                    f"Processing done! Deleting file {loaded_data_point.local_filepath}"
+            return await parse_data_point(
+                inputs=inputs, loaded_data_point=loaded_data_point, **kwargs
+            )
+        except TimeoutError as e:
+            logger.exception(e)
+            if inputs.raise_error_on_failure:
+                raise e
+            failed_data_point_fqns.append(loaded_data_point.data_point_fqn)
+            if progress is not None:
+                progress.increment(data_points_failed=1)
+            return None
+
+    logger.info(
+        f"Processing {len(loaded_data_points)} new documents and completed: {documents_ingested_count}"
+    )
+    if parse_pool is not None:
+        logger.info(
+            f"[{documents_ingested_count}] Parsing {len(loaded_data_points)} new documents in worker pool"
+        )
+        parse_slots = get_parse_slots(inputs, parse_pool)
+        parsing_tasks = [
+            asyncio.ensure_future(
+                _parse(
+                    loaded_data_point,
+                    parse_pool=parse_pool,
+                    parse_slots=parse_slots,
                 )
-        except Exception as e:
-            logger.exception(
-                f"Failed to delete file {loaded_data_point.local_filepath} after processing. Error: {e}"
             )
-        # delete the local_filepath from the loaded_data_point object
+            for loaded_data_point in loaded_data_points
+        ]
         try:
-            if loaded_data_point.local_metadata_file_path:
-                os.remove(loaded_data_point.local_metadata_file_path)
-                logger.debug(
-                    f"Processing done! Deleting file {loaded_data_point.local_metadata_file_path}"
-                )
-        except Exception as e:
-            logger.exception(
-                f"Failed to delete file {loaded_data_point.local_metadata_file_path} after processing. Error: {e}"
+            # Buffer chunks as data points finish parsing, so they can be flushed early
+            for parsing in asyncio.as_completed(parsing_tasks):
+                chunks = await parsing
+                if chunks is None:
+                    continue
+                if progress is not None:
+                    progress.increment(data_points_parsed=1)
+                docs_to_index_count += len(chunks)
+                await chunk_buffer.aadd(chunks)
+        finally:
+            for parsing_task in parsing_tasks:
+                parsing_task.cancel()
+    else:
+        for index, loaded_data_point in enumerate(loaded_data_points):
+            logger.info(
+                f"[{index+1}/{len(loaded_data_points)}/{documents_ingested_count}] Parsing [{index+1}/{len(loaded_data_points)}] new document"
             )
+            chunks = await _parse(loaded_data_point)
+            if chunks is None:
+                continue
+            if progress is not None:
+                progress.increment(data_points_parsed=1)
+            docs_to_index_count += len(chunks)
+            await chunk_buffer.aadd(chunks)
 
-    docs_to_index_count = len(documents_to_be_upserted)
     if docs_to_index_count == 0:
         logger.warning(
             "No documents found to index in given batch. Moving to next batch..."
         )
-        return
-    logger.info(
-        f"Upserting {docs_to_index_count} documents to vector store for given batch"
-    )
-    # Upserted all the documents_to_be_ingested
-    VECTOR_STORE_CLIENT.upsert_documents(
-        collection_name=inputs.collection_name,
-        documents=documents_to_be_upserted,
-        embeddings=embeddings,
-        incremental=inputs.data_ingestion_mode == DataIngestionMode.INCREMENTAL,
-    )
+        return failed_data_point_fqns
+    # Upsert whatever is left, the batch is fully written once this returns
+    await chunk_buffer.aflush()
+    return failed_data_point_fqns
 
 
 async def ingest_data(
-    request: IngestDataToCollectionDto, user: Dict, pool: Optional[Executor] = None
+    request: IngestDataToCollectionDto,
+    user: Dict,
+    pool: Optional[Executor] = None,
+    scheduler: Optional[IngestionJobScheduler] = None,
 ):
     """Ingest data into the collection"""
     try:
@@ -320,6 +817,37 @@ async def ingest_data(
                 status_code=400,
                 detail=f"Collection {request.collection_name} does not have any associated data sources.",
             )
+        if request.resume_data_ingestion_run_name:
+            return await _resume_data_ingestion_run(
+                client=client,
+                collection=collection,
+                request=request,
+                user=user,
+                pool=pool,
+                scheduler=scheduler,
+            )
+
+        if request.fan_out_config is not None and request.fan_out_config.shadow_reindex:
+            if request.data_source_fqn or (request.run_as_job and not settings.LOCAL):
+                raise HTTPException(
+                    status_code=400,
+                    detail="Shadow re-indexing ingests all data sources of the collection and cannot run as a job",
+                )
+
+        if (
+            request.fan_out_config is not None
+            and not request.data_source_fqn
+            and (not request.run_as_job or settings.LOCAL)
+        ):
+            return await _fan_out_data_ingestion(
+                client=client,
+                collection=collection,
+                request=request,
+                user=user,
+                pool=pool,
+                scheduler=scheduler,
+            )
+
         associated_data_sources_to_be_ingested = []
         if request.data_source_fqn:
             associated_data_sources_to_be_ingested = [
@@ -331,44 +859,27 @@ async def ingest_data(
             )
 
         logger.info(f"Associated: {associated_data_sources_to_be_ingested}")
+        ingestion_job_ids = []
         for associated_data_source in associated_data_sources_to_be_ingested:
             logger.debug(
                 f"Starting ingestion for data source fqn: {associated_data_source.data_source_fqn}"
             )
             if not request.run_as_job or settings.LOCAL:
-                data_ingestion_run = CreateCollectionDataIngestionRun(
-                    collection_name=collection.name,
-                    data_source_fqn=associated_data_source.data_source_fqn,
-                    embedder_config=collection.embedder_config,
-                    parser_config=associated_data_source.parser_config,
-                    data_ingestion_mode=request.data_ingestion_mode,
-                    raise_error_on_failure=request.raise_error_on_failure,
+                ingestion_config = await _create_data_source_ingestion_config(
+                    client=client,
+                    collection=collection,
+                    associated_data_source=associated_data_source,
+                    request=request,
                 )
-                created_data_ingestion_run = await client.acreate_data_ingestion_run(
-                    data_ingestion_run=data_ingestion_run
+                ingestion_job = await _start_ingestion(
+                    ingestion_config,
+                    user=user,
+                    priority=request.priority,
+                    pool=pool,
+                    scheduler=scheduler,
                 )
-                ingestion_config = CollectionDataIngestionConfig(
-                    collection_name=created_data_ingestion_run.collection_name,
-                    data_ingestion_run_name=created_data_ingestion_run.name,
-                    data_source=associated_data_source.data_source,
-                    embedder_config=collection.embedder_config,
-                    parser_config=created_data_ingestion_run.parser_config,
-                    data_ingestion_mode=created_data_ingestion_run.data_ingestion_mode,
-                    raise_error_on_failure=created_data_ingestion_run.raise_error_on_failure,
-                    batch_size=request.batch_size,
-                )
-                if pool:
-                    logger.info(
-                        f"Submitting sync_data_source_to_collection job to pool"
-                    )
-                    # future of this submission is ignored, failures not tracked
-                    pool.submit(sync_data_source_to_collection, ingestion_config)
-                else:
-                    logger.info(
-                        f"Running sync_data_source_to_collection on main event loop"
-                    )
-                    await sync_data_source_to_collection(ingestion_config)
-                created_data_ingestion_run.status = DataIngestionRunStatus.INITIALIZED
+                if ingestion_job is not None:
+                    ingestion_job_ids.append(ingestion_job.id)
             else:
                 if not settings.JOB_FQN:
                     logger.error("Job FQN is required to trigger the job")
@@ -397,11 +908,12 @@ async def ingest_data(
                         "raise_error_on_failure": (
                             "True" if request.raise_error_on_failure else "False"
                         ),
+                        **_get_ingestion_job_params(request),
                     },
                 )
         return JSONResponse(
             status_code=201,
-            content={"message": "triggered"},
+            content={"message": "triggered", "ingestion_job_ids": ingestion_job_ids},
         )
 
     except HTTPException as exp:
@@ -409,3 +921,291 @@ async def ingest_data(
     except Exception as exp:
         logger.exception(exp)
         raise HTTPException(status_code=500, detail=str(exp))
+
+
+def _get_ingestion_job_params(request: IngestDataToCollectionDto) -> Dict[str, str]:
+    """
+    Ingestion settings of the request as params of the indexer job. Configurations are passed
+    as JSON with their double quotes escaped, the job command wraps them in single quotes
+    inside its double quoted shell command.
+    """
+
+    def _to_json_param(config: Optional[BaseModel]) -> str:
+        return config.model_dump_json().replace('"', '\\"') if config else ""
+
+    return {
+        "batch_size": str(request.batch_size),
+        "pipeline_config": _to_json_param(request.pipeline_config),
+        "chunk_flush_config": _to_json_param(request.chunk_flush_config),
+        "parse_execution_config": _to_json_param(request.parse_execution_config),
+        "resume_data_ingestion_run_name": request.resume_data_ingestion_run_name or "",
+    }
+
+
+async def _create_data_source_ingestion_config(
+    client: CollectionPrismaStore,
+    collection: Collection,
+    associated_data_source: AssociatedDataSources,
+    request: IngestDataToCollectionDto,
+    parent_data_ingestion_run_name: Optional[str] = None,
+) -> CollectionDataIngestionConfig:
+    """
+    Creates the data ingestion run of a data source and returns its ingestion configuration
+    """
+    data_ingestion_run = CreateCollectionDataIngestionRun(
+        collection_name=collection.name,
+        data_source_fqn=associated_data_source.data_source_fqn,
+        embedder_config=collection.embedder_config,
+        parser_config=associated_data_source.parser_config,
+        data_ingestion_mode=request.data_ingestion_mode,
+        raise_error_on_failure=request.raise_error_on_failure,
+        parent_data_ingestion_run_name=parent_data_ingestion_run_name,
+    )
+    created_data_ingestion_run = await client.acreate_data_ingestion_run(
+        data_ingestion_run=data_ingestion_run
+    )
+    return CollectionDataIngestionConfig(
+        collection_name=created_data_ingestion_run.collection_name,
+        data_ingestion_run_name=created_data_ingestion_run.name,
+        data_source=associated_data_source.data_source,
+        embedder_config=collection.embedder_config,
+        parser_config=created_data_ingestion_run.parser_config,
+        data_ingestion_mode=created_data_ingestion_run.data_ingestion_mode,
+        raise_error_on_failure=created_data_ingestion_run.raise_error_on_failure,
+        batch_size=request.batch_size,
+        pipeline_config=request.pipeline_config,
+        chunk_flush_config=request.chunk_flush_config,
+        parse_execution_config=request.parse_execution_config,
+    )
+
+
+async def _fan_out_data_ingestion(
+    client: CollectionPrismaStore,
+    collection: Collection,
+    request: IngestDataToCollectionDto,
+    user: Dict,
+    pool: Optional[Executor] = None,
+    scheduler: Optional[IngestionJobScheduler] = None,
+):
+    """
+    Creates a parent run with one child run per associated data source
+    and starts ingesting all of them concurrently
+    """
+    parent_data_ingestion_run = await client.acreate_data_ingestion_run(
+        data_ingestion_run=CreateCollectionDataIngestionRun(
+            collection_name=collection.name,
+            data_source_fqn=ALL_DATA_SOURCES_FQN,
+            data_ingestion_mode=request.data_ingestion_mode,
+            raise_error_on_failure=request.raise_error_on_failure,
+            fan_out_config=request.fan_out_config,
+        )
+    )
+    data_source_ingestion_configs = [
+        await _create_data_source_ingestion_config(
+            client=client,
+            collection=collection,
+            associated_data_source=associated_data_source,
+            request=request,
+            parent_data_ingestion_run_name=parent_data_ingestion_run.name,
+        )
+        for associated_data_source in collection.associated_data_sources.values()
+    ]
+    logger.info(
+        f"Ingesting {len(data_source_ingestion_configs)} data sources concurrently "
+        f"in data ingestion run {parent_data_ingestion_run.name}: {request.fan_out_config}"
+    )
+    ingestion_job = await _start_ingestion(
+        CollectionFanOutIngestionConfig(
+            collection_name=collection.name,
+            data_ingestion_run_name=parent_data_ingestion_run.name,
+            fan_out_config=request.fan_out_config,
+            data_source_ingestion_configs=data_source_ingestion_configs,
+        ),
+        user=user,
+        priority=request.priority,
+        pool=pool,
+        scheduler=scheduler,
+    )
+    return JSONResponse(
+        status_code=201,
+        content={
+            "message": "triggered",
+            "data_ingestion_run_name": parent_data_ingestion_run.name,
+            "child_data_ingestion_run_names": [
+                ingestion_config.data_ingestion_run_name
+                for ingestion_config in data_source_ingestion_configs
+            ],
+            "ingestion_job_ids": [ingestion_job.id] if ingestion_job else [],
+        },
+    )
+
+
+async def _start_ingestion(
+    ingestion_config: Union[
+        CollectionDataIngestionConfig, CollectionFanOutIngestionConfig
+    ],
+    user: Dict,
+    priority: int = 0,
+    pool: Optional[Executor] = None,
+    scheduler: Optional[IngestionJobScheduler] = None,
+) -> Optional[IngestionJob]:
+    """
+    Queues the data ingestion run in the scheduler if there is one, else runs it directly.
+    Returns the ingestion job, if queued.
+    """
+    if scheduler is not None:
+        return await scheduler.submit(
+            tenant_id=user["sub"], ingestion_config=ingestion_config, priority=priority
+        )
+    if pool:
+        logger.info(f"Submitting run_ingestion job to pool")
+        # future of this submission is ignored, failures not tracked
+        pool.submit(run_ingestion, ingestion_config)
+    else:
+        logger.info(f"Running run_ingestion on main event loop")
+        await run_ingestion(ingestion_config)
+    return None
+
+
+def _get_resumed_data_source_ingestion_config(
+    collection: Collection,
+    data_ingestion_run: CollectionDataIngestionRun,
+    request: IngestDataToCollectionDto,
+) -> CollectionDataIngestionConfig:
+    associated_data_source = collection.associated_data_sources.get(
+        data_ingestion_run.data_source_fqn
+    )
+    if associated_data_source is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Data source {data_ingestion_run.data_source_fqn} is no longer associated with collection {collection.name}",
+        )
+    return CollectionDataIngestionConfig(
+        collection_name=collection.name,
+        data_ingestion_run_name=data_ingestion_run.name,
+        data_source=associated_data_source.data_source,
+        embedder_config=collection.embedder_config,
+        parser_config=data_ingestion_run.parser_config,
+        data_ingestion_mode=data_ingestion_run.data_ingestion_mode,
+        raise_error_on_failure=data_ingestion_run.raise_error_on_failure,
+        batch_size=request.batch_size,
+        pipeline_config=request.pipeline_config,
+        chunk_flush_config=request.chunk_flush_config,
+        parse_execution_config=request.parse_execution_config,
+        resume_from_checkpoint=True,
+    )
+
+
+async def _resume_data_ingestion_run(
+    client: CollectionPrismaStore,
+    collection: Collection,
+    request: IngestDataToCollectionDto,
+    user: Dict,
+    pool: Optional[Executor] = None,
+    scheduler: Optional[IngestionJobScheduler] = None,
+):
+    """
+    Resumes a failed data ingestion run from its checkpoint. The run keeps its name, data source,
+    parser configuration and ingestion mode; data points it already ingested are skipped.
+    Resuming a parent run resumes all of its unfinished child runs concurrently.
+    The resumed run is queued in the scheduler if there is one, else run directly. With
+    `run_as_job`, a data source run is resumed by the indexer job instead.
+    """
+    data_ingestion_run: Optional[
+        CollectionDataIngestionRun
+    ] = await client.aget_data_ingestion_run(
+        data_ingestion_run_name=request.resume_data_ingestion_run_name, no_cache=True
+    )
+    if data_ingestion_run is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Data ingestion run {request.resume_data_ingestion_run_name} not found",
+        )
+    if data_ingestion_run.collection_name != collection.name:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Data ingestion run {data_ingestion_run.name} does not belong to collection {collection.name}",
+        )
+    if data_ingestion_run.status not in RESUMABLE_DATA_INGESTION_RUN_STATUSES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Data ingestion run {data_ingestion_run.name} in {data_ingestion_run.status} cannot be resumed",
+        )
+
+    logger.info(f"Resuming data ingestion run {data_ingestion_run.name}")
+    if (
+        request.run_as_job
+        and not settings.LOCAL
+        and data_ingestion_run.data_source_fqn != ALL_DATA_SOURCES_FQN
+    ):
+        if not settings.JOB_FQN:
+            logger.error("Job FQN is required to trigger the job")
+            raise HTTPException(
+                status_code=500,
+                detail="Job FQN and Job Component Name are required to trigger the job",
+            )
+        # The job resumes the run itself, with the settings forwarded from this request
+        trigger_job(
+            application_fqn=settings.JOB_FQN,
+            params={
+                "collection_name": collection.name,
+                "data_source_fqn": data_ingestion_run.data_source_fqn,
+                "data_ingestion_run_name": data_ingestion_run.name,
+                "data_ingestion_mode": data_ingestion_run.data_ingestion_mode,
+                "raise_error_on_failure": (
+                    "True" if data_ingestion_run.raise_error_on_failure else "False"
+                ),
+                **_get_ingestion_job_params(request),
+            },
+        )
+        return JSONResponse(
+            status_code=201,
+            content={
+                "message": "triggered",
+                "data_ingestion_run_name": data_ingestion_run.name,
+                "ingestion_job_ids": [],
+            },
+        )
+    if data_ingestion_run.data_source_fqn == ALL_DATA_SOURCES_FQN:
+        # Completed child runs are skipped, the others resume from their checkpoint
+        child_data_ingestion_runs = await client.aget_child_data_ingestion_runs(
+            parent_data_ingestion_run_name=data_ingestion_run.name
+        )
+        ingestion_config = CollectionFanOutIngestionConfig(
+            collection_name=collection.name,
+            data_ingestion_run_name=data_ingestion_run.name,
+            # The run keeps its own configuration, e.g. a shadow re-index stays one
+            fan_out_config=data_ingestion_run.fan_out_config
+            or request.fan_out_config
+            or FanOutIngestionConfig(),
+            data_source_ingestion_configs=[
+                _get_resumed_data_source_ingestion_config(
+                    collection=collection,
+                    data_ingestion_run=child_data_ingestion_run,
+                    request=request,
+                )
+                for child_data_ingestion_run in child_data_ingestion_runs
+            ],
+            resume_from_checkpoint=True,
+        )
+    else:
+        ingestion_config = _get_resumed_data_source_ingestion_config(
+            collection=collection,
+            data_ingestion_run=data_ingestion_run,
+            request=request,
+        )
+    ingestion_job = await _start_ingestion(
+        ingestion_config,
+        user=user,
+        priority=request.priority,
+        pool=pool,
+        scheduler=scheduler,
+    )
+    return JSONResponse(
+        status_code=201,
+        content={
+            "message": "resumed",
+            "data_ingestion_run_name": data_ingestion_run.name,
+            "ingestion_job_ids": [ingestion_job.id] if ingestion_job else [],
+        },
+    )
@@ -0,0 +1,322 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from langchain.docstore.document import Document
+from langchain.embeddings.base import Embeddings
+
+from backend.indexer.collections.buffer import get_document_size_bytes
+from backend.indexer.collections.checkpoint import IngestionRunCheckpointer
+from backend.indexer.collections.progress import IngestionRunProgressReporter
+from backend.indexer.collections.types import CollectionDataIngestionConfig
+from backend.logger import logger
+from backend.modules.vector_db.client import VECTOR_STORE_CLIENT
+from backend.types.core import (
+    DataIngestionMode,
+    IngestionPipelineConfig,
+    LoadedDataPoint,
+)
+from backend.utils import run_in_executor
+
+# Marks the end of the stream on a stage queue
+_STOP = object()
+
+
+class PrecomputedEmbeddings(Embeddings):
+    """
+    Embeddings that serve already computed document vectors and fall back to the
+    wrapped embedder for anything else. Lets the vector store write vectors that were
+    computed by an earlier pipeline stage without calling the embedding API again.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        texts: List[str],
+        vectors: List[List[float]],
+    ):
+        self.embeddings = embeddings
+        self.text_to_vector: Dict[str, List[float]] = dict(zip(texts, vectors))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        missing_texts = [text for text in texts if text not in self.text_to_vector]
+        if missing_texts:
+            self.text_to_vector.update(
+                zip(missing_texts, self.embeddings.embed_documents(missing_texts))
+            )
+        return [self.text_to_vector[text] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+class CollectionIngestionPipeline:
+    """
+    Staged ingestion pipeline: loader -> parsers -> embedders -> vector store writers.
+
+    Stages are connected by bounded asyncio queues so all of them are busy at the same
+    time and a slow stage applies backpressure to the ones before it, keeping memory
+    flat. All chunks of a data point always travel together, so incremental upserts
+    never see a partially written data point. Data points are committed to the run
+    checkpoint, if any, once their chunks are written. Stages report their counters to
+    the run progress, if any.
+    """
+
+    def __init__(
+        self,
+        inputs: CollectionDataIngestionConfig,
+        embeddings: Embeddings,
+        parse_pool: Optional[Executor] = None,
+        checkpointer: Optional[IngestionRunCheckpointer] = None,
+        progress: Optional[IngestionRunProgressReporter] = None,
+    ):
+        self.inputs = inputs
+        self.parse_pool = parse_pool
+        self.parse_slots: Optional[asyncio.Semaphore] = None
+        self.checkpointer = checkpointer
+        self.progress = progress
+        self.config: IngestionPipelineConfig = inputs.pipeline_config
+        self.embeddings = embeddings
+        self.parse_queue: asyncio.Queue = asyncio.Queue(maxsize=self.config.queue_size)
+        self.embed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.config.queue_size)
+        self.write_queue: asyncio.Queue = asyncio.Queue(maxsize=self.config.queue_size)
+        self.failed_data_point_fqns: List[str] = []
+        self.documents_loaded_count = 0
+        self.documents_ingested_count = 0
+
+    async def run(
+        self, loaded_data_points_batch_iterator: Iterator[List[LoadedDataPoint]]
+    ) -> List[str]:
+        """
+        Runs all the stages until the loader is exhausted.
+
+        Args:
+            loaded_data_points_batch_iterator (Iterator[List[LoadedDataPoint]]): Batches
+                yielded by the data loader.
+
+        Raises:
+            Exception: The first failure, if `raise_error_on_failure` is set.
+
+        Returns:
+            List[str]: Fully qualified names of the data points that failed to ingest.
+        """
+        stages = [
+            asyncio.create_task(self._load(loaded_data_points_batch_iterator)),
+            asyncio.create_task(
+                self._run_stage(
+                    worker=self._parse,
+                    concurrency=self.config.parser_concurrency,
+                    output_queue=self.embed_queue,
+                    output_concurrency=self.config.embedder_concurrency,
+                )
+            ),
+            asyncio.create_task(
+                self._run_stage(
+                    worker=self._embed,
+                    concurrency=self.config.embedder_concurrency,
+                    output_queue=self.write_queue,
+                    output_concurrency=self.config.writer_concurrency,
+                )
+            ),
+            asyncio.create_task(
+                self._run_stage(
+                    worker=self._write,
+                    concurrency=self.config.writer_concurrency,
+                )
+            ),
+        ]
+        try:
+            await asyncio.gather(*stages)
+        except BaseException:
+            for stage in stages:
+                stage.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            raise
+        logger.info(
+            f"Pipeline finished for collection {self.inputs.collection_name}: "
+            f"loaded={self.documents_loaded_count}, ingested={self.documents_ingested_count}, "
+            f"failed={len(self.failed_data_point_fqns)}"
+        )
+        return self.failed_data_point_fqns
+
+    async def _run_stage(
+        self,
+        worker,
+        concurrency: int,
+        output_queue: asyncio.Queue = None,
+        output_concurrency: int = 0,
+    ):
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        if output_queue is not None:
+            for _ in range(output_concurrency):
+                await output_queue.put(_STOP)
+
+    def _handle_failure(self, data_point_fqns: List[str], error: Exception):
+        logger.exception(error)
+        if self.inputs.raise_error_on_failure:
+            raise error
+        self.failed_data_point_fqns.extend(data_point_fqns)
+        self._report(data_points_failed=len(data_point_fqns))
+
+    def _report(self, **counters: int):
+        if self.progress is not None:
+            self.progress.increment(**counters)
+
+    async def _load(
+        self, loaded_data_points_batch_iterator: Iterator[List[LoadedDataPoint]]
+    ):
+        while True:
+            # Loaders are blocking iterators (downloads, copies), keep them off the
+            # event loop
+            loaded_data_points_batch = await run_in_executor(
+                None, next, loaded_data_points_batch_iterator, _STOP
+            )
+            if loaded_data_points_batch is _STOP:
+                break
+            for loaded_data_point in loaded_data_points_batch:
+                await self.parse_queue.put(loaded_data_point)
+                self.documents_loaded_count += 1
+            logger.info(
+                f"Loaded {self.documents_loaded_count} data points for collection {self.inputs.collection_name}"
+            )
+        for _ in range(self.config.parser_concurrency):
+            await self.parse_queue.put(_STOP)
+
+    async def _parse(self):
+        # Imported here to avoid a circular import with the indexer module
+        from backend.indexer.collections.indexer import (
+            get_parse_slots,
+            parse_data_point,
+        )
+
+        if self.parse_slots is None:
+            # Shared by all parsers of the stage, created on first use
+            self.parse_slots = get_parse_slots(self.inputs, self.parse_pool)
+        while True:
+            loaded_data_point: LoadedDataPoint = await self.parse_queue.get()
+            if loaded_data_point is _STOP:
+                return
+            try:
+                chunks = await parse_data_point(
+                    inputs=self.inputs,
+                    loaded_data_point=loaded_data_point,
+                    parse_pool=self.parse_pool,
+                    parse_slots=self.parse_slots,
+                )
+            except Exception as e:
+                self._handle_failure([loaded_data_point.data_point_fqn], e)
+                continue
+            self._report(data_points_parsed=1)
+            if chunks:
+                await self.embed_queue.put((loaded_data_point, chunks))
+            else:
+                # Nothing to write, the data point is done
+                await self._commit([loaded_data_point])
+
+    async def _commit(self, loaded_data_points: List[LoadedDataPoint]):
+        if self.checkpointer is None:
+            return
+        try:
+            await self.checkpointer.acommit(loaded_data_points)
+        except Exception as e:
+            self._handle_failure(
+                [
+                    loaded_data_point.data_point_fqn
+                    for loaded_data_point in loaded_data_points
+                ],
+                e,
+            )
+
+    async def _embed(self):
+        loaded_data_points: List[LoadedDataPoint] = []
+        documents: List[Document] = []
+        buffered_bytes = 0
+        max_bytes = (
+            self.inputs.chunk_flush_config.max_bytes
+            if self.inputs.chunk_flush_config
+            else None
+        )
+        while True:
+            item = await self.embed_queue.get()
+            if item is _STOP:
+                break
+            loaded_data_point, chunks = item
+            loaded_data_points.append(loaded_data_point)
+            documents.extend(chunks)
+            if max_bytes is not None:
+                buffered_bytes += sum(
+                    get_document_size_bytes(chunk) for chunk in chunks
+                )
+            if len(documents) >= self.config.embedding_batch_size or (
+                max_bytes is not None and buffered_bytes >= max_bytes
+            ):
+                await self._embed_batch(loaded_data_points, documents)
+                loaded_data_points, documents, buffered_bytes = [], [], 0
+        if documents:
+            await self._embed_batch(loaded_data_points, documents)
+
+    async def _embed_batch(
+        self, loaded_data_points: List[LoadedDataPoint], documents: List[Document]
+    ):
+        texts = [document.page_content for document in documents]
+        try:
+            vectors = await self.embeddings.aembed_documents(texts)
+        except Exception as e:
+            self._handle_failure(
+                [
+                    loaded_data_point.data_point_fqn
+                    for loaded_data_point in loaded_data_points
+                ],
+                e,
+            )
+            return
+        self._report(chunks_embedded=len(documents))
+        await self.write_queue.put(
+            (
+                loaded_data_points,
+                documents,
+                PrecomputedEmbeddings(
+                    embeddings=self.embeddings, texts=texts, vectors=vectors
+                ),
+            )
+        )
+
+    async def _write(self):
+        while True:
+            item: Tuple[
+                List[LoadedDataPoint], List[Document], Embeddings
+            ] = await self.write_queue.get()
+            if item is _STOP:
+                return
+            loaded_data_points, documents, embeddings = item
+            data_point_fqns = [
+                loaded_data_point.data_point_fqn
+                for loaded_data_point in loaded_data_points
+            ]
+            logger.info(
+                f"Upserting {len(documents)} documents of {len(data_point_fqns)} data points to vector store"
+            )
+            try:
+                await run_in_executor(
+                    None,
+                    VECTOR_STORE_CLIENT.upsert_documents,
+                    collection_name=self.inputs.collection_name,
+                    documents=documents,
+                    embeddings=embeddings,
+                    incremental=self.inputs.data_ingestion_mode
+                    == DataIngestionMode.INCREMENTAL,
+                )
+            except Exception as e:
+                self._handle_failure(data_point_fqns, e)
+                continue
+            self._report(
+                vectors_written=len(documents),
+                bytes_written=sum(
+                    get_document_size_bytes(document) for document in documents
+                ),
+            )
+            await self._commit(loaded_data_points)
+            self.documents_ingested_count += len(data_point_fqns)
+            logger.info(
+                f"Ingested {self.documents_ingested_count}/{self.documents_loaded_count} data points"
+            )
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from typing import Optional
+
+from backend.logger import logger
+from backend.modules.metadata_store.collections.prismastore import CollectionPrismaStore
+from backend.types.collection import CollectionDataIngestionRunProgress
+from backend.types.core import DataIngestionRunStatus
+
+# Statuses written as soon as they are set, so a failed or finished run is never reported as running
+_IMMEDIATE_DATA_INGESTION_RUN_STATUSES = {
+    DataIngestionRunStatus.FETCHING_EXISTING_VECTORS_FAILED,
+    DataIngestionRunStatus.DATA_INGESTION_FAILED,
+    DataIngestionRunStatus.DATA_CLEANUP_FAILED,
+    DataIngestionRunStatus.COMPLETED,
+    DataIngestionRunStatus.ERROR,
+}
+
+
+class IngestionRunProgressReporter:
+    """
+    Collects the progress counters and status changes of a data ingestion run in memory
+    and writes them to the metadata store at most once per flush interval, in a single update.
+
+    Intermediate status changes are coalesced with the counters; failed and final statuses
+    are written immediately.
+
+    A resumed run passes the progress persisted by its earlier attempts, so its counters carry on
+    from there instead of being overwritten. Rates are averaged over the current attempt.
+    """
+
+    def __init__(
+        self,
+        client: CollectionPrismaStore,
+        data_ingestion_run_name: str,
+        flush_interval: float = 1.0,
+        progress: Optional[CollectionDataIngestionRunProgress] = None,
+    ):
+        self.client = client
+        self.data_ingestion_run_name = data_ingestion_run_name
+        self.flush_interval = flush_interval
+        self.resumed = progress is not None
+        self._attempt_started_at = time.time()
+        self.progress = (
+            progress.model_copy()
+            if progress is not None
+            else CollectionDataIngestionRunProgress(started_at=self._attempt_started_at)
+        )
+        self._attempt_data_points_parsed = self.progress.data_points_parsed
+        self._attempt_vectors_written = self.progress.vectors_written
+        self._pending_status: Optional[DataIngestionRunStatus] = None
+        self._dirty = False
+        self._flusher: Optional[asyncio.Task] = None
+        # Writes are serialized so an older snapshot never overwrites a newer one
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        self._flusher = asyncio.create_task(self._flush_periodically())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._flusher.cancel()
+        await asyncio.gather(self._flusher, return_exceptions=True)
+        if (
+            exc_type is not None
+            and self._pending_status not in _IMMEDIATE_DATA_INGESTION_RUN_STATUSES
+        ):
+            # An interrupted run, e.g. a cancelled job, must not be reported as running again
+            self._pending_status = None
+        try:
+            await self.aflush()
+        except Exception as e:
+            logger.exception(
+                f"Failed to write progress of data ingestion run {self.data_ingestion_run_name}: {e}"
+            )
+
+    def increment(self, **counters: int):
+        """
+        Adds to the given counters, e.g. `increment(data_points_parsed=1, chunks_embedded=12)`
+        """
+        for name, value in counters.items():
+            setattr(self.progress, name, getattr(self.progress, name) + value)
+        self._dirty = True
+
+    async def aset_status(self, status: DataIngestionRunStatus):
+        self._pending_status = status
+        self._dirty = True
+        if status in _IMMEDIATE_DATA_INGESTION_RUN_STATUSES:
+            await self.aflush()
+
+    async def aflush(self):
+        async with self._lock:
+            await self._aflush()
+
+    async def _aflush(self):
+        if not self._dirty:
+            return
+        now = time.time()
+        elapsed = max(now - self._attempt_started_at, 1e-6)
+        self.progress.updated_at = now
+        self.progress.data_points_per_second = round(
+            (self.progress.data_points_parsed - self._attempt_data_points_parsed)
+            / elapsed,
+            3,
+        )
+        self.progress.vectors_per_second = round(
+            (self.progress.vectors_written - self._attempt_vectors_written) / elapsed,
+            3,
+        )
+        status, self._pending_status = self._pending_status, None
+        self._dirty = False
+        try:
+            await self.client.aupdate_data_ingestion_run_progress(
+                data_ingestion_run_name=self.data_ingestion_run_name,
+                progress=self.progress.model_copy(),
+                status=status,
+            )
+        except BaseException:
+            # Keep the changes for the next flush, also when the write was cancelled
+            self._pending_status = self._pending_status or status
+            self._dirty = True
+            raise
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.aflush()
+            except Exception as e:
+                logger.exception(
+                    f"Failed to write progress of data ingestion run {self.data_ingestion_run_name}: {e}"
+                )
@@ -0,0 +1,501 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Union
+
+from backend.indexer.collections.types import (
+    CollectionDataIngestionConfig,
+    CollectionFanOutIngestionConfig,
+)
+from backend.logger import logger
+from backend.modules.metadata_store.client import get_client
+from backend.modules.metadata_store.collections.prismastore import CollectionPrismaStore
+from backend.types.collection import GarbageCollectCollectionDto
+from backend.types.core import (
+    DataIngestionRunStatus,
+    IngestionJob,
+    IngestionJobStatus,
+    IngestionSchedulerConfig,
+)
+from backend.utils import run_in_executor
+
+_JOB_FIELDS = [
+    "id",
+    "tenant_id",
+    "priority",
+    "status",
+    "attempts",
+    "max_attempts",
+    "collection_name",
+    "data_ingestion_run_name",
+    "error",
+    "created_at",
+    "updated_at",
+    "next_attempt_at",
+]
+_JOB_COLUMNS = ", ".join(_JOB_FIELDS)
+
+IngestionConfig = Union[
+    CollectionDataIngestionConfig,
+    CollectionFanOutIngestionConfig,
+    GarbageCollectCollectionDto,
+]
+_INGESTION_CONFIG_TYPES = {
+    config_type.__name__: config_type
+    for config_type in (
+        CollectionDataIngestionConfig,
+        CollectionFanOutIngestionConfig,
+        GarbageCollectCollectionDto,
+    )
+}
+
+
+class IngestionJobStore:
+    """
+    Persistent ingestion job queue backed by SQLite.
+    Jobs survive restarts: jobs found running at startup are put back in the queue.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, timeout=30, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                id TEXT PRIMARY KEY,
+                tenant_id TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                max_attempts INTEGER NOT NULL,
+                collection_name TEXT NOT NULL,
+                data_ingestion_run_name TEXT NOT NULL,
+                config_type TEXT NOT NULL,
+                config TEXT NOT NULL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                next_attempt_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ingestion_jobs_queue ON ingestion_jobs (status, priority DESC, created_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ingestion_jobs_tenant ON ingestion_jobs (tenant_id, created_at)"
+        )
+
+    @staticmethod
+    def _to_job(row) -> IngestionJob:
+        return IngestionJob(**dict(zip(_JOB_FIELDS, row)))
+
+    def create(
+        self,
+        tenant_id: str,
+        priority: int,
+        max_attempts: int,
+        ingestion_config: IngestionConfig,
+    ) -> IngestionJob:
+        now = time.time()
+        job = IngestionJob(
+            id=str(uuid.uuid4()),
+            tenant_id=tenant_id,
+            priority=priority,
+            status=IngestionJobStatus.QUEUED,
+            max_attempts=max_attempts,
+            collection_name=ingestion_config.collection_name,
+            # Garbage collection jobs do not belong to a data ingestion run
+            data_ingestion_run_name=getattr(
+                ingestion_config, "data_ingestion_run_name", ""
+            ),
+            created_at=now,
+            updated_at=now,
+            next_attempt_at=now,
+        )
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO ingestion_jobs ({_JOB_COLUMNS}, config_type, config) VALUES ({','.join('?' * 14)})",
+                (
+                    job.id,
+                    job.tenant_id,
+                    job.priority,
+                    job.status.value,
+                    job.attempts,
+                    job.max_attempts,
+                    job.collection_name,
+                    job.data_ingestion_run_name,
+                    job.error,
+                    job.created_at,
+                    job.updated_at,
+                    job.next_attempt_at,
+                    type(ingestion_config).__name__,
+                    ingestion_config.model_dump_json(),
+                ),
+            )
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_JOB_COLUMNS} FROM ingestion_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._to_job(row) if row else None
+
+    def get_config(self, job_id: str) -> IngestionConfig:
+        with self._lock:
+            config_type, config = self._conn.execute(
+                "SELECT config_type, config FROM ingestion_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return _INGESTION_CONFIG_TYPES[config_type].model_validate_json(config)
+
+    def list(
+        self,
+        tenant_id: Optional[str] = None,
+        status: Optional[IngestionJobStatus] = None,
+        limit: int = 100,
+    ) -> List[IngestionJob]:
+        conditions, params = [], []
+        if tenant_id is not None:
+            conditions.append("tenant_id = ?")
+            params.append(tenant_id)
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status.value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_JOB_COLUMNS} FROM ingestion_jobs {where} ORDER BY created_at DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def list_runnable(self, now: float) -> List[IngestionJob]:
+        """
+        Queued jobs whose backoff has elapsed, highest priority first, then oldest first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_JOB_COLUMNS} FROM ingestion_jobs WHERE status = ? AND next_attempt_at <= ? "
+                "ORDER BY priority DESC, created_at",
+                (IngestionJobStatus.QUEUED.value, now),
+            ).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def get_next_attempt_at(self, now: float) -> Optional[float]:
+        """
+        Earliest time a queued job still in backoff becomes runnable
+        """
+        with self._lock:
+            (next_attempt_at,) = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM ingestion_jobs WHERE status = ? AND next_attempt_at > ?",
+                (IngestionJobStatus.QUEUED.value, now),
+            ).fetchone()
+        return next_attempt_at
+
+    def update(
+        self,
+        job_id: str,
+        status: IngestionJobStatus,
+        from_statuses: Optional[List[IngestionJobStatus]] = None,
+        **fields,
+    ) -> bool:
+        """
+        Sets the status and the given fields of a job. If `from_statuses` is given, the
+        update only happens if the job currently is in one of them. Returns whether the
+        job was updated.
+        """
+        fields.update(status=status.value, updated_at=time.time())
+        query = f"UPDATE ingestion_jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?"
+        params = [*fields.values(), job_id]
+        if from_statuses:
+            query += f" AND status IN ({','.join('?' * len(from_statuses))})"
+            params.extend(from_status.value for from_status in from_statuses)
+        with self._lock:
+            return self._conn.execute(query, params).rowcount > 0
+
+    def requeue_running(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE ingestion_jobs SET status = ?, updated_at = ? WHERE status = ?",
+                (
+                    IngestionJobStatus.QUEUED.value,
+                    time.time(),
+                    IngestionJobStatus.RUNNING.value,
+                ),
+            ).rowcount
+
+
+class IngestionJobScheduler:
+    """
+    In-process scheduler for collection data ingestion runs. A job is either the run of
+    a single data source, a parent run ingesting several data sources concurrently or
+    the garbage collection of a collection.
+
+    Submitted runs are persisted in a queue and started by priority, then submission
+    order, while staying within the global and per tenant concurrency limits. Runs are
+    executed in the process pool if one is given, else on the event loop. A failed
+    attempt is retried with exponential backoff, resuming the data ingestion run from
+    its checkpoint.
+
+    Cancelling a queued job removes it from the queue. Cancelling a running job stops it
+    on the event loop; a worker process that already started the run cannot be
+    interrupted, it runs to completion but the job stays cancelled and no longer counts
+    against the concurrency limits.
+    """
+
+    def __init__(
+        self, config: IngestionSchedulerConfig, pool: Optional[Executor] = None
+    ):
+        self.config = config
+        self.pool = pool
+        self.store = IngestionJobStore(config.path)
+        self._running: Dict[str, asyncio.Task] = {}
+        self._running_tenants: Dict[str, str] = {}
+        self._wakeup = asyncio.Event()
+        # Serializes job status changes with starting and cancelling their tasks
+        self._lock = asyncio.Lock()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    async def start(self):
+        requeued = await run_in_executor(None, self.store.requeue_running)
+        if requeued:
+            logger.info(f"[IngestionJobScheduler] Requeued {requeued} interrupted jobs")
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self):
+        """
+        Stops starting jobs. Jobs run on the event loop are interrupted: they stay
+        RUNNING and are requeued on the next start. Jobs run in worker processes cannot
+        be interrupted, they are waited for and marked from their outcome, so a finished
+        run is not ingested again.
+        """
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        tasks = list(self._running.values())
+        if self.pool is None:
+            for task in tasks:
+                task.cancel()
+        elif tasks:
+            logger.info(
+                f"[IngestionJobScheduler] Waiting for {len(tasks)} running jobs to finish"
+            )
+        await asyncio.gather(self._dispatcher, *tasks, return_exceptions=True)
+        self._dispatcher = None
+
+    async def submit(
+        self,
+        tenant_id: str,
+        ingestion_config: IngestionConfig,
+        priority: int = 0,
+    ) -> IngestionJob:
+        """
+        Queues a data ingestion run or a garbage collection
+
+        Args:
+            tenant_id (str): Tenant submitting the run, used for the per tenant
+                concurrency limit.
+            ingestion_config (IngestionConfig): The configuration for data ingestion or
+                garbage collection.
+            priority (int): Jobs with a higher priority are started first.
+
+        Returns:
+            IngestionJob: The queued job.
+        """
+        job = await run_in_executor(
+            None,
+            self.store.create,
+            tenant_id=tenant_id,
+            priority=priority,
+            max_attempts=self.config.max_attempts,
+            ingestion_config=ingestion_config,
+        )
+        logger.info(
+            f"[IngestionJobScheduler] Queued job {job.id} for {type(ingestion_config).__name__} of collection {job.collection_name}"
+        )
+        self._wakeup.set()
+        return job
+
+    async def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        return await run_in_executor(None, self.store.get, job_id)
+
+    async def list_jobs(
+        self,
+        tenant_id: Optional[str] = None,
+        status: Optional[IngestionJobStatus] = None,
+        limit: int = 100,
+    ) -> List[IngestionJob]:
+        return await run_in_executor(
+            None, self.store.list, tenant_id=tenant_id, status=status, limit=limit
+        )
+
+    async def cancel(self, job_id: str) -> Optional[IngestionJob]:
+        """
+        Cancels a queued or running job. Jobs that already finished are returned
+        unchanged.
+        """
+        async with self._lock:
+            cancelled = await run_in_executor(
+                None,
+                self.store.update,
+                job_id,
+                IngestionJobStatus.CANCELLED,
+                from_statuses=[IngestionJobStatus.QUEUED, IngestionJobStatus.RUNNING],
+            )
+            task = self._running.get(job_id)
+            if task is not None:
+                task.cancel()
+        job = await run_in_executor(None, self.store.get, job_id)
+        if cancelled:
+            logger.info(f"[IngestionJobScheduler] Cancelled job {job_id}")
+            if job.data_ingestion_run_name:
+                await self._mark_data_ingestion_run_cancelled(job)
+        return job
+
+    async def _dispatch_loop(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await self._start_runnable_jobs()
+            except Exception as e:
+                logger.exception(f"[IngestionJobScheduler] Failed to start jobs: {e}")
+            # Runnable jobs waiting for a free slot are picked up when a running job
+            # finishes
+            timeout = None
+            now = time.time()
+            next_attempt_at = await run_in_executor(
+                None, self.store.get_next_attempt_at, now=now
+            )
+            if next_attempt_at is not None:
+                timeout = max(next_attempt_at - now, 0.1)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _start_runnable_jobs(self):
+        runnable_jobs = await run_in_executor(
+            None, self.store.list_runnable, now=time.time()
+        )
+        for job in runnable_jobs:
+            if len(self._running) >= self.config.max_concurrent_jobs:
+                return
+            tenant_running_count = sum(
+                1
+                for tenant_id in self._running_tenants.values()
+                if tenant_id == job.tenant_id
+            )
+            if tenant_running_count >= self.config.max_concurrent_jobs_per_tenant:
+                continue
+            async with self._lock:
+                if not await run_in_executor(
+                    None,
+                    self.store.update,
+                    job.id,
+                    IngestionJobStatus.RUNNING,
+                    from_statuses=[IngestionJobStatus.QUEUED],
+                    attempts=job.attempts + 1,
+                    error=None,
+                ):
+                    continue
+                self._running_tenants[job.id] = job.tenant_id
+                self._running[job.id] = asyncio.create_task(
+                    self._run_job(job.id, attempt=job.attempts + 1)
+                )
+
+    async def _run_job(self, job_id: str, attempt: int):
+        # Imported here to avoid a circular import with the indexer module
+        from backend.indexer.collections.garbage_collection import (
+            run_garbage_collection,
+        )
+        from backend.indexer.collections.indexer import run_ingestion
+
+        ingestion_config = await run_in_executor(None, self.store.get_config, job_id)
+        if isinstance(ingestion_config, GarbageCollectCollectionDto):
+            # Garbage collection is idempotent, a later attempt simply starts over
+            run = run_garbage_collection
+        else:
+            run = run_ingestion
+            # Later attempts pick up where the failed one stopped
+            ingestion_config.resume_from_checkpoint = (
+                ingestion_config.resume_from_checkpoint or attempt > 1
+            )
+        logger.info(
+            f"[IngestionJobScheduler] Starting job {job_id}, attempt {attempt}: {type(ingestion_config).__name__} of collection {ingestion_config.collection_name}"
+        )
+        try:
+            if self.pool is not None:
+                await asyncio.wrap_future(self.pool.submit(run, ingestion_config))
+            else:
+                await run(ingestion_config)
+        except asyncio.CancelledError:
+            logger.info(f"[IngestionJobScheduler] Job {job_id} stopped")
+            raise
+        except Exception as e:
+            logger.exception(f"[IngestionJobScheduler] Job {job_id} failed: {e}")
+            await self._handle_failed_attempt(job_id, attempt, e)
+        else:
+            await run_in_executor(
+                None,
+                self.store.update,
+                job_id,
+                IngestionJobStatus.SUCCEEDED,
+                from_statuses=[IngestionJobStatus.RUNNING],
+            )
+            logger.info(f"[IngestionJobScheduler] Job {job_id} succeeded")
+        finally:
+            self._running.pop(job_id, None)
+            self._running_tenants.pop(job_id, None)
+            self._wakeup.set()
+
+    async def _handle_failed_attempt(self, job_id: str, attempt: int, error: Exception):
+        job = await run_in_executor(None, self.store.get, job_id)
+        if attempt < job.max_attempts:
+            backoff = min(
+                self.config.retry_backoff_seconds * 2 ** (attempt - 1),
+                self.config.max_retry_backoff_seconds,
+            )
+            await run_in_executor(
+                None,
+                self.store.update,
+                job_id,
+                IngestionJobStatus.QUEUED,
+                from_statuses=[IngestionJobStatus.RUNNING],
+                error=str(error),
+                next_attempt_at=time.time() + backoff,
+            )
+            logger.info(
+                f"[IngestionJobScheduler] Retrying job {job_id} in {backoff} seconds"
+            )
+        else:
+            await run_in_executor(
+                None,
+                self.store.update,
+                job_id,
+                IngestionJobStatus.FAILED,
+                from_statuses=[IngestionJobStatus.RUNNING],
+                error=str(error),
+            )
+
+    async def _mark_data_ingestion_run_cancelled(self, job: IngestionJob):
+        try:
+            client = CollectionPrismaStore(await get_client())
+            await client.alog_errors_for_data_ingestion_run(
+                data_ingestion_run_name=job.data_ingestion_run_name,
+                errors={"cancelled": f"Ingestion job {job.id} was cancelled"},
+            )
+            await client.aupdate_data_ingestion_run_status(
+                data_ingestion_run_name=job.data_ingestion_run_name,
+                status=DataIngestionRunStatus.ERROR,
+            )
+        except Exception as e:
+            logger.exception(
+                f"[IngestionJobScheduler] Failed to mark data ingestion run {job.data_ingestion_run_name} as cancelled: {e}"
+            )
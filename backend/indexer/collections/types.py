@@ -1,12 +1,16 @@
-from typing import Dict
+from typing import Dict, List, Optional
 
 from pydantic import Field
 
 from backend.types.core import (
+    ChunkFlushConfig,
     ConfiguredBaseModel,
     DataIngestionMode,
     DataSource,
     EmbedderConfig,
+    FanOutIngestionConfig,
+    IngestionPipelineConfig,
+    ParseExecutionConfig,
     ParserConfig,
 )
 
@@ -34,3 +38,43 @@ class CollectionDataIngestionConfig(ConfiguredBaseModel):
     data_ingestion_mode: DataIngestionMode = Field(title="Data ingestion mode")
     raise_error_on_failure: bool = Field(default=True, title="Raise error on failure")
     batch_size: int = Field(default=100, title="Batch size for indexing", ge=1)
+    pipeline_config: Optional[IngestionPipelineConfig] = Field(
+        default=None,
+        title="Staged pipeline configuration. If not set, batches are loaded, parsed and upserted one after another",
+    )
+    chunk_flush_config: Optional[ChunkFlushConfig] = Field(
+        default=None,
+        title="Chunk flushing configuration. If not set, all chunks of a loader batch are upserted at once. "
+        "The staged pipeline only applies the byte budget, on top of its embedding batch size",
+    )
+    parse_execution_config: ParseExecutionConfig = Field(
+        default_factory=ParseExecutionConfig,
+        title="Parser execution configuration",
+    )
+    resume_from_checkpoint: bool = Field(
+        default=False,
+        title="Skip data points already ingested by an earlier attempt of this run",
+    )
+
+
+class CollectionFanOutIngestionConfig(ConfiguredBaseModel):
+    """
+    Configuration to ingest several data sources of a collection concurrently under one parent run
+    """
+
+    collection_name: str = Field(
+        title="a unique name to your collection",
+    )
+    data_ingestion_run_name: str = Field(
+        title="Name of the parent ingestion run",
+    )
+    fan_out_config: FanOutIngestionConfig = Field(
+        title="Concurrency limits shared by the data sources",
+    )
+    data_source_ingestion_configs: List[CollectionDataIngestionConfig] = Field(
+        title="Configuration of the child ingestion run of every data source",
+    )
+    resume_from_checkpoint: bool = Field(
+        default=False,
+        title="Resume unfinished child runs from their checkpoint and skip completed ones",
+    )
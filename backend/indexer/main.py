@@ -1,24 +1,21 @@
 import asyncio
 
 from backend.indexer.argument_parser import parse_args_ingest_total_collection
-from backend.indexer.indexer import ingest_data
+from backend.indexer.collections.indexer import ingest_data
 from backend.logger import logger
-from backend.types.core import DataIngestionMode
-from backend.types.collection import IngestDataToCollectionDto
+from backend.modules.metadata_store.client import get_client
+from backend.modules.metadata_store.collections.prismastore import CollectionPrismaStore
 
 
 async def main():
-    args = parse_args_ingest_total_collection()
-    inputs = IngestDataToCollectionDto(
-        collection_name=args.collection_name,
-        data_source_fqn=args.data_source_fqn,
-        data_ingestion_mode=DataIngestionMode(args.data_ingestion_mode),
-        raise_error_on_failure=args.raise_error_on_failure,
-        run_as_job=args.run_as_job,
-        batch_size=int(args.batch_size),
-    )
+    inputs = parse_args_ingest_total_collection()
     try:
-        await ingest_data(request=inputs)
+        client = CollectionPrismaStore(await get_client())
+        collection = await client.aget_collection_by_name(inputs.collection_name)
+        if collection is None:
+            raise Exception(f"Collection {inputs.collection_name} does not exist")
+        # The job ingests on behalf of the owner of the collection
+        await ingest_data(request=inputs, user={"sub": collection.owner_id})
     except Exception as e:
         print(f"Indexer exception - {e}")
         logger.exception(e)
@@ -0,0 +1,320 @@
+# This script exports a collection of any vector db provider into a portable snapshot,
+# and imports a snapshot into a collection of any provider, without embedding again
+"""
+How to run:
+
+python -m backend.migration.collection_snapshot export \
+--provider qdrant \
+--url http://localhost:6333 \
+--collection_name creditcard \
+--snapshot_path ./snapshots/creditcard
+
+python -m backend.migration.collection_snapshot import \
+--provider embedded \
+--collection_name creditcard \
+--snapshot_path ./snapshots/creditcard
+
+Add --api_key, --config (provider config as JSON) or --local to configure the vector db
+Add --dtype float16 on export to halve the size of the vectors
+Add --batch_size to set the number of vectors read and written at a time
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from tqdm import tqdm
+
+from backend.constants import DATA_POINT_FQN_METADATA_KEY, DATA_POINT_HASH_METADATA_KEY
+from backend.logger import logger
+from backend.migration.vector_db_migration import create_collection_if_not_exists
+from backend.modules.vector_db import get_vector_db_client
+from backend.modules.vector_db.base import BaseVectorDB
+from backend.types.core import VectorDBConfig, VectorIndexConfig, VectorRecord
+
+SNAPSHOT_FORMAT_VERSION = 1
+# Snapshot directory layout: vectors as one contiguous row major array, payloads as
+# parquet rows in the same order, and the manifest, written last, describing both
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.bin"
+PAYLOADS_FILE = "payloads.parquet"
+PAYLOADS_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("data_point_fqn", pa.string()),
+        ("data_point_hash", pa.string()),
+        ("page_content", pa.string()),
+        # Metadata of chunks differs between parsers, it is kept as JSON
+        ("metadata", pa.string()),
+    ]
+)
+
+
+def export_snapshot(
+    client: BaseVectorDB,
+    collection_name: str,
+    snapshot_path: str,
+    dtype: str = "float32",
+    batch_size: int = 10000,
+) -> None:
+    """
+    Writes all vectors of a collection with their chunks into a snapshot directory
+
+    Args:
+        client (BaseVectorDB): Vector db to read from
+        collection_name (str): Collection to export
+        snapshot_path (str): Directory to write the snapshot to, must not hold a
+            snapshot yet
+        dtype (str, optional): Storage type of the vectors, float32 or float16. Defaults
+            to "float32".
+        batch_size (int, optional): Number of vectors read at a time, and rows per
+            parquet row group. Defaults to 10000.
+    """
+    if os.path.exists(os.path.join(snapshot_path, MANIFEST_FILE)):
+        raise ValueError(f"A snapshot already exists at {snapshot_path}")
+    os.makedirs(snapshot_path, exist_ok=True)
+    started_at = time.time()
+    count, dimension = 0, None
+    progress = tqdm(unit="points")
+    vectors_path = os.path.join(snapshot_path, VECTORS_FILE)
+    payloads_path = os.path.join(snapshot_path, PAYLOADS_FILE)
+    with open(vectors_path, "wb") as vectors_file, pq.ParquetWriter(
+        payloads_path, PAYLOADS_SCHEMA, compression="zstd"
+    ) as payloads_writer:
+        for vector_records in client.iter_vector_records(
+            collection_name=collection_name, batch_size=batch_size
+        ):
+            if not vector_records:
+                continue
+            vectors = np.asarray(
+                [record.vector for record in vector_records], dtype=dtype
+            )
+            if dimension is None:
+                dimension = vectors.shape[1]
+            vectors_file.write(vectors.tobytes())
+            payloads_writer.write_table(
+                pa.Table.from_pydict(
+                    {
+                        "id": [record.id for record in vector_records],
+                        "data_point_fqn": [
+                            record.metadata.get(DATA_POINT_FQN_METADATA_KEY)
+                            for record in vector_records
+                        ],
+                        "data_point_hash": [
+                            record.metadata.get(DATA_POINT_HASH_METADATA_KEY)
+                            for record in vector_records
+                        ],
+                        "page_content": [
+                            record.page_content for record in vector_records
+                        ],
+                        "metadata": [
+                            json.dumps(record.metadata, default=str)
+                            for record in vector_records
+                        ],
+                    },
+                    schema=PAYLOADS_SCHEMA,
+                )
+            )
+            count += len(vector_records)
+            progress.update(len(vector_records))
+    progress.close()
+    with open(os.path.join(snapshot_path, MANIFEST_FILE), "w") as f:
+        json.dump(
+            {
+                "format_version": SNAPSHOT_FORMAT_VERSION,
+                "collection_name": collection_name,
+                "count": count,
+                "dimension": dimension,
+                "dtype": dtype,
+                "created_at": time.time(),
+            },
+            f,
+        )
+    snapshot_size = sum(
+        os.path.getsize(os.path.join(snapshot_path, name))
+        for name in (VECTORS_FILE, PAYLOADS_FILE)
+    )
+    logger.info(
+        f"Exported {count} vectors of {collection_name} to {snapshot_path} "
+        f"({snapshot_size / 2**20:.1f} MB) in {time.time() - started_at:.1f}s"
+    )
+
+
+def import_snapshot(
+    client: BaseVectorDB,
+    collection_name: str,
+    snapshot_path: str,
+    batch_size: int = 10000,
+    vector_index_config: Optional[VectorIndexConfig] = None,
+) -> None:
+    """
+    Streams a snapshot into a collection, created if it does not exist. The vector file
+    is memory mapped and the payloads are read one batch at a time, so memory use stays
+    bounded.
+
+    Args:
+        client (BaseVectorDB): Vector db to write to
+        collection_name (str): Collection to import into
+        snapshot_path (str): Directory holding the snapshot
+        batch_size (int, optional): Number of vectors written at a time. Defaults to
+            10000.
+        vector_index_config (Optional[VectorIndexConfig], optional): Index settings of
+            the collection, if it is created. Defaults to None.
+    """
+    with open(os.path.join(snapshot_path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest["format_version"] != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported snapshot format version {manifest['format_version']}"
+        )
+    count = manifest["count"]
+    if count == 0:
+        logger.warning(f"Snapshot at {snapshot_path} holds no vectors")
+        return
+    vectors = np.memmap(
+        os.path.join(snapshot_path, VECTORS_FILE),
+        dtype=manifest["dtype"],
+        mode="r",
+        shape=(count, manifest["dimension"]),
+    )
+    create_collection_if_not_exists(
+        client=client,
+        collection_name=collection_name,
+        vector_size=manifest["dimension"],
+        vector_index_config=vector_index_config,
+    )
+    started_at = time.time()
+    start = 0
+    progress = tqdm(total=count, unit="points")
+    for payloads in pq.ParquetFile(
+        os.path.join(snapshot_path, PAYLOADS_FILE)
+    ).iter_batches(batch_size=batch_size, columns=["id", "page_content", "metadata"]):
+        end = start + payloads.num_rows
+        payloads = payloads.to_pydict()
+        client.upsert_vector_records(
+            collection_name=collection_name,
+            vector_records=[
+                VectorRecord(
+                    id=id,
+                    page_content=page_content,
+                    metadata=json.loads(metadata),
+                    vector=vector,
+                )
+                for id, page_content, metadata, vector in zip(
+                    payloads["id"],
+                    payloads["page_content"],
+                    payloads["metadata"],
+                    vectors[start:end].astype(np.float32).tolist(),
+                )
+            ],
+        )
+        progress.update(end - start)
+        start = end
+    progress.close()
+    client.flush_collection(collection_name=collection_name)
+    logger.info(
+        f"Imported {count} vectors from {snapshot_path} into {collection_name} "
+        f"in {time.time() - started_at:.1f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export a collection into a portable snapshot, or import a snapshot into a collection"
+    )
+    parser.add_argument(
+        "command", choices=["export", "import"], help="Export or import a snapshot"
+    )
+    parser.add_argument(
+        "--provider",
+        type=str,
+        help="Vector db provider, e.g. qdrant, singlestore, weaviate or embedded",
+        required=True,
+    )
+    parser.add_argument(
+        "--url", type=str, help="Vector db url", required=False, default=None
+    )
+    parser.add_argument(
+        "--api_key", type=str, help="Vector db api key", required=False, default=None
+    )
+    parser.add_argument(
+        "--config",
+        type=json.loads,
+        help="Vector db provider config as JSON",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--local",
+        help="Vector db is local",
+        required=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--collection_name", type=str, help="Collection name", required=True
+    )
+    parser.add_argument(
+        "--snapshot_path", type=str, help="Snapshot directory", required=True
+    )
+    parser.add_argument(
+        "--dtype",
+        choices=["float32", "float16"],
+        help="Storage type of the exported vectors",
+        required=False,
+        default="float32",
+    )
+    parser.add_argument(
+        "--vector_index_config",
+        type=json.loads,
+        help="Index settings of the collection as JSON, if it is created on import",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        help="Number of vectors read and written at a time",
+        required=False,
+        default=10000,
+    )
+
+    args = parser.parse_args()
+
+    client = get_vector_db_client(
+        config=VectorDBConfig(
+            provider=args.provider,
+            local=args.local,
+            url=args.url,
+            api_key=args.api_key,
+            config=args.config or {},
+        )
+    )
+    if args.command == "export":
+        export_snapshot(
+            client=client,
+            collection_name=args.collection_name,
+            snapshot_path=args.snapshot_path,
+            dtype=args.dtype,
+            batch_size=args.batch_size,
+        )
+    else:
+        import_snapshot(
+            client=client,
+            collection_name=args.collection_name,
+            snapshot_path=args.snapshot_path,
+            batch_size=args.batch_size,
+            vector_index_config=(
+                VectorIndexConfig.model_validate(args.vector_index_config)
+                if args.vector_index_config
+                else None
+            ),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# This script adds the indexed data source fqn field to the points of qdrant collections
+# created before it was written at ingestion, so listing the data points of a data source
+# becomes an index lookup instead of a full text scan of the collection
+"""
+How to run:
+
+python -m backend.migration.qdrant_backfill_data_source_fqn \
+--url http://localhost:6333 \
+--collection_name creditcard
+
+Leave out --collection_name to backfill all collections
+Add --api_key, --config (qdrant config as JSON) or --local to configure qdrant
+Add --batch_size to set the number of points read and updated at a time
+"""
+
+import argparse
+import json
+
+from backend.logger import logger
+from backend.modules.vector_db.qdrant import BATCH_SIZE, QdrantVectorDB
+from backend.types.core import VectorDBConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Backfill and index the data source fqn of the points of qdrant collections"
+    )
+    parser.add_argument(
+        "--url", type=str, help="Qdrant url", required=False, default=None
+    )
+    parser.add_argument(
+        "--api_key", type=str, help="Qdrant api key", required=False, default=None
+    )
+    parser.add_argument(
+        "--config",
+        type=json.loads,
+        help="Qdrant config as JSON",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--local",
+        help="Qdrant is local",
+        required=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--collection_name",
+        type=str,
+        help="Collection to backfill, all collections if not set",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        help="Number of points read and updated at a time",
+        required=False,
+        default=BATCH_SIZE,
+    )
+
+    args = parser.parse_args()
+
+    client = QdrantVectorDB(
+        config=VectorDBConfig(
+            provider="qdrant",
+            local=args.local,
+            url=args.url,
+            api_key=args.api_key,
+            config=args.config or {},
+        )
+    )
+    collection_names = (
+        [args.collection_name] if args.collection_name else client.get_collections()
+    )
+    for collection_name in collection_names:
+        updated_count = client.backfill_data_source_fqn(
+            collection_name=collection_name, batch_size=args.batch_size
+        )
+        logger.info(f"Backfilled {updated_count} points of {collection_name}")
+
+
+if __name__ == "__main__":
+    main()
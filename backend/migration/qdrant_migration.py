@@ -14,10 +14,14 @@ python -m backend.migration.qdrant_migration \
 Add --source_prefix & --destination_prefix if qdrant instance has prefix enabled
 Add --batch_size to set batch size for migration
 Add --overwrite to overwrite destination collection if exists in separate qdrant
+Add --num_workers to migrate disjoint id ranges in parallel
+Add --resume to continue an interrupted migration from its state file (--state_path)
+Add --skip_verify to skip comparing checksums of the migrated batches
 """
 
 
 import argparse
+from typing import Optional
 
 import requests
 from qdrant_client import QdrantClient
@@ -38,6 +42,10 @@ def migrate_collection(
     destination_prefix: str,
     batch_size: int,
     overwrite: bool,
+    num_workers: int = 1,
+    state_path: Optional[str] = None,
+    resume: bool = False,
+    verify: bool = True,
 ):
     try:
         fetched_source_collection = get_collection(
@@ -52,11 +60,24 @@ def migrate_collection(
         source_prefix == destination_prefix
     )
 
+    state_path = (
+        state_path
+        or f"./migration_state/{source_collection_name}__{destination_collection_name}.json"
+    )
+
     try:
         fetched_destination_collection = get_collection(
             destination_backend_url, destination_collection_name, type="destination"
         )
-        if fetched_destination_collection and same_qdrant_loc:
+        if resume:
+            if not fetched_destination_collection:
+                raise Exception(
+                    f"Destination collection '{destination_collection_name}' of the migration to resume not found."
+                )
+            logger.debug(
+                f"Resuming migration into destination collection '{destination_collection_name}'"
+            )
+        elif fetched_destination_collection and same_qdrant_loc:
             raise Exception(
                 f"Source and destination qdrant locations are same. Destination collection '{destination_collection_name}' already exists."
             )
@@ -73,6 +94,7 @@ def migrate_collection(
         raise e
 
     dest_collection = None
+    migration_started = False
     try:
         # prepare collection to be created at destination
         dest_collection = CreateCollectionDto(
@@ -92,16 +114,17 @@ def migrate_collection(
             ],
         ).model_dump()
 
-        logger.debug(
-            f"Creating '{dest_collection.get('name')}' collection at destination"
-        )
-        # create collection at destination
-        with requests.post(
-            url=f"{destination_backend_url.rstrip('/')}/v1/collections/",
-            json=dest_collection,
-        ) as r:
-            r.raise_for_status()
-            logger.debug("Collection entry created: ", r.json())
+        if not resume:
+            logger.debug(
+                f"Creating '{dest_collection.get('name')}' collection at destination"
+            )
+            # create collection at destination
+            with requests.post(
+                url=f"{destination_backend_url.rstrip('/')}/v1/collections/",
+                json=dest_collection,
+            ) as r:
+                r.raise_for_status()
+                logger.debug("Collection entry created: ", r.json())
 
         logger.debug("Collection migration started...")
 
@@ -121,6 +144,7 @@ def migrate_collection(
             prefix=destination_prefix,
         )
 
+        migration_started = True
         migrate(
             source_client=source_qdrant_client,
             dest_client=destination_qdrant_client,
@@ -128,10 +152,19 @@ def migrate_collection(
             destination_collection_name=destination_collection_name,
             batch_size=batch_size,
             same_qdrant=same_qdrant_loc,
+            num_workers=num_workers,
+            state_path=state_path,
+            resume=resume,
+            verify=verify,
         )
 
     except Exception as e:
-        if dest_collection is not None:
+        if migration_started:
+            # Keep what was migrated so far, the migration can be resumed
+            logger.error(
+                f"Migration interrupted, add --resume to continue it from {state_path}"
+            )
+        elif dest_collection is not None and not resume:
             with requests.delete(
                 url=f"{destination_backend_url.rstrip('/')}/v1/collections/{destination_collection_name}",
                 json=dest_collection,
@@ -210,6 +243,33 @@ def main():
         action="store_true",
     )
 
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        help="Number of workers migrating disjoint id ranges in parallel",
+        required=False,
+        default=1,
+    )
+    parser.add_argument(
+        "--state_path",
+        type=str,
+        help="File recording the progress of the migration, to resume it",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--resume",
+        help="Resume an interrupted migration from its state file",
+        required=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--skip_verify",
+        help="Skip comparing checksums of source and destination batches",
+        required=False,
+        action="store_true",
+    )
+
     args = parser.parse_args()
 
     migrate_collection(
@@ -225,6 +285,10 @@ def main():
         destination_prefix=args.destination_prefix,
         batch_size=args.batch_size,
         overwrite=args.overwrite,
+        num_workers=args.num_workers,
+        state_path=args.state_path,
+        resume=args.resume,
+        verify=not args.skip_verify,
     )
 
 
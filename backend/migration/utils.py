@@ -1,5 +1,12 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+import uuid
 import warnings
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import requests
 from qdrant_client.client_base import QdrantBase
@@ -8,6 +15,10 @@ from tqdm import tqdm
 
 from backend.logger import logger
 
+# Point ids are uuids, so the id space is split into ranges of uuids. Qdrant orders integer ids
+# before uuids, the first worker also migrates those
+UUID_SPACE_SIZE = 2**128
+
 
 def get_collection(backend_url: str, collection_name: str, type: str = "source"):
     # fetch collection from source
@@ -37,6 +48,10 @@ def migrate(
     destination_collection_name: str,
     batch_size: int = 100,
     same_qdrant: bool = False,
+    num_workers: int = 1,
+    state_path: Optional[str] = None,
+    resume: bool = False,
+    verify: bool = True,
 ) -> None:
     """
     Migrate collections from source client to destination client
@@ -48,6 +63,11 @@ def migrate(
         destination_collection_name (str): destination collection name.
         batch_size (int, optional): Batch size for scrolling and uploading vectors. Defaults to 100.
         same_qdrant (bool, optional): If both source and dest client point to same qdrant
+        num_workers (int, optional): Number of workers migrating disjoint id ranges in parallel. Defaults to 1.
+        state_path (Optional[str], optional): File recording the progress of every worker. Defaults to None.
+        resume (bool, optional): Continue an interrupted migration from the state file instead of
+            recreating the destination collection. Defaults to False.
+        verify (bool, optional): Compare checksums of every batch of source and destination. Defaults to True.
     """
     if _has_custom_shards(source_client, source_collection_name):
         raise ValueError(
@@ -60,11 +80,17 @@ def migrate(
             f"Destination collection name is same as source collection name. Renaming destination collection to {destination_collection_name}"
         )
 
-    _recreate_collection(
-        source_client=source_client,
-        dest_client=dest_client,
-        source_collection_name=source_collection_name,
-        destination_collection_name=destination_collection_name,
+    if not resume:
+        _recreate_collection(
+            source_client=source_client,
+            dest_client=dest_client,
+            source_collection_name=source_collection_name,
+            destination_collection_name=destination_collection_name,
+        )
+    state = MigrationState(
+        path=state_path,
+        num_workers=num_workers,
+        resume=resume,
     )
     _migrate_collection(
         source_client=source_client,
@@ -72,7 +98,17 @@ def migrate(
         source_collection_name=source_collection_name,
         destination_collection_name=destination_collection_name,
         batch_size=batch_size,
+        state=state,
     )
+    if verify:
+        _verify_collection(
+            source_client=source_client,
+            dest_client=dest_client,
+            source_collection_name=source_collection_name,
+            destination_collection_name=destination_collection_name,
+            batch_size=batch_size,
+            num_workers=state.num_workers,
+        )
 
 
 def _has_custom_shards(source_client: QdrantBase, collection_name: str) -> bool:
@@ -93,10 +129,20 @@ def _recreate_collection(
     src_config = src_collection_info.config
     src_payload_schema = src_collection_info.payload_schema
 
+    # Collections are created as an alias over a versioned physical collection, recreate that one
+    dest_alias_target = next(
+        (
+            alias.collection_name
+            for alias in dest_client.get_aliases().aliases
+            if alias.alias_name == destination_collection_name
+        ),
+        None,
+    )
+    physical_collection_name = dest_alias_target or destination_collection_name
     # delete destination collection only from qdrant that was created while creating metadata store entry
-    dest_client.delete_collection(destination_collection_name, timeout=300)
+    dest_client.delete_collection(physical_collection_name, timeout=300)
     dest_client.create_collection(
-        destination_collection_name,
+        physical_collection_name,
         vectors_config=src_config.params.vectors,
         sparse_vectors_config=src_config.params.sparse_vectors,
         shard_number=src_config.params.shard_number,
@@ -111,10 +157,20 @@ def _recreate_collection(
         quantization_config=src_config.quantization_config,
         timeout=300,
     )
+    if dest_alias_target is not None:
+        # Deleting the physical collection deleted its alias too
+        dest_client.update_collection_aliases(
+            change_aliases_operations=[
+                models.CreateAliasOperation(
+                    create_alias=models.CreateAlias(
+                        collection_name=physical_collection_name,
+                        alias_name=destination_collection_name,
+                    )
+                )
+            ]
+        )
 
-    _recreate_payload_schema(
-        dest_client, destination_collection_name, src_payload_schema
-    )
+    _recreate_payload_schema(dest_client, physical_collection_name, src_payload_schema)
 
 
 def _recreate_payload_schema(
@@ -132,45 +188,258 @@ def _recreate_payload_schema(
         )
 
 
+class MigrationState:
+    """
+    Progress of the workers of a migration: the scroll offset each of them continues from and
+    whether it is done. It is written to a JSON file after every uploaded batch, so an interrupted
+    migration resumes where its workers stopped. Batches are idempotent upserts, a batch uploaded
+    again on resume does no harm.
+    """
+
+    def __init__(self, path: Optional[str], num_workers: int, resume: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        self.workers: List[Dict[str, Any]] = [
+            {"offset": None, "done": False, "migrated": 0} for _ in range(num_workers)
+        ]
+        if resume:
+            if not path or not os.path.exists(path):
+                raise ValueError(f"No migration state found at {path} to resume from")
+            with open(path) as f:
+                # The id ranges depend on the number of workers, a resumed migration keeps it
+                self.workers = json.load(f)["workers"]
+            logger.info(
+                f"Resuming migration of {len(self.workers)} workers from {path}: "
+                f"{sum(worker['migrated'] for worker in self.workers)} points migrated"
+            )
+
+    @property
+    def num_workers(self) -> int:
+        return len(self.workers)
+
+    def update(self, worker_index: int, offset: Any, done: bool, migrated: int):
+        with self._lock:
+            worker = self.workers[worker_index]
+            worker["offset"] = offset
+            worker["done"] = done
+            worker["migrated"] += migrated
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump({"workers": self.workers}, f)
+                os.replace(tmp_path, self.path)
+
+
+def _get_id_ranges(num_workers: int) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Splits the id space into `num_workers` ranges of (start offset, exclusive end), as uuids
+    """
+    boundaries = [
+        str(uuid.UUID(int=i * UUID_SPACE_SIZE // num_workers))
+        for i in range(1, num_workers)
+    ]
+    starts = [None] + boundaries
+    ends = boundaries + [None]
+    return list(zip(starts, ends))
+
+
+def _id_key(point_id: Union[int, str]) -> Tuple[int, int]:
+    """Order of point ids in Qdrant: integer ids first, then uuids"""
+    if isinstance(point_id, int):
+        return (0, point_id)
+    return (1, uuid.UUID(str(point_id)).int)
+
+
+def _scroll_range(
+    client: QdrantBase,
+    collection_name: str,
+    offset: Optional[Any],
+    end: Optional[str],
+    batch_size: int,
+):
+    """
+    Yields (records, next offset) batches of the id range from `offset` up to `end`, next offset
+    being None once the range is exhausted
+    """
+    end_key = _id_key(end) if end is not None else None
+    while True:
+        records, next_offset = client.scroll(
+            collection_name,
+            offset=offset,
+            limit=batch_size,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if end_key is not None:
+            records = [record for record in records if _id_key(record.id) < end_key]
+            if next_offset is not None and _id_key(next_offset) >= end_key:
+                next_offset = None
+        yield records, next_offset
+        if next_offset is None:
+            return
+        offset = next_offset
+
+
 def _migrate_collection(
     source_client: QdrantBase,
     dest_client: QdrantBase,
     source_collection_name: str,
     destination_collection_name: str,
     batch_size: int = 100,
+    state: Optional[MigrationState] = None,
 ) -> None:
     """Migrate collection from source client to destination client
 
+    Every worker scrolls its own range of ids and uploads the batches, recording its offset once
+    the destination acknowledged a batch as applied, so a resumed migration never skips a batch
+    that was lost. Once all workers are done, the vector counts are compared.
+
     Args:
         source_collection_name (str): Collection name of source
         destination_collection_name (str): Collection name of destination
         source_client (QdrantBase): Source client
         dest_client (QdrantBase): Destination client
         batch_size (int, optional): Batch size for scrolling and uploading vectors. Defaults to 100.
+        state (Optional[MigrationState], optional): Progress of the workers. Defaults to a single worker.
     """
-    records, next_offset = source_client.scroll(
-        source_collection_name, limit=2, with_vectors=True
+    state = state or MigrationState(path=None, num_workers=1)
+    source_client_vectors_count = source_client.count(source_collection_name).count
+    progress = tqdm(
+        total=source_client_vectors_count,
+        initial=sum(worker["migrated"] for worker in state.workers),
+        unit="points",
     )
-    dest_client.upload_points(destination_collection_name, records, wait=True)  # type: ignore
-
-    # upload_records has been deprecated due to the usage of models.Record; models.Record has been deprecated as a
-    # structure for uploading due to a `shard_key` field, and now is used only as a result structure.
-    # since shard_keys are not supported in migration, we can safely type ignore here and use Records for uploading
 
-    while next_offset is not None:
-        records, next_offset = tqdm(
-            source_client.scroll(
-                source_collection_name,
+    def _migrate_range(worker_index: int, end: Optional[str]):
+        worker = state.workers[worker_index]
+        if worker["done"]:
+            return
+        for records, next_offset in _scroll_range(
+            client=source_client,
+            collection_name=source_collection_name,
+            offset=worker["offset"],
+            end=end,
+            batch_size=batch_size,
+        ):
+            if records:
+                # upload_records has been deprecated due to the usage of models.Record; models.Record has been
+                # deprecated as a structure for uploading due to a `shard_key` field, and now is used only as a
+                # result structure. since shard_keys are not supported in migration, we can safely type ignore
+                # here and use Records for uploading
+                dest_client.upload_points(
+                    destination_collection_name,
+                    records,  # type: ignore
+                    batch_size=batch_size,
+                    # The offset below is only recorded once the batch is applied
+                    wait=True,
+                )
+            state.update(
+                worker_index,
                 offset=next_offset,
-                limit=batch_size,
-                with_vectors=True,
+                done=next_offset is None,
+                migrated=len(records),
             )
-        )
-        dest_client.upload_points(destination_collection_name, records, wait=True)
-    source_client_vectors_count = source_client.count(source_collection_name).count
-    dest_client_vectors_count = dest_client.count(destination_collection_name).count
+            progress.update(len(records))
+
+    id_ranges = _get_id_ranges(state.num_workers)
+    with ThreadPoolExecutor(max_workers=state.num_workers) as executor:
+        futures = [
+            executor.submit(_migrate_range, worker_index, end)
+            for worker_index, (_, end) in enumerate(id_ranges)
+        ]
+        for future in futures:
+            future.result()
+    progress.close()
+
+    dest_client_vectors_count = dest_client.count(
+        destination_collection_name, exact=True
+    ).count
 
     if source_client_vectors_count != dest_client_vectors_count:
         warnings.warn(
             f"Migration completed, but vector counts are not equal, source vectors count: {source_client_vectors_count}, dest vectors count: {dest_client_vectors_count}. You may want to delete the destination collection and try again."
         )
+
+
+def _get_batch_checksum(records: List[models.Record]) -> str:
+    """
+    Checksum of the ids, payloads and vectors of a batch. Vectors are hashed as float32, the
+    precision Qdrant stores them in, so the transport protocol does not matter
+    """
+    checksum = hashlib.blake2b(digest_size=16)
+    for record in sorted(records, key=lambda record: _id_key(record.id)):
+        checksum.update(str(record.id).encode("utf-8"))
+        checksum.update(json.dumps(record.payload, sort_keys=True).encode("utf-8"))
+        vectors = record.vector
+        if not isinstance(vectors, dict):
+            vectors = {"": vectors}
+        for name in sorted(vectors):
+            vector = vectors[name]
+            checksum.update(name.encode("utf-8"))
+            if isinstance(vector, models.SparseVector):
+                checksum.update(
+                    struct.pack(f"<{len(vector.indices)}I", *vector.indices)
+                )
+                vector = vector.values
+            checksum.update(struct.pack(f"<{len(vector)}f", *vector))
+    return checksum.hexdigest()
+
+
+def _verify_collection(
+    source_client: QdrantBase,
+    dest_client: QdrantBase,
+    source_collection_name: str,
+    destination_collection_name: str,
+    batch_size: int = 100,
+    num_workers: int = 1,
+) -> None:
+    """
+    Scrolls the source over the same id ranges as the migration, in parallel, and compares the
+    checksum of every batch with the checksum of the same points retrieved from the destination
+    """
+    logger.info("Verifying migrated points...")
+    progress = tqdm(
+        total=source_client.count(source_collection_name).count, unit="points"
+    )
+
+    def _verify_range(start: Optional[str], end: Optional[str]) -> List[Any]:
+        mismatched_offsets = []
+        offset = start
+        for source_records, next_offset in _scroll_range(
+            client=source_client,
+            collection_name=source_collection_name,
+            offset=start,
+            end=end,
+            batch_size=batch_size,
+        ):
+            destination_records = dest_client.retrieve(
+                destination_collection_name,
+                ids=[record.id for record in source_records],
+                with_payload=True,
+                with_vectors=True,
+            )
+            if _get_batch_checksum(source_records) != _get_batch_checksum(
+                destination_records
+            ):
+                mismatched_offsets.append(offset)
+            progress.update(len(source_records))
+            offset = next_offset
+        return mismatched_offsets
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        mismatched_offsets = [
+            offset
+            for offsets in executor.map(
+                lambda id_range: _verify_range(*id_range), _get_id_ranges(num_workers)
+            )
+            for offset in offsets
+        ]
+    progress.close()
+    if mismatched_offsets:
+        warnings.warn(
+            f"Verification failed for {len(mismatched_offsets)} batches of {batch_size} points, "
+            f"starting at offsets {mismatched_offsets[:10]}. Resume the migration or migrate again."
+        )
+    else:
+        logger.info("Verified all migrated points")
@@ -0,0 +1,269 @@
+# This script migrates a collection between any two vector db providers,
+# e.g. qdrant -> singlestore or qdrant -> embedded, copying the stored vectors without embedding again
+"""
+How to run:
+
+python -m backend.migration.vector_db_migration \
+--source_provider qdrant \
+--source_url http://localhost:6333 \
+--source_collection_name creditcard \
+--destination_provider embedded \
+--destination_collection_name creditcard
+
+Add --source_api_key / --destination_api_key if the vector dbs need one
+Add --source_config / --destination_config to pass the provider config as JSON, e.g. '{"path": "./embedded_vector_db"}'
+Add --source_local / --destination_local for a local qdrant
+Add --batch_size to set the number of vectors read and written at a time
+Add --queue_size to set the number of batches read ahead of the writes
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from typing import List, Optional
+
+from langchain.embeddings.base import Embeddings
+from tqdm import tqdm
+
+from backend.logger import logger
+from backend.modules.vector_db import get_vector_db_client
+from backend.modules.vector_db.base import BaseVectorDB
+from backend.types.core import VectorDBConfig, VectorIndexConfig, VectorRecord
+
+# Marks the end of the source stream in the queue of batches
+_END_OF_STREAM = None
+
+
+class _VectorSizeEmbeddings(Embeddings):
+    """
+    Stands in for the embedder when creating the destination collection, which only
+    embeds a dummy document to learn the vector size
+    """
+
+    def __init__(self, vector_size: int):
+        self.vector_size = vector_size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [[0.0] * self.vector_size for _ in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return [0.0] * self.vector_size
+
+
+def create_collection_if_not_exists(
+    client: BaseVectorDB,
+    collection_name: str,
+    vector_size: int,
+    vector_index_config: Optional[VectorIndexConfig] = None,
+):
+    if collection_name in (client.get_collections() or []):
+        return
+    logger.info(
+        f"Creating collection {collection_name} with vectors of size {vector_size}"
+    )
+    client.create_collection(
+        collection_name=collection_name,
+        embeddings=_VectorSizeEmbeddings(vector_size),
+        vector_index_config=vector_index_config,
+    )
+
+
+def get_batch_size_in_bytes(vector_records: List[VectorRecord]) -> int:
+    """Vectors as float32, texts and metadata as UTF-8 JSON"""
+    return sum(
+        4 * len(record.vector)
+        + len(record.page_content.encode("utf-8"))
+        + len(json.dumps(record.metadata, default=str).encode("utf-8"))
+        for record in vector_records
+    )
+
+
+def migrate(
+    source_client: BaseVectorDB,
+    dest_client: BaseVectorDB,
+    source_collection_name: str,
+    destination_collection_name: str,
+    batch_size: int = 1000,
+    queue_size: int = 4,
+    vector_index_config: Optional[VectorIndexConfig] = None,
+) -> None:
+    """
+    Streams the vectors of a collection from one vector db into another, as stored, without
+    embedding them again. Batches are read in a background thread, at most `queue_size` ahead
+    of the writes, so memory use is bounded by about (queue_size + 2) batches.
+
+    Args:
+        source_client (BaseVectorDB): Vector db to read from
+        dest_client (BaseVectorDB): Vector db to write to
+        source_collection_name (str): Collection to migrate
+        destination_collection_name (str): Collection to write to, created if it does not exist
+        batch_size (int, optional): Number of vectors read and written at a time. Defaults to 1000.
+        queue_size (int, optional): Number of batches read ahead of the writes. Defaults to 4.
+        vector_index_config (Optional[VectorIndexConfig], optional): Index settings of the
+            destination collection, if it is created. Defaults to None.
+    """
+    batches: queue.Queue = queue.Queue(maxsize=queue_size)
+    read_error: List[BaseException] = []
+    stop_reading = threading.Event()
+
+    def _read():
+        try:
+            for vector_records in source_client.iter_vector_records(
+                collection_name=source_collection_name, batch_size=batch_size
+            ):
+                if stop_reading.is_set():
+                    return
+                if vector_records:
+                    batches.put(vector_records)
+        except BaseException as e:
+            read_error.append(e)
+        finally:
+            batches.put(_END_OF_STREAM)
+
+    reader = threading.Thread(target=_read, daemon=True)
+    reader.start()
+
+    migrated_count, migrated_bytes = 0, 0
+    started_at = time.time()
+    progress = tqdm(unit="points")
+    try:
+        collection_created = False
+        while True:
+            vector_records = batches.get()
+            if vector_records is _END_OF_STREAM:
+                break
+            if not collection_created:
+                create_collection_if_not_exists(
+                    client=dest_client,
+                    collection_name=destination_collection_name,
+                    vector_size=len(vector_records[0].vector),
+                    vector_index_config=vector_index_config,
+                )
+                collection_created = True
+            dest_client.upsert_vector_records(
+                collection_name=destination_collection_name,
+                vector_records=vector_records,
+            )
+            migrated_count += len(vector_records)
+            migrated_bytes += get_batch_size_in_bytes(vector_records)
+            elapsed = max(time.time() - started_at, 1e-6)
+            progress.update(len(vector_records))
+            progress.set_postfix(
+                MB=round(migrated_bytes / 2**20, 1),
+                MB_per_second=round(migrated_bytes / 2**20 / elapsed, 2),
+            )
+    finally:
+        stop_reading.set()
+        progress.close()
+    if read_error:
+        raise read_error[0]
+    dest_client.flush_collection(collection_name=destination_collection_name)
+
+    elapsed = max(time.time() - started_at, 1e-6)
+    logger.info(
+        f"Migrated {migrated_count} vectors ({migrated_bytes / 2**20:.1f} MB) from "
+        f"{source_collection_name} to {destination_collection_name} in {elapsed:.1f}s: "
+        f"{migrated_count / elapsed:.1f} vectors/s, {migrated_bytes / 2**20 / elapsed:.2f} MB/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Migrate a collection between vector db providers without embedding it again"
+    )
+
+    for side in ("source", "destination"):
+        parser.add_argument(
+            f"--{side}_provider",
+            type=str,
+            help=f"{side.capitalize()} vector db provider, e.g. qdrant, singlestore, weaviate or embedded",
+            required=True,
+        )
+        parser.add_argument(
+            f"--{side}_url",
+            type=str,
+            help=f"{side.capitalize()} vector db url",
+            required=False,
+            default=None,
+        )
+        parser.add_argument(
+            f"--{side}_api_key",
+            type=str,
+            help=f"{side.capitalize()} vector db api key",
+            required=False,
+            default=None,
+        )
+        parser.add_argument(
+            f"--{side}_config",
+            type=json.loads,
+            help=f"{side.capitalize()} vector db provider config as JSON",
+            required=False,
+            default=None,
+        )
+        parser.add_argument(
+            f"--{side}_local",
+            help=f"{side.capitalize()} vector db is local",
+            required=False,
+            action="store_true",
+        )
+        parser.add_argument(
+            f"--{side}_collection_name",
+            type=str,
+            help=f"{side.capitalize()} collection name",
+            required=True,
+        )
+    parser.add_argument(
+        "--vector_index_config",
+        type=json.loads,
+        help="Index settings of the destination collection as JSON, if it is created",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        help="Number of vectors read and written at a time",
+        required=False,
+        default=1000,
+    )
+    parser.add_argument(
+        "--queue_size",
+        type=int,
+        help="Number of batches read ahead of the writes",
+        required=False,
+        default=4,
+    )
+
+    args = parser.parse_args()
+
+    source_client, dest_client = (
+        get_vector_db_client(
+            config=VectorDBConfig(
+                provider=getattr(args, f"{side}_provider"),
+                local=getattr(args, f"{side}_local"),
+                url=getattr(args, f"{side}_url"),
+                api_key=getattr(args, f"{side}_api_key"),
+                config=getattr(args, f"{side}_config") or {},
+            )
+        )
+        for side in ("source", "destination")
+    )
+    migrate(
+        source_client=source_client,
+        dest_client=dest_client,
+        source_collection_name=args.source_collection_name,
+        destination_collection_name=args.destination_collection_name,
+        batch_size=args.batch_size,
+        queue_size=args.queue_size,
+        vector_index_config=(
+            VectorIndexConfig.model_validate(args.vector_index_config)
+            if args.vector_index_config
+            else None
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
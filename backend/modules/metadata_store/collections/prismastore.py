@@ -1,6 +1,8 @@
 from backend.types.collection import (
     CreateCollectionDataIngestionRun,
     CollectionDataIngestionRun,
+    CollectionDataIngestionRunCheckpoint,
+    CollectionDataIngestionRunProgress,
 )
 from backend.types.core import (
     DataIngestionRunStatus,Collection
@@ -90,6 +92,21 @@ class CollectionPrismaStore(PrismaStore):
             logger.exception(f"Error: {e}")
             raise HTTPException(status_code=500, detail=f"Error: {e}")
 
+    async def aget_collection_by_name(self, collection_name: str) -> Optional[Collection]:
+        """Get a collection regardless of its owner, for maintenance jobs"""
+        try:
+            collection: Optional["PrismaCollection"] = await self.db.collection.find_first(
+                where={"name": collection_name}
+            )
+            if collection:
+                return Collection.model_validate(collection.model_dump())
+            return None
+        except Exception as e:
+            logger.exception(f"Failed to get collection by name: {e}")
+            raise HTTPException(
+                status_code=500, detail="Failed to get collection by name"
+            )
+
     async def aget_retrieve_collection_by_name_and_user(
         self, user: dict, collection_name: str, no_cache: bool = True
     ) -> Optional[Collection]:
@@ -135,6 +152,9 @@ class CollectionPrismaStore(PrismaStore):
                     _deleted_count = await self.db.collectioningestionruns.delete_many(
                         where={"collection_name": collection_name}
                     )
+                    _deleted_count = await self.db.collectioningestionruncheckpoints.delete_many(
+                        where={"collection_name": collection_name}
+                    )
                 except Exception as e:
                     logger.exception(f"Failed to delete data ingestion runs: {e}")
         except Exception as e:
@@ -336,11 +356,19 @@ class CollectionPrismaStore(PrismaStore):
             data_ingestion_mode=data_ingestion_run.data_ingestion_mode,
             status=DataIngestionRunStatus.INITIALIZED,
             raise_error_on_failure=data_ingestion_run.raise_error_on_failure,
+            parent_data_ingestion_run_name=data_ingestion_run.parent_data_ingestion_run_name,
+            fan_out_config=data_ingestion_run.fan_out_config,
         )
 
         try:
-            run_data = created_data_ingestion_run.model_dump()
+            run_data = created_data_ingestion_run.model_dump(
+                exclude={"progress", "fan_out_config"}
+            )
             run_data["parser_config"] = json.dumps(run_data["parser_config"])
+            if created_data_ingestion_run.fan_out_config is not None:
+                run_data["fan_out_config"] = (
+                    created_data_ingestion_run.fan_out_config.model_dump_json()
+                )
             data_ingestion_run: "PrismaCollectionDataIngestionRun" = (
                 await self.db.collectioningestionruns.create(data=run_data)
             )
@@ -393,6 +421,31 @@ class CollectionPrismaStore(PrismaStore):
             logger.exception(f"Failed to update data ingestion run status: {e}")
             raise HTTPException(status_code=500, detail=f"{e}")
 
+    async def aupdate_data_ingestion_run_progress(
+        self,
+        data_ingestion_run_name: str,
+        progress: CollectionDataIngestionRunProgress,
+        status: Optional[DataIngestionRunStatus] = None,
+    ) -> None:
+        """Update the progress, and optionally the status, of a data ingestion run in one write"""
+        data = {"progress": progress.model_dump_json()}
+        if status is not None:
+            data["status"] = status
+        try:
+            updated_data_ingestion_run: Optional[
+                "PrismaCollectionDataIngestionRun"
+            ] = await self.db.collectioningestionruns.update(
+                where={"name": data_ingestion_run_name}, data=data
+            )
+            if not updated_data_ingestion_run:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Failed to update ingestion run {data_ingestion_run_name!r}. No such record found",
+                )
+        except Exception as e:
+            logger.exception(f"Failed to update data ingestion run progress: {e}")
+            raise HTTPException(status_code=500, detail=f"{e}")
+
     async def alog_errors_for_data_ingestion_run(
         self, data_ingestion_run_name: str, errors: Dict[str, Any]
     ) -> None:
@@ -432,3 +485,87 @@ class CollectionPrismaStore(PrismaStore):
         except Exception as e:
             logger.exception(f"Failed to get data ingestion runs: {e}")
             raise HTTPException(status_code=500, detail=f"{e}")
+
+    async def aget_child_data_ingestion_runs(
+        self, parent_data_ingestion_run_name: str
+    ) -> List[CollectionDataIngestionRun]:
+        """Get the per data source runs of a parent data ingestion run"""
+        try:
+            data_ingestion_runs: List[
+                "PrismaCollectionDataIngestionRun"
+            ] = await self.db.collectioningestionruns.find_many(
+                where={"parent_data_ingestion_run_name": parent_data_ingestion_run_name},
+                order={"id": "asc"},
+            )
+            return [
+                CollectionDataIngestionRun.model_validate(data_ir.model_dump())
+                for data_ir in data_ingestion_runs
+            ]
+        except Exception as e:
+            logger.exception(f"Failed to get child data ingestion runs: {e}")
+            raise HTTPException(status_code=500, detail=f"{e}")
+
+    async def acreate_data_ingestion_run_checkpoint(
+        self,
+        collection_name: str,
+        data_ingestion_run_name: str,
+        data_point_fqn_to_hash: Dict[str, str],
+        loader_cursor: int,
+    ) -> None:
+        """Record a batch of data points ingested by the given data ingestion run"""
+        try:
+            await self.db.collectioningestionruncheckpoints.create(
+                data={
+                    "collection_name": collection_name,
+                    "data_ingestion_run_name": data_ingestion_run_name,
+                    "data_point_fqn_to_hash": json.dumps(data_point_fqn_to_hash),
+                    "loader_cursor": loader_cursor,
+                }
+            )
+        except Exception as e:
+            logger.exception(
+                f"Failed to create checkpoint for data ingestion run {data_ingestion_run_name}: {e}"
+            )
+            raise HTTPException(status_code=500, detail=f"{e}")
+
+    async def aget_data_ingestion_run_checkpoint(
+        self, data_ingestion_run_name: str
+    ) -> CollectionDataIngestionRunCheckpoint:
+        """Get the combined checkpoint of all batches ingested by the given data ingestion run"""
+        try:
+            checkpoints: List[
+                "PrismaCollectionIngestionRunCheckpoints"
+            ] = await self.db.collectioningestionruncheckpoints.find_many(
+                where={"data_ingestion_run_name": data_ingestion_run_name},
+                order={"id": "asc"},
+            )
+            checkpoint = CollectionDataIngestionRunCheckpoint(
+                data_ingestion_run_name=data_ingestion_run_name
+            )
+            for batch_checkpoint in checkpoints:
+                checkpoint.data_point_fqn_to_hash.update(
+                    batch_checkpoint.data_point_fqn_to_hash
+                )
+                checkpoint.loader_cursor = max(
+                    checkpoint.loader_cursor, batch_checkpoint.loader_cursor
+                )
+            return checkpoint
+        except Exception as e:
+            logger.exception(
+                f"Failed to get checkpoint for data ingestion run {data_ingestion_run_name}: {e}"
+            )
+            raise HTTPException(status_code=500, detail=f"{e}")
+
+    async def adelete_data_ingestion_run_checkpoint(
+        self, data_ingestion_run_name: str
+    ) -> None:
+        """Delete the checkpoint of a data ingestion run once it is no longer needed"""
+        try:
+            await self.db.collectioningestionruncheckpoints.delete_many(
+                where={"data_ingestion_run_name": data_ingestion_run_name}
+            )
+        except Exception as e:
+            logger.exception(
+                f"Failed to delete checkpoint for data ingestion run {data_ingestion_run_name}: {e}"
+            )
+            raise HTTPException(status_code=500, detail=f"{e}")
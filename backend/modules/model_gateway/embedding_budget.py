@@ -0,0 +1,70 @@
+import asyncio
+import threading
+from typing import List
+
+from langchain.embeddings.base import Embeddings
+
+from backend.utils import run_in_executor
+
+
+class EmbeddingBudget:
+    """
+    Caps the number of embedding requests in flight across everything sharing the budget,
+    e.g. all data sources of a collection ingested concurrently.
+    Usable from the event loop and from executor threads alike.
+    """
+
+    def __init__(self, max_concurrent_requests: int):
+        self.max_concurrent_requests = max_concurrent_requests
+        self._semaphore = threading.BoundedSemaphore(max_concurrent_requests)
+
+    def acquire(self):
+        self._semaphore.acquire()
+
+    async def aacquire(self):
+        # Do not block the event loop while waiting for a slot
+        if self._semaphore.acquire(blocking=False):
+            return
+        acquiring = asyncio.ensure_future(
+            run_in_executor(None, self._semaphore.acquire)
+        )
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The waiting thread cannot be interrupted, give the slot back once it gets it
+            acquiring.add_done_callback(lambda _: self.release())
+            raise
+
+    def release(self):
+        self._semaphore.release()
+
+
+class BudgetedEmbeddings(Embeddings):
+    """
+    Embeddings that take a slot of the shared embedding budget for every document request.
+    Queries are not throttled.
+    """
+
+    def __init__(self, embeddings: Embeddings, budget: EmbeddingBudget):
+        self.embeddings = embeddings
+        self.budget = budget
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.budget.acquire()
+        try:
+            return self.embeddings.embed_documents(texts)
+        finally:
+            self.budget.release()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await self.budget.aacquire()
+        try:
+            return await self.embeddings.aembed_documents(texts)
+        finally:
+            self.budget.release()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.embeddings.aembed_query(text)
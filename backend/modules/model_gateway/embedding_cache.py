@@ -0,0 +1,257 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Dict, List, Optional
+
+from langchain.embeddings.base import Embeddings
+
+from backend.logger import logger
+from backend.types.core import EmbeddingCacheConfig
+from backend.utils import run_in_executor
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes chunk text before hashing, so texts that only differ in unicode
+    representation or surrounding whitespace share a cache entry
+    """
+    return unicodedata.normalize("NFC", text).strip()
+
+
+def get_text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content addressed, on disk embedding cache backed by SQLite.
+
+    Entries are keyed by (embedder name, hash of normalized text), so identical chunks
+    are embedded once per embedder across collections and ingestion runs. Least recently
+    used entries are evicted once the entry count or size limit is exceeded. Hit / miss
+    counters are persisted next to the entries so they are shared by all processes.
+    """
+
+    def __init__(self, config: EmbeddingCacheConfig):
+        self.config = config
+        directory = os.path.dirname(os.path.abspath(config.path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Connection is shared by executor threads, access is serialized by the lock
+        self._conn = sqlite3.connect(
+            config.path, check_same_thread=False, timeout=30, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                embedder TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_accessed REAL NOT NULL,
+                PRIMARY KEY (embedder, text_hash)
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_accessed ON embeddings (last_accessed)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+        # Keep entry count and total size up to date so eviction checks do not scan the
+        # table
+        self._conn.executescript(
+            """
+            INSERT OR IGNORE INTO counters (name, value) VALUES ('entries', 0), ('size_bytes', 0);
+            CREATE TRIGGER IF NOT EXISTS embeddings_insert AFTER INSERT ON embeddings BEGIN
+                UPDATE counters SET value = value + 1 WHERE name = 'entries';
+                UPDATE counters SET value = value + new.size WHERE name = 'size_bytes';
+            END;
+            CREATE TRIGGER IF NOT EXISTS embeddings_delete AFTER DELETE ON embeddings BEGIN
+                UPDATE counters SET value = value - 1 WHERE name = 'entries';
+                UPDATE counters SET value = value - old.size WHERE name = 'size_bytes';
+            END;
+            CREATE TRIGGER IF NOT EXISTS embeddings_update AFTER UPDATE OF size ON embeddings BEGIN
+                UPDATE counters SET value = value + new.size - old.size WHERE name = 'size_bytes';
+            END;
+            """
+        )
+
+    def get_many(self, embedder: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Returns the cached vector for every text, None for misses
+        """
+        text_hashes = [get_text_hash(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        unique_hashes = list(set(text_hashes))
+        with self._lock:
+            # Stay well below SQLite's limit on host parameters
+            for i in range(0, len(unique_hashes), 500):
+                batch = unique_hashes[i : i + 500]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE embedder = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [embedder, *batch],
+                ).fetchall()
+                for text_hash, vector in rows:
+                    found[text_hash] = array("f", vector).tolist()
+            now = time.time()
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "UPDATE embeddings SET last_accessed = ? WHERE embedder = ? AND text_hash = ?",
+                [(now, embedder, text_hash) for text_hash in found],
+            )
+            hits = sum(1 for text_hash in text_hashes if text_hash in found)
+            self._increment("hits", hits)
+            self._increment("misses", len(text_hashes) - hits)
+            self._conn.execute("COMMIT")
+        return [found.get(text_hash) for text_hash in text_hashes]
+
+    def put_many(self, embedder: str, texts: List[str], vectors: List[List[float]]):
+        """
+        Stores vectors for the given texts and evicts least recently used entries if
+        over the limits
+        """
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            blob = array("f", vector).tobytes()
+            rows.append((embedder, get_text_hash(text), blob, len(blob), now))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT INTO embeddings (embedder, text_hash, vector, size, last_accessed) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(embedder, text_hash) DO UPDATE SET "
+                "vector = excluded.vector, size = excluded.size, last_accessed = excluded.last_accessed",
+                rows,
+            )
+            self._evict()
+            self._conn.execute("COMMIT")
+
+    def _increment(self, name: str, value: int):
+        if value:
+            self._conn.execute(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, value),
+            )
+
+    def _evict(self):
+        counters = self._get_counters()
+        entries, size = counters.get("entries", 0), counters.get("size_bytes", 0)
+        excess_entries = max(0, entries - self.config.max_entries)
+        excess_size = max(0, size - self.config.max_size_bytes)
+        if not excess_entries and not excess_size:
+            return
+        # Walk entries from least recently used until both limits are met. Exactly the
+        # entries walked are deleted, entries sharing the last timestamp, e.g. a batch
+        # just stored, stay
+        evicted_rowids = []
+        evicted_size = 0
+        cursor = self._conn.execute(
+            "SELECT rowid, size FROM embeddings ORDER BY last_accessed"
+        )
+        for rowid, entry_size in cursor:
+            evicted_rowids.append(rowid)
+            evicted_size += entry_size
+            if len(evicted_rowids) >= excess_entries and evicted_size >= excess_size:
+                break
+        cursor.close()
+        deleted = 0
+        for i in range(0, len(evicted_rowids), 500):
+            batch = evicted_rowids[i : i + 500]
+            deleted += self._conn.execute(
+                f"DELETE FROM embeddings WHERE rowid IN ({','.join('?' * len(batch))})",
+                batch,
+            ).rowcount
+        self._increment("evictions", deleted)
+        logger.debug(f"[EmbeddingCache] Evicted {deleted} entries")
+
+    def _get_counters(self) -> Dict[str, int]:
+        return dict(self._conn.execute("SELECT name, value FROM counters"))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counters = self._get_counters()
+        return {
+            "entries": counters.get("entries", 0),
+            "size_bytes": counters.get("size_bytes", 0),
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings that look documents up in the embedding cache and only send
+    the misses to the wrapped embedder. Queries are never cached.
+    """
+
+    def __init__(
+        self, embeddings: Embeddings, embedder_name: str, cache: EmbeddingCache
+    ):
+        self.embeddings = embeddings
+        self.embedder_name = embedder_name
+        self.cache = cache
+
+    def _get_misses(self, texts: List[str]):
+        vectors = self.cache.get_many(self.embedder_name, texts)
+        # Texts sharing a cache key are embedded only once
+        missing_indices_by_hash: Dict[str, List[int]] = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing_indices_by_hash.setdefault(get_text_hash(texts[i]), []).append(
+                    i
+                )
+        return vectors, list(missing_indices_by_hash.values())
+
+    def _fill_misses(self, texts, vectors, missing_indices, missing_vectors):
+        self.cache.put_many(
+            self.embedder_name,
+            [texts[indices[0]] for indices in missing_indices],
+            missing_vectors,
+        )
+        for indices, vector in zip(missing_indices, missing_vectors):
+            for i in indices:
+                vectors[i] = vector
+        logger.debug(
+            f"[EmbeddingCache] {self.embedder_name}: {len(texts)} texts, {len(missing_indices)} embedded"
+        )
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors, missing_indices = self._get_misses(texts)
+        missing_vectors = (
+            self.embeddings.embed_documents(
+                [texts[indices[0]] for indices in missing_indices]
+            )
+            if missing_indices
+            else []
+        )
+        return self._fill_misses(texts, vectors, missing_indices, missing_vectors)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Cache lookups and writes are blocking SQLite calls, keep them off the event
+        # loop
+        vectors, missing_indices = await run_in_executor(None, self._get_misses, texts)
+        missing_vectors = (
+            await self.embeddings.aembed_documents(
+                [texts[indices[0]] for indices in missing_indices]
+            )
+            if missing_indices
+            else []
+        )
+        return await run_in_executor(
+            None, self._fill_misses, texts, vectors, missing_indices, missing_vectors
+        )
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.embeddings.aembed_query(text)
@@ -1,5 +1,6 @@
 import os
-from typing import List
+import threading
+from typing import Dict, List, Optional
 
 import yaml
 from langchain.embeddings.base import Embeddings
@@ -9,6 +10,10 @@ from langchain_openai.chat_models import ChatOpenAI
 
 from backend.logger import logger
 from backend.modules.model_gateway.audio_processing_svc import AudioProcessingSvc
+from backend.modules.model_gateway.embedding_cache import (
+    CachedEmbeddings,
+    EmbeddingCache,
+)
 from backend.modules.model_gateway.reranker_svc import InfinityRerankerSvc
 from backend.settings import settings
 from backend.types.core import ModelConfig, ModelProviderConfig, ModelType
@@ -43,6 +48,18 @@ class ModelGateway:
         # load audio processing models
         self.audio_models: List[ModelConfig] = []
 
+        # embeddings of documents are looked up here before calling the embedding models
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        if settings.EMBEDDING_CACHE_CONFIG:
+            logger.info(
+                f"Using embedding cache at {settings.EMBEDDING_CACHE_CONFIG.path}"
+            )
+            self.embedding_cache = EmbeddingCache(settings.EMBEDDING_CACHE_CONFIG)
+
+        # embedders are built once per model and shared, together with their HTTP clients
+        self._embedders: Dict[str, Embeddings] = {}
+        self._embedders_lock = threading.Lock()
+
         for provider_config in self.provider_configs:
             if provider_config.api_key_env_var and not os.environ.get(
                 provider_config.api_key_env_var
@@ -113,6 +130,15 @@ class ModelGateway:
         return self.audio_models
 
     def get_embedder_from_model_config(self, model_name: str) -> Embeddings:
+        embeddings = self._embedders.get(model_name)
+        if embeddings is not None:
+            return embeddings
+        with self._embedders_lock:
+            if model_name not in self._embedders:
+                self._embedders[model_name] = self._create_embedder(model_name)
+            return self._embedders[model_name]
+
+    def _create_embedder(self, model_name: str) -> Embeddings:
         if model_name not in self.model_name_to_provider_config:
             raise ValueError(f"Model {model_name} not registered in the model gateway.")
         model_provider_config: ModelProviderConfig = self.model_name_to_provider_config[
@@ -123,7 +149,7 @@ class ModelGateway:
         else:
             api_key = os.environ.get(model_provider_config.api_key_env_var, "")
         model_id = "/".join(model_name.split("/")[1:])
-        return OpenAIEmbeddings(
+        embeddings = OpenAIEmbeddings(
             openai_api_key=api_key,
             model=model_id,
             openai_api_base=model_provider_config.base_url,
@@ -131,6 +157,15 @@ class ModelGateway:
                 model_provider_config.provider_name == "openai"
             ),
         )
+        if self.embedding_cache is not None:
+            # Every vector db backend embeds documents through `embed_documents`,
+            # so wrapping the embedder lets all of them consult the cache
+            return CachedEmbeddings(
+                embeddings=embeddings,
+                embedder_name=model_name,
+                cache=self.embedding_cache,
+            )
+        return embeddings
 
     def get_llm_from_model_config(
         self, model_config: ModelConfig, stream=False
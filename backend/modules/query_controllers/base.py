@@ -18,7 +18,7 @@ from backend.logger import logger
 from backend.modules.metadata_store.client import get_client
 from backend.modules.model_gateway.model_gateway import model_gateway
 from backend.modules.query_controllers.types import *
-from backend.modules.vector_db.client import VECTOR_STORE_CLIENT
+from backend.modules.vector_db.client import VECTOR_STORE_CLIENT, VECTOR_STORE_REGISTRY
 from backend.modules.graph.client import GRAPHRAG_STORE_CLIENT
 from backend.settings import settings
 from backend.types.core import ModelConfig
@@ -72,17 +72,20 @@ class BaseQueryController:
         if collection.owner_id != user_id:  # Assuming you have an owner_id field
             raise HTTPException(status_code=403, detail="Forbidden")
 
-        return VECTOR_STORE_CLIENT.get_vector_store(
+        return VECTOR_STORE_REGISTRY.get_vector_store(
             collection_name=collection.name,
-            embeddings=model_gateway.get_embedder_from_model_config(
-                model_name=collection.embedder_config.name
-            ),
+            embedder_name=collection.embedder_config.name,
         )
 
     def _get_vector_store_retriever(self, vector_store, retriever_config):
         """
         Get the vector store retriever
         """
+        if retriever_config.search_type == "hybrid":
+            return VECTOR_STORE_CLIENT.get_hybrid_retriever(
+                vector_store=vector_store,
+                search_kwargs=retriever_config.search_kwargs,
+            )
         return VectorStoreRetriever(
             vectorstore=vector_store,
             search_type=retriever_config.search_type,
@@ -13,6 +13,7 @@ from backend.modules.query_controllers.base import BaseQueryController
 from backend.modules.query_controllers.basic.payload import (
     QUERY_WITH_CONTEXTUAL_COMPRESSION_MULTI_QUERY_RETRIEVER_SIMILARITY_PAYLOAD,
     QUERY_WITH_CONTEXTUAL_COMPRESSION_RETRIEVER_PAYLOAD,
+    QUERY_WITH_VECTOR_STORE_RETRIEVER_HYBRID_PAYLOAD,
     QUERY_WITH_VECTOR_STORE_RETRIEVER_PAYLOAD,
 )
 from backend.modules.query_controllers.basic.types import BasicQueryInput
@@ -23,6 +24,7 @@ from langchain.schema.vectorstore import VectorStoreRetriever
 
 EXAMPLES = {
     "vector-store-similarity": QUERY_WITH_VECTOR_STORE_RETRIEVER_PAYLOAD,
+    "vector-store-hybrid": QUERY_WITH_VECTOR_STORE_RETRIEVER_HYBRID_PAYLOAD,
     "contextual-compression-similarity": QUERY_WITH_CONTEXTUAL_COMPRESSION_RETRIEVER_PAYLOAD,
     "contextual-compression-multi-query-similarity": QUERY_WITH_CONTEXTUAL_COMPRESSION_MULTI_QUERY_RETRIEVER_SIMILARITY_PAYLOAD,
 }
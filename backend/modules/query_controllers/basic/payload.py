@@ -74,6 +74,34 @@ QUERY_WITH_VECTOR_STORE_RETRIEVER_SIMILARITY_SCORE_PAYLOAD = {
 }
 #######
 
+QUERY_WITH_VECTOR_STORE_RETRIEVER_HYBRID = {
+    "collection_name": "creditcard",
+    "query": "What does error code E-4021 on the card reader mean?",
+    "model_configuration": {
+        "name": "openai/gpt-4o-mini",
+        "parameters": {"temperature": 0.1, "max_tokens": 1024},
+    },
+    "prompt_template": PROMPT,
+    "retriever_name": "vectorstore",
+    "retriever_config": {
+        "search_type": "hybrid",
+        "search_kwargs": {
+            "k": 8,
+            "fetch_k": 40,
+        },
+    },
+    "stream": False,
+}
+
+QUERY_WITH_VECTOR_STORE_RETRIEVER_HYBRID_PAYLOAD = {
+    "summary": "search with dense and keyword (BM25) hybrid",
+    "description": """
+        Requires k in search_kwargs, fetch_k candidates are taken from each ranking before fusion.
+        Requires a collection created with sparse_vectors enabled in its vector index config.""",
+    "value": QUERY_WITH_VECTOR_STORE_RETRIEVER_HYBRID,
+}
+#######
+
 QUERY_WITH_CONTEXTUAL_COMPRESSION_RETRIEVER = {
     "collection_name": "creditcard",
     "query": "Explain in detail different categories of credit cards",
@@ -2,6 +2,8 @@ from typing import Any, ClassVar, Dict, List, Optional, Sequence, Union
 
 from pydantic import Field, model_validator
 from qdrant_client.models import Filter as QdrantFilter
+from qdrant_client.models import QuantizationSearchParams as QdrantQuantizationSearchParams
+from qdrant_client.models import SearchParams as QdrantSearchParams
 
 from backend.types.core import ConfiguredBaseModel, ModelConfig
 
@@ -49,11 +51,12 @@ class VectorStoreRetrieverConfig(ConfiguredBaseModel):
     search_type: str = Field(
         default="similarity",
         title="""Defines the type of search that the Retriever should perform.
-Can be 'similarity' (default), 'none', 'mmr', or 'similarity_score_threshold'.
+Can be 'similarity' (default), 'none', 'mmr', 'similarity_score_threshold' or 'hybrid'.
     - "similarity": Retrieve the top k most similar documents to the query.,
     - "none": Retrieve by passing the query.,
     - "mmr": Retrieve the top k most similar documents to the query and then rerank them using Maximal Marginal Relevance (MMR).,
     - "similarity_score_threshold": Retrieve all documents with similarity score greater than a threshold.
+    - "hybrid": Retrieve the top k documents by fusing the fetch_k most similar documents with the fetch_k best BM25 keyword matches. Requires a collection with sparse vectors.
 """,
     )
 
@@ -64,11 +67,28 @@ Can be 'similarity' (default), 'none', 'mmr', or 'similarity_score_threshold'.
         title="""Filter by document metadata""",
     )
 
+    hnsw_ef: Optional[int] = Field(
+        default=None,
+        title="""Number of neighbours to visit while searching the HNSW graph.
+Higher is more accurate and slower. Uses the collection setting if not set.""",
+    )
+
+    quantization_oversampling: Optional[float] = Field(
+        default=None,
+        title="""Fetch `oversampling * k` candidates with quantized vectors before rescoring, e.g. 2.0""",
+    )
+
+    quantization_rescore: Optional[bool] = Field(
+        default=None,
+        title="""Rescore the candidates found with quantized vectors using the original vectors""",
+    )
+
     allowed_search_types: ClassVar[Sequence[str]] = (
         "similarity",
         "similarity_score_threshold",
         "none",
         "mmr",
+        "hybrid",
     )
 
     @model_validator(mode="before")
@@ -97,6 +117,9 @@ Can be 'similarity' (default), 'none', 'mmr', or 'similarity_score_threshold'.
                 "fetch_k" in search_kwargs
             ), "fetch_k is required in search_kwargs for mmr search"
 
+        elif search_type == "hybrid":
+            assert "k" in search_kwargs, "k is required in search_kwargs for hybrid search"
+
         elif search_type == "similarity_score_threshold":
             assert (
                 "score_threshold" in search_kwargs
@@ -105,6 +128,27 @@ Can be 'similarity' (default), 'none', 'mmr', or 'similarity_score_threshold'.
         filters = values.get("filter")
         if filters:
             search_kwargs["filter"] = QdrantFilter.model_validate(filters)
+
+        hnsw_ef = values.get("hnsw_ef")
+        quantization_oversampling = values.get("quantization_oversampling")
+        quantization_rescore = values.get("quantization_rescore")
+        if (
+            hnsw_ef is not None
+            or quantization_oversampling is not None
+            or quantization_rescore is not None
+        ):
+            search_kwargs["search_params"] = QdrantSearchParams(
+                hnsw_ef=hnsw_ef,
+                quantization=(
+                    QdrantQuantizationSearchParams(
+                        oversampling=quantization_oversampling,
+                        rescore=quantization_rescore,
+                    )
+                    if quantization_oversampling is not None
+                    or quantization_rescore is not None
+                    else None
+                ),
+            )
         return values
 
 
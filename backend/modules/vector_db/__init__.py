@@ -1,16 +1,28 @@
 from backend.modules.vector_db.base import BaseVectorDB
+from backend.modules.vector_db.embedded import EmbeddedVectorDB
 from backend.modules.vector_db.qdrant import QdrantVectorDB
-
-# from backend.modules.vector_db.singlestore import SingleStoreVectorDB
-# from backend.modules.vector_db.weaviate import WeaviateVectorDB
 from backend.types.core import VectorDBConfig
 
 SUPPORTED_VECTOR_DBS = {
     "qdrant": QdrantVectorDB,
-    # "weaviate": WeaviateVectorDB,
-    # "singlestore": SingleStoreVectorDB,
+    "embedded": EmbeddedVectorDB,
 }
 
+# Optional vector dbs, their clients are only installed with backend/vectordb.requirements.txt
+try:
+    from backend.modules.vector_db.singlestore import SingleStoreVectorDB
+
+    SUPPORTED_VECTOR_DBS["singlestore"] = SingleStoreVectorDB
+except ImportError:
+    pass
+
+try:
+    from backend.modules.vector_db.weaviate import WeaviateVectorDB
+
+    SUPPORTED_VECTOR_DBS["weaviate"] = WeaviateVectorDB
+except ImportError:
+    pass
+
 
 def get_vector_db_client(config: VectorDBConfig) -> BaseVectorDB:
     if config.provider in SUPPORTED_VECTOR_DBS:
@@ -1,19 +1,32 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterator, List, Optional
 
 from langchain.docstore.document import Document
 from langchain.embeddings.base import Embeddings
 from langchain.schema.vectorstore import VectorStore
 
 from backend.constants import DEFAULT_BATCH_SIZE_FOR_VECTOR_STORE
-from backend.types.core import DataPointVector
+from backend.modules.vector_db.data_point_index import (
+    DataPointVectorIndex,
+    DataPointVectorRecord,
+)
+from backend.types.core import DataPointVector, VectorIndexConfig, VectorRecord
 
 
 class BaseVectorDB(ABC):
+    # Whether upserting the same chunks of a data point again overwrites its existing points
+    # instead of adding new ones
+    deterministic_point_ids: bool = False
+
     @abstractmethod
-    def create_collection(self, collection_name: str, embeddings: Embeddings):
+    def create_collection(
+        self,
+        collection_name: str,
+        embeddings: Embeddings,
+        vector_index_config: Optional[VectorIndexConfig] = None,
+    ):
         """
-        Create a collection in the vector database
+        Create a collection in the vector database, with the given index settings if supported
         """
         raise NotImplementedError()
 
@@ -53,6 +66,58 @@ class BaseVectorDB(ABC):
         """
         raise NotImplementedError()
 
+    def flush_collection(self, collection_name: str):
+        """
+        Finish the index maintenance deferred while bulk upserting documents into the collection.
+        Called once at the end of an ingestion run, a no-op unless the vector database defers it
+        """
+        return None
+
+    def compact_collection(self, collection_name: str):
+        """
+        Reclaim the space and search time taken by deleted vectors, e.g. after garbage collecting
+        a collection. A no-op unless the vector database needs to be told to
+        """
+        return None
+
+    def create_shadow_collection(
+        self,
+        collection_name: str,
+        shadow_id: str,
+        embeddings: Embeddings,
+        vector_index_config: Optional[VectorIndexConfig] = None,
+    ) -> str:
+        """
+        Create a new physical collection to rebuild the collection in, set up for bulk loading,
+        and return its name. Creating the same shadow collection again returns the existing one
+        """
+        raise NotImplementedError(
+            f"Shadow re-indexing is not supported by {self.__class__.__name__}"
+        )
+
+    def swap_shadow_collection(
+        self,
+        collection_name: str,
+        shadow_collection_name: str,
+        expected_point_count: Optional[int] = None,
+    ):
+        """
+        Finish the bulk load of a shadow collection and atomically serve the collection from it,
+        dropping the physical collection served before. The swap is aborted if the shadow
+        collection does not hold `expected_point_count` points, when given.
+        """
+        raise NotImplementedError(
+            f"Shadow re-indexing is not supported by {self.__class__.__name__}"
+        )
+
+    def get_hybrid_retriever(self, vector_store: VectorStore, search_kwargs: dict):
+        """
+        Get a retriever fusing dense and sparse (keyword) search results
+        """
+        raise NotImplementedError(
+            f"Hybrid search is not supported by {self.__class__.__name__}"
+        )
+
     @abstractmethod
     def get_vector_client(self):
         """
@@ -61,6 +126,18 @@ class BaseVectorDB(ABC):
         raise NotImplementedError()
 
     @abstractmethod
+    def iter_data_point_vectors(
+        self,
+        collection_name: str,
+        data_source_fqn: Optional[str],
+        batch_size: int = DEFAULT_BATCH_SIZE_FOR_VECTOR_STORE,
+    ) -> Iterator[List[DataPointVectorRecord]]:
+        """
+        Stream the vectors of a data source in the collection as compact records, in batches.
+        Vectors of all data sources are listed if `data_source_fqn` is None
+        """
+        raise NotImplementedError()
+
     def list_data_point_vectors(
         self,
         collection_name: str,
@@ -68,9 +145,39 @@ class BaseVectorDB(ABC):
         batch_size: int = DEFAULT_BATCH_SIZE_FOR_VECTOR_STORE,
     ) -> List[DataPointVector]:
         """
-        Get vectors from the collection
+        Get vectors from the collection. Holds a model per vector, prefer
+        `get_data_point_vector_index` for whole data sources
+        """
+        return [
+            DataPointVector(
+                data_point_vector_id=record.data_point_vector_id,
+                data_point_fqn=record.data_point_fqn,
+                data_point_hash=record.data_point_hash,
+            )
+            for records in self.iter_data_point_vectors(
+                collection_name=collection_name,
+                data_source_fqn=data_source_fqn,
+                batch_size=batch_size,
+            )
+            for record in records
+        ]
+
+    def get_data_point_vector_index(
+        self,
+        collection_name: str,
+        data_source_fqn: Optional[str],
+        batch_size: int = DEFAULT_BATCH_SIZE_FOR_VECTOR_STORE,
+    ) -> DataPointVectorIndex:
+        """
+        Get the vectors of a data source in the collection aggregated by data point
         """
-        raise NotImplementedError()
+        return DataPointVectorIndex.from_batches(
+            self.iter_data_point_vectors(
+                collection_name=collection_name,
+                data_source_fqn=data_source_fqn,
+                batch_size=batch_size,
+            )
+        )
 
     @abstractmethod
     def delete_data_point_vectors(
@@ -83,3 +190,26 @@ class BaseVectorDB(ABC):
         Delete vectors from the collection
         """
         raise NotImplementedError()
+
+    def iter_vector_records(
+        self,
+        collection_name: str,
+        batch_size: int = DEFAULT_BATCH_SIZE_FOR_VECTOR_STORE,
+    ) -> Iterator[List[VectorRecord]]:
+        """
+        Stream all vectors of the collection together with their chunks, in batches
+        """
+        raise NotImplementedError(
+            f"Reading vector records is not supported by {self.__class__.__name__}"
+        )
+
+    def upsert_vector_records(
+        self, collection_name: str, vector_records: List[VectorRecord]
+    ):
+        """
+        Write vectors read from another collection as they are, without embedding them again.
+        Writing the same records again does not duplicate them where the vector database keeps their ids
+        """
+        raise NotImplementedError(
+            f"Writing vector records is not supported by {self.__class__.__name__}"
+        )
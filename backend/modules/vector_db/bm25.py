@@ -0,0 +1,265 @@
+import asyncio
+import hashlib
+import math
+import re
+import threading
+from collections import Counter
+from typing import Awaitable, Dict, List, Tuple, TypeVar
+
+from backend.logger import logger
+from backend.types.core import BM25Config
+
+# Words, numbers and identifiers such as part numbers (AB-1234), versions (1.2.3) or
+# error codes (0x80070005)
+_TOKEN_PATTERN = re.compile(r"[^\W_]+(?:[-_./:][^\W_]+)*")
+_TOKEN_PART_SEPARATOR = re.compile(r"[-_./:]")
+
+# A sparse vector as (indices, values)
+SparseVector = Tuple[List[int], List[float]]
+# Tables of the CollectionBM25Stats and CollectionBM25TermDocumentFrequencies models
+_COLLECTION_STATS_TABLE = "collection_bm25_stats"
+_TERM_DOCUMENT_FREQUENCIES_TABLE = "collection_bm25_term_document_frequencies"
+# Terms upserted per statement, well below the 65535 bind parameters postgres accepts
+_TERM_BATCH_SIZE = 10000
+
+T = TypeVar("T")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower cased tokens of the text. Compound identifiers are kept whole and also split
+    into their parts, so `AB-1234` matches queries for `ab-1234` as well as `1234`.
+    """
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        parts = _TOKEN_PART_SEPARATOR.split(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def get_term_id(token: str) -> int:
+    """
+    Stable 32 bit id of a token, used as sparse vector index. No vocabulary has to be
+    stored.
+    """
+    return int.from_bytes(
+        hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "big"
+    )
+
+
+class BM25Stats:
+    """
+    Per collection corpus statistics kept in the metadata store database, so every
+    process writing to or querying a collection sees the same ones: number of chunks,
+    their total length in tokens and the number of chunks each term occurs in. Counters
+    are incremented in place by the database, concurrent writers never overwrite each
+    other.
+
+    The vector store calls these methods from executor threads, so they go through a
+    Prisma client of their own, running on a private event loop.
+
+    Statistics are accumulated as chunks are written and are not decremented when
+    vectors are deleted, so they drift slightly with re-ingestion. IDF weights are
+    robust to that.
+    """
+
+    def __init__(self):
+        # Imported here so the module can be imported before the prisma client is
+        # generated
+        from prisma import Prisma
+
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(
+            target=self._loop.run_forever, name="bm25-stats", daemon=True
+        ).start()
+        self._db = Prisma()
+        self._run(self._db.connect())
+
+    def _run(self, coroutine: Awaitable[T]) -> T:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def add_documents(
+        self, collection_name: str, term_frequencies: List[Dict[int, int]]
+    ) -> Tuple[int, int]:
+        """
+        Adds the term frequencies of new chunks and returns the updated (document count,
+        total length)
+        """
+        return self._run(self._aadd_documents(collection_name, term_frequencies))
+
+    async def _aadd_documents(
+        self, collection_name: str, term_frequencies: List[Dict[int, int]]
+    ) -> Tuple[int, int]:
+        document_frequencies = Counter()
+        for frequencies in term_frequencies:
+            document_frequencies.update(frequencies.keys())
+        total_length = sum(
+            sum(frequencies.values()) for frequencies in term_frequencies
+        )
+        # Rows are locked in term id order, concurrent writers cannot deadlock on each
+        # other
+        term_ids = sorted(document_frequencies)
+        for i in range(0, len(term_ids), _TERM_BATCH_SIZE):
+            batch = term_ids[i : i + _TERM_BATCH_SIZE]
+            await self._db.execute_raw(
+                f"INSERT INTO {_TERM_DOCUMENT_FREQUENCIES_TABLE} (collection_name, term_id, document_frequency) VALUES "
+                + ", ".join(
+                    f"($1, ${2 * j + 2}, ${2 * j + 3})" for j in range(len(batch))
+                )
+                + " ON CONFLICT (collection_name, term_id) DO UPDATE SET "
+                f"document_frequency = {_TERM_DOCUMENT_FREQUENCIES_TABLE}.document_frequency + excluded.document_frequency",
+                collection_name,
+                *[
+                    value
+                    for term_id in batch
+                    for value in (term_id, document_frequencies[term_id])
+                ],
+            )
+        rows = await self._db.query_raw(
+            f"INSERT INTO {_COLLECTION_STATS_TABLE} (collection_name, document_count, total_length) VALUES ($1, $2, $3) "
+            "ON CONFLICT (collection_name) DO UPDATE SET "
+            f"document_count = {_COLLECTION_STATS_TABLE}.document_count + excluded.document_count, "
+            f"total_length = {_COLLECTION_STATS_TABLE}.total_length + excluded.total_length "
+            "RETURNING document_count, total_length",
+            collection_name,
+            len(term_frequencies),
+            total_length,
+        )
+        return int(rows[0]["document_count"]), int(rows[0]["total_length"])
+
+    def get_collection_stats(self, collection_name: str) -> Tuple[int, int]:
+        """
+        Returns (document count, total length) of the collection
+        """
+        rows = self._run(
+            self._db.query_raw(
+                f"SELECT document_count, total_length FROM {_COLLECTION_STATS_TABLE} WHERE collection_name = $1",
+                collection_name,
+            )
+        )
+        if not rows:
+            return 0, 0
+        return int(rows[0]["document_count"]), int(rows[0]["total_length"])
+
+    def get_document_frequencies(
+        self, collection_name: str, term_ids: List[int]
+    ) -> Dict[int, int]:
+        rows = self._run(
+            self._db.query_raw(
+                f"SELECT term_id, document_frequency FROM {_TERM_DOCUMENT_FREQUENCIES_TABLE} "
+                "WHERE collection_name = $1 AND term_id IN ("
+                + ", ".join(f"${j + 2}" for j in range(len(term_ids)))
+                + ")",
+                collection_name,
+                *term_ids,
+            )
+        )
+        return {int(row["term_id"]): int(row["document_frequency"]) for row in rows}
+
+    def delete_collection(self, collection_name: str):
+        self._run(self._adelete_collection(collection_name))
+
+    async def _adelete_collection(self, collection_name: str):
+        async with self._db.tx() as transaction:
+            for table in (_COLLECTION_STATS_TABLE, _TERM_DOCUMENT_FREQUENCIES_TABLE):
+                await transaction.execute_raw(
+                    f"DELETE FROM {table} WHERE collection_name = $1", collection_name
+                )
+
+    def rename_collection(self, collection_name: str, new_collection_name: str):
+        """
+        Moves the statistics of a collection to a new name, replacing any statistics
+        under it
+        """
+        self._run(self._arename_collection(collection_name, new_collection_name))
+
+    async def _arename_collection(self, collection_name: str, new_collection_name: str):
+        async with self._db.tx() as transaction:
+            for table in (_COLLECTION_STATS_TABLE, _TERM_DOCUMENT_FREQUENCIES_TABLE):
+                await transaction.execute_raw(
+                    f"DELETE FROM {table} WHERE collection_name = $1",
+                    new_collection_name,
+                )
+                await transaction.execute_raw(
+                    f"UPDATE {table} SET collection_name = $1 WHERE collection_name = $2",
+                    new_collection_name,
+                    collection_name,
+                )
+
+
+class BM25SparseEncoder:
+    """
+    Encodes chunks and queries into sparse vectors whose dot product is the BM25 score.
+
+    Chunk vectors carry the saturated, length normalized term frequencies and query
+    vectors the IDF of their terms, computed from the statistics of the collection at
+    query time.
+    """
+
+    def __init__(self, config: BM25Config):
+        self.config = config
+        self.stats = BM25Stats()
+
+    def encode_documents(
+        self, collection_name: str, texts: List[str]
+    ) -> List[SparseVector]:
+        """
+        Encodes chunks about to be written to the collection and adds them to its
+        statistics
+        """
+        term_frequencies = [
+            Counter(get_term_id(token) for token in tokenize(text)) for text in texts
+        ]
+        document_count, total_length = self.stats.add_documents(
+            collection_name, term_frequencies
+        )
+        average_length = total_length / document_count if document_count else 1
+        k1, b = self.config.k1, self.config.b
+        sparse_vectors = []
+        for frequencies in term_frequencies:
+            length_norm = k1 * (1 - b + b * sum(frequencies.values()) / average_length)
+            term_ids = list(frequencies.keys())
+            sparse_vectors.append(
+                (
+                    term_ids,
+                    [
+                        frequencies[term_id]
+                        * (k1 + 1)
+                        / (frequencies[term_id] + length_norm)
+                        for term_id in term_ids
+                    ],
+                )
+            )
+        return sparse_vectors
+
+    def encode_query(self, collection_name: str, text: str) -> SparseVector:
+        """
+        Encodes a query into the IDF weights of its distinct terms
+        """
+        term_ids = list({get_term_id(token) for token in tokenize(text)})
+        if not term_ids:
+            return [], []
+        document_count, _ = self.stats.get_collection_stats(collection_name)
+        document_frequencies = self.stats.get_document_frequencies(
+            collection_name, term_ids
+        )
+        logger.debug(
+            f"[BM25] Query of {len(term_ids)} terms against {document_count} chunks of {collection_name}"
+        )
+        return term_ids, [
+            math.log(
+                1
+                + (document_count - document_frequencies.get(term_id, 0) + 0.5)
+                / (document_frequencies.get(term_id, 0) + 0.5)
+            )
+            for term_id in term_ids
+        ]
+
+    def delete_collection(self, collection_name: str):
+        self.stats.delete_collection(collection_name)
+
+    def rename_collection(self, collection_name: str, new_collection_name: str):
+        self.stats.rename_collection(collection_name, new_collection_name)
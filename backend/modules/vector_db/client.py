@@ -1,4 +1,7 @@
 from backend.modules.vector_db import get_vector_db_client
+from backend.modules.vector_db.registry import VectorStoreRegistry
 from backend.settings import settings
 
 VECTOR_STORE_CLIENT = get_vector_db_client(config=settings.VECTOR_DB_CONFIG)
+
+VECTOR_STORE_REGISTRY = VectorStoreRegistry(vector_db=VECTOR_STORE_CLIENT)
@@ -0,0 +1,233 @@
+import sys
+import uuid
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from backend.types.core import DataPointVector
+
+PointId = Union[str, int]
+
+
+class DataPointVectorRecord(NamedTuple):
+    """
+    Compact listing entry of a single vector in the vector store, a plain tuple instead
+    of a pydantic model. Build it with `make_data_point_vector_record` so the fqn and
+    hash, repeated for every chunk of a data point, are interned and stored once.
+    """
+
+    data_point_vector_id: PointId
+    data_point_fqn: str
+    data_point_hash: str
+
+
+def make_data_point_vector_record(
+    data_point_vector_id: PointId, data_point_fqn: str, data_point_hash: str
+) -> DataPointVectorRecord:
+    return DataPointVectorRecord(
+        data_point_vector_id,
+        sys.intern(data_point_fqn),
+        sys.intern(data_point_hash),
+    )
+
+
+class _PointIds:
+    """
+    Point ids of the vectors of one data point. Canonical UUID strings, the ids of most
+    vector dbs, are packed into 16 bytes each and returned as strings again, other ids
+    are kept as is.
+    """
+
+    __slots__ = ("_uuids", "_others")
+
+    def __init__(self):
+        self._uuids = bytearray()
+        self._others: Optional[List[PointId]] = None
+
+    def append(self, point_id: PointId):
+        if isinstance(point_id, str) and len(point_id) == 36:
+            try:
+                packed = uuid.UUID(point_id)
+            except ValueError:
+                packed = None
+            if packed is not None and str(packed) == point_id:
+                self._uuids += packed.bytes
+                return
+        if self._others is None:
+            self._others = []
+        self._others.append(point_id)
+
+    def __len__(self) -> int:
+        return len(self._uuids) // 16 + len(self._others or ())
+
+    def __iter__(self) -> Iterator[PointId]:
+        for start in range(0, len(self._uuids), 16):
+            yield str(uuid.UUID(bytes=bytes(self._uuids[start : start + 16])))
+        if self._others:
+            yield from self._others
+
+
+class _DataPointVectors:
+    """
+    Vectors of one data point. They normally all carry the same hash, the vectors of a
+    data point that was only partially rewritten are kept apart by hash.
+    """
+
+    __slots__ = ("data_point_hash", "point_ids", "point_ids_by_other_hash")
+
+    def __init__(self, data_point_hash: str):
+        self.data_point_hash = data_point_hash
+        self.point_ids = _PointIds()
+        self.point_ids_by_other_hash: Optional[Dict[str, _PointIds]] = None
+
+    def add(self, point_id: PointId, data_point_hash: str):
+        if data_point_hash == self.data_point_hash:
+            self.point_ids.append(point_id)
+            return
+        if self.point_ids_by_other_hash is None:
+            self.point_ids_by_other_hash = {}
+        if data_point_hash not in self.point_ids_by_other_hash:
+            self.point_ids_by_other_hash[data_point_hash] = _PointIds()
+        self.point_ids_by_other_hash[data_point_hash].append(point_id)
+
+    def __len__(self) -> int:
+        return len(self.point_ids) + sum(
+            len(point_ids)
+            for point_ids in (self.point_ids_by_other_hash or {}).values()
+        )
+
+    def iter_point_ids_by_hash(self) -> Iterator[Tuple[str, _PointIds]]:
+        yield self.data_point_hash, self.point_ids
+        if self.point_ids_by_other_hash:
+            yield from self.point_ids_by_other_hash.items()
+
+
+class DataPointVectorIndex:
+    """
+    Existing vectors of a data source aggregated by data point: data point fqn -> hash
+    and the ids of its vectors. Built from a stream of `DataPointVectorRecord` batches,
+    the records themselves are not kept, so memory grows with the number of data points
+    plus a few bytes per vector rather than with a model object per vector.
+    """
+
+    def __init__(self):
+        self._data_points: Dict[str, _DataPointVectors] = {}
+        self.vector_count = 0
+
+    @classmethod
+    def from_batches(
+        cls, batches: Iterable[List[DataPointVectorRecord]]
+    ) -> "DataPointVectorIndex":
+        index = cls()
+        for batch in batches:
+            for record in batch:
+                index.add(record)
+        return index
+
+    def add(self, record: DataPointVectorRecord):
+        data_point_vectors = self._data_points.get(record.data_point_fqn)
+        if data_point_vectors is None:
+            data_point_vectors = _DataPointVectors(record.data_point_hash)
+            self._data_points[record.data_point_fqn] = data_point_vectors
+        data_point_vectors.add(record.data_point_vector_id, record.data_point_hash)
+        self.vector_count += 1
+
+    def __len__(self) -> int:
+        return len(self._data_points)
+
+    def __contains__(self, data_point_fqn: str) -> bool:
+        return data_point_fqn in self._data_points
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data_points)
+
+    def get_data_point_fqn_to_hash_map(self) -> Dict[str, str]:
+        """
+        Returns a map of data point fqn to hash, the hash of the first vector listed for
+        each
+        """
+        return {
+            data_point_fqn: data_point_vectors.data_point_hash
+            for data_point_fqn, data_point_vectors in self._data_points.items()
+        }
+
+    def get_vector_count(self, data_point_fqn: str) -> int:
+        data_point_vectors = self._data_points.get(data_point_fqn)
+        return len(data_point_vectors) if data_point_vectors is not None else 0
+
+    def get_hashes(self, data_point_fqn: str) -> List[str]:
+        """
+        Hashes carried by the vectors of the data point, more than one if it was
+        partially rewritten
+        """
+        data_point_vectors = self._data_points.get(data_point_fqn)
+        if data_point_vectors is None:
+            return []
+        return [
+            data_point_hash
+            for data_point_hash, _ in data_point_vectors.iter_point_ids_by_hash()
+        ]
+
+    def is_unchanged(self, data_point_fqn: str, data_point_hash: str) -> bool:
+        """
+        Whether the data point has vectors and all of them carry the given hash
+        """
+        data_point_vectors = self._data_points.get(data_point_fqn)
+        return (
+            data_point_vectors is not None
+            and not data_point_vectors.point_ids_by_other_hash
+            and data_point_vectors.data_point_hash == data_point_hash
+        )
+
+    def pop(
+        self, data_point_fqn: str, keep_hash: Optional[str] = None
+    ) -> List[DataPointVector]:
+        """
+        Removes a data point from the index and returns its vectors, except those
+        carrying `keep_hash`
+
+        Args:
+            data_point_fqn (str): Data point to remove
+            keep_hash (Optional[str], optional): Hash of the vectors to leave out of the
+                result. Defaults to None.
+
+        Returns:
+            List[DataPointVector]: Vectors of the data point, empty if it is not in the
+                index
+        """
+        data_point_vectors = self._data_points.pop(data_point_fqn, None)
+        if data_point_vectors is None:
+            return []
+        self.vector_count -= len(data_point_vectors)
+        return list(
+            self._to_data_point_vectors(
+                data_point_fqn, data_point_vectors, keep_hash=keep_hash
+            )
+        )
+
+    def iter_data_point_vectors(
+        self, data_point_fqns: Iterable[str]
+    ) -> Iterator[DataPointVector]:
+        """
+        Yields the vectors of the given data points, one at a time
+        """
+        for data_point_fqn in data_point_fqns:
+            data_point_vectors = self._data_points.get(data_point_fqn)
+            if data_point_vectors is not None:
+                yield from self._to_data_point_vectors(
+                    data_point_fqn, data_point_vectors
+                )
+
+    @staticmethod
+    def _to_data_point_vectors(
+        data_point_fqn: str,
+        data_point_vectors: _DataPointVectors,
+        keep_hash: Optional[str] = None,
+    ) -> Iterator[DataPointVector]:
+        for data_point_hash, point_ids in data_point_vectors.iter_point_ids_by_hash():
+            if data_point_hash == keep_hash:
+                continue
+            for point_id in point_ids:
+                yield DataPointVector(
+                    data_point_vector_id=point_id,
+                    data_point_fqn=data_point_fqn,
+                    data_point_hash=data_point_hash,
+                )
@@ -0,0 +1,1026 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain.docstore.document import Document
+from langchain.embeddings.base import Embeddings
+from langchain.schema.vectorstore import VectorStore
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+
+from backend.constants import (
+    DATA_POINT_FQN_METADATA_KEY,
+    DATA_POINT_HASH_METADATA_KEY,
+    DEFAULT_BATCH_SIZE_FOR_VECTOR_STORE,
+)
+from backend.logger import logger
+from backend.modules.vector_db.base import BaseVectorDB
+from backend.modules.vector_db.data_point_index import (
+    DataPointVectorRecord,
+    make_data_point_vector_record,
+)
+from backend.types.core import (
+    DataPointVector,
+    EmbeddedVectorDBConfig,
+    VectorDBConfig,
+    VectorIndexConfig,
+    VectorRecord,
+)
+from backend.utils import get_data_source_fqn
+
+_META_FILE = "meta.json"
+_CENTROIDS_FILE = "centroids.npy"
+_INITIAL_CAPACITY = 1024
+# Same batch size as the langchain wrappers use when embedding documents
+EMBEDDING_BATCH_SIZE = 64
+# Deleted rows are only marked; the collection is rewritten once they are the majority
+_COMPACTION_RATIO = 0.5
+_MIN_COMPACTION_ROWS = 10_000
+_KMEANS_ITERATIONS = 10
+# A collection is compacted into <directory>.compacting, the old directory is moved to
+# <directory>.replaced and the compacted one takes its place
+_COMPACTING_SUFFIX = ".compacting"
+_REPLACED_SUFFIX = ".replaced"
+_KMEANS_SAMPLE_PER_LIST = 64
+# Payload columns, all stored as strings. Metadata is serialized as JSON.
+_ID_COLUMN = "id"
+_DATA_POINT_FQN_COLUMN = "data_point_fqn"
+_DATA_POINT_HASH_COLUMN = "data_point_hash"
+_PAGE_CONTENT_COLUMN = "page_content"
+_METADATA_COLUMN = "metadata"
+_STRING_COLUMNS = [
+    _ID_COLUMN,
+    _DATA_POINT_FQN_COLUMN,
+    _DATA_POINT_HASH_COLUMN,
+    _PAGE_CONTENT_COLUMN,
+    _METADATA_COLUMN,
+]
+
+
+def _open_memmap(path: str, dtype, shape: Tuple[int, ...]) -> np.memmap:
+    """
+    Opens a memory mapped array, creating or growing its file to fit the shape
+    """
+    size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    with open(path, "ab") as f:
+        if f.tell() < size:
+            f.truncate(size)
+    return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+
+def _recover_compaction(directory: str):
+    """
+    Finishes or rolls back a compaction of the collection in `directory` that was
+    interrupted
+    """
+    compacted_directory = f"{directory}{_COMPACTING_SUFFIX}"
+    replaced_directory = f"{directory}{_REPLACED_SUFFIX}"
+    if os.path.exists(replaced_directory) and not os.path.exists(directory):
+        # Interrupted between the two renames, the compacted copy was complete by then
+        if os.path.exists(os.path.join(compacted_directory, _META_FILE)):
+            logger.warning(
+                f"[Embedded] Finishing interrupted compaction of {directory}"
+            )
+            os.replace(compacted_directory, directory)
+        else:
+            logger.warning(
+                f"[Embedded] Rolling back interrupted compaction of {directory}"
+            )
+            os.replace(replaced_directory, directory)
+    shutil.rmtree(replaced_directory, ignore_errors=True)
+    shutil.rmtree(compacted_directory, ignore_errors=True)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class _StringColumn:
+    """
+    Append only column of strings: their utf-8 bytes in a data file and the (start, end)
+    offsets of every row in a memory mapped index
+    """
+
+    def __init__(self, directory: str, name: str, capacity: int):
+        self.data_path = os.path.join(directory, f"{name}.bin")
+        self.offsets_path = os.path.join(directory, f"{name}.offsets")
+        self._file = open(self.data_path, "a+b")
+        self.offsets = _open_memmap(self.offsets_path, np.int64, (capacity, 2))
+
+    def resize(self, capacity: int):
+        self.offsets.flush()
+        self.offsets = _open_memmap(self.offsets_path, np.int64, (capacity, 2))
+
+    def append(self, start_row: int, values: List[str]):
+        encoded = [value.encode("utf-8") for value in values]
+        self._file.seek(0, os.SEEK_END)
+        position = self._file.tell()
+        self._file.write(b"".join(encoded))
+        self._file.flush()
+        lengths = np.array([len(value) for value in encoded], dtype=np.int64)
+        ends = position + np.cumsum(lengths)
+        self.offsets[start_row : start_row + len(values), 0] = ends - lengths
+        self.offsets[start_row : start_row + len(values), 1] = ends
+
+    def get(self, row: int) -> str:
+        start, end = self.offsets[row]
+        return os.pread(self._file.fileno(), int(end - start), int(start)).decode(
+            "utf-8"
+        )
+
+    def get_all(self, count: int) -> List[str]:
+        self._file.seek(0)
+        data = self._file.read()
+        return [
+            data[start:end].decode("utf-8")
+            for start, end in self.offsets[:count].tolist()
+        ]
+
+    def close(self):
+        self.offsets.flush()
+        self._file.close()
+
+
+class _EmbeddedCollection:
+    """
+    A collection stored in its own directory: normalized vectors in a memory mapped
+    array, payload in append only string columns, deletions as a memory mapped tombstone
+    array.
+
+    Rows are only ever appended. A row is visible once the metadata file, written last,
+    counts it, so an interrupted write leaves the collection as it was. An interrupted
+    compaction is finished or rolled back when the vector db is opened. Ids, data point
+    fqns and hashes are also held in memory, together with an inverted index from data
+    point fqn to rows used by filters, listings and deletes. The collection is meant to
+    be written by a single process. Other processes reading it call `refresh` to reload
+    it once the metadata file changed.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        config: EmbeddedVectorDBConfig,
+        dimension: Optional[int] = None,
+    ):
+        self.directory = directory
+        self.config = config
+        self._lock = threading.RLock()
+        self._meta_stamp: Optional[Tuple[int, int, int]] = None
+        self._load(dimension)
+
+    def _get_meta_stamp(self) -> Optional[Tuple[int, int, int]]:
+        # The metadata file is replaced on every write, a new inode, mtime or size means
+        # new rows
+        try:
+            stat = os.stat(os.path.join(self.directory, _META_FILE))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self, dimension: Optional[int] = None):
+        directory = self.directory
+        meta_path = os.path.join(directory, _META_FILE)
+        # Taken before reading, a write in between only causes one more reload
+        meta_stamp = self._get_meta_stamp()
+        if meta_stamp is not None:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        else:
+            os.makedirs(directory, exist_ok=True)
+            meta = {
+                "dimension": dimension,
+                "dtype": self.config.dtype,
+                "count": 0,
+                "capacity": _INITIAL_CAPACITY,
+                "ivf_trained_count": 0,
+            }
+        self.dimension: int = meta["dimension"]
+        self.dtype = np.dtype(meta["dtype"])
+        self.count: int = meta["count"]
+        self.capacity: int = meta["capacity"]
+        self.ivf_trained_count: int = meta["ivf_trained_count"]
+        self._open_arrays()
+        self.columns = {
+            name: _StringColumn(directory, name, self.capacity)
+            for name in _STRING_COLUMNS
+        }
+        centroids_path = os.path.join(directory, _CENTROIDS_FILE)
+        self.centroids: Optional[np.ndarray] = (
+            np.load(centroids_path) if os.path.exists(centroids_path) else None
+        )
+        self.ids = self.columns[_ID_COLUMN].get_all(self.count)
+        self.data_point_fqns = self.columns[_DATA_POINT_FQN_COLUMN].get_all(self.count)
+        self.data_point_hashes = self.columns[_DATA_POINT_HASH_COLUMN].get_all(
+            self.count
+        )
+        self.row_by_id: Dict[str, int] = {}
+        self.rows_by_data_point_fqn: Dict[str, Set[int]] = defaultdict(set)
+        self.deleted_count = 0
+        for row in range(self.count):
+            if self.deleted[row]:
+                self.deleted_count += 1
+                continue
+            self.row_by_id[self.ids[row]] = row
+            if self.data_point_fqns[row]:
+                self.rows_by_data_point_fqn[self.data_point_fqns[row]].add(row)
+        # Only a new collection writes its metadata here, loading an existing one never
+        # does
+        if meta_stamp is None:
+            self._save_meta()
+        else:
+            self._meta_stamp = meta_stamp
+
+    def refresh(self):
+        """
+        Reloads the collection if another process wrote, compacted or recreated it since
+        it was loaded
+        """
+        with self._lock:
+            meta_stamp = self._get_meta_stamp()
+            if meta_stamp is None:
+                raise ValueError(f"Collection in {self.directory} does not exist")
+            if meta_stamp == self._meta_stamp:
+                return
+            logger.debug(f"[Embedded] Reloading changed collection in {self.directory}")
+            self.close()
+            self._load()
+
+    def _open_arrays(self):
+        self.vectors = _open_memmap(
+            os.path.join(self.directory, "vectors.bin"),
+            self.dtype,
+            (self.capacity, self.dimension),
+        )
+        self.deleted = _open_memmap(
+            os.path.join(self.directory, "deleted.bin"), np.bool_, (self.capacity,)
+        )
+        self.assignments = _open_memmap(
+            os.path.join(self.directory, "assignments.bin"), np.int32, (self.capacity,)
+        )
+
+    def _save_meta(self):
+        for array in (self.vectors, self.deleted, self.assignments):
+            array.flush()
+        meta_path = os.path.join(self.directory, _META_FILE)
+        with open(f"{meta_path}.tmp", "w") as f:
+            json.dump(
+                {
+                    "dimension": self.dimension,
+                    "dtype": self.dtype.name,
+                    "count": self.count,
+                    "capacity": self.capacity,
+                    "ivf_trained_count": self.ivf_trained_count,
+                },
+                f,
+            )
+        os.replace(f"{meta_path}.tmp", meta_path)
+        self._meta_stamp = self._get_meta_stamp()
+
+    def _ensure_capacity(self, count: int):
+        if count <= self.capacity:
+            return
+        while self.capacity < count:
+            self.capacity *= 2
+        for array in (self.vectors, self.deleted, self.assignments):
+            array.flush()
+        self._open_arrays()
+        for column in self.columns.values():
+            column.resize(self.capacity)
+
+    @property
+    def live_count(self) -> int:
+        return self.count - self.deleted_count
+
+    def add(
+        self,
+        ids: List[str],
+        vectors: np.ndarray,
+        documents: List[Document],
+    ):
+        """
+        Appends rows. Rows with an id that already exists replace the existing ones.
+        """
+        with self._lock:
+            start, end = self.count, self.count + len(ids)
+            self._ensure_capacity(end)
+            vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+            self.vectors[start:end] = vectors.astype(self.dtype)
+            self.deleted[start:end] = False
+            if self.centroids is not None:
+                self.assignments[start:end] = self._get_nearest_centroids(vectors)
+            data_point_fqns = [
+                document.metadata.get(DATA_POINT_FQN_METADATA_KEY) or ""
+                for document in documents
+            ]
+            data_point_hashes = [
+                document.metadata.get(DATA_POINT_HASH_METADATA_KEY) or ""
+                for document in documents
+            ]
+            for name, values in (
+                (_ID_COLUMN, ids),
+                (_DATA_POINT_FQN_COLUMN, data_point_fqns),
+                (_DATA_POINT_HASH_COLUMN, data_point_hashes),
+                (
+                    _PAGE_CONTENT_COLUMN,
+                    [document.page_content for document in documents],
+                ),
+                (
+                    _METADATA_COLUMN,
+                    [
+                        json.dumps(document.metadata, default=str)
+                        for document in documents
+                    ],
+                ),
+            ):
+                self.columns[name].append(start, values)
+            replaced_rows = [self.row_by_id[id] for id in ids if id in self.row_by_id]
+            self.ids.extend(ids)
+            self.data_point_fqns.extend(data_point_fqns)
+            self.data_point_hashes.extend(data_point_hashes)
+            for row, (id, data_point_fqn) in enumerate(
+                zip(ids, data_point_fqns), start=start
+            ):
+                self.row_by_id[id] = row
+                if data_point_fqn:
+                    self.rows_by_data_point_fqn[data_point_fqn].add(row)
+            self.count = end
+            self._mark_deleted(replaced_rows)
+            self._save_meta()
+            self._maybe_train_ivf()
+
+    def delete(self, rows: Iterable[int]):
+        with self._lock:
+            rows = [row for row in rows if row < self.count and not self.deleted[row]]
+            if not rows:
+                return
+            for row in rows:
+                if self.row_by_id.get(self.ids[row]) == row:
+                    del self.row_by_id[self.ids[row]]
+            self._mark_deleted(rows)
+            self._save_meta()
+            if (
+                self.deleted_count >= _MIN_COMPACTION_ROWS
+                and self.deleted_count > self.count * _COMPACTION_RATIO
+            ):
+                self._compact()
+
+    def _mark_deleted(self, rows: List[int]):
+        for row in rows:
+            self.deleted[row] = True
+            data_point_fqn = self.data_point_fqns[row]
+            if data_point_fqn in self.rows_by_data_point_fqn:
+                self.rows_by_data_point_fqn[data_point_fqn].discard(row)
+                if not self.rows_by_data_point_fqn[data_point_fqn]:
+                    del self.rows_by_data_point_fqn[data_point_fqn]
+        self.deleted_count += len(rows)
+
+    def get_rows_by_data_point_fqns(self, data_point_fqns: Iterable[str]) -> Set[int]:
+        rows = set()
+        for data_point_fqn in data_point_fqns:
+            rows.update(self.rows_by_data_point_fqn.get(data_point_fqn, ()))
+        return rows
+
+    def get_rows_matching_data_point_fqn_text(self, text: str) -> Set[int]:
+        """
+        Rows of all data points whose fqn contains the text, e.g. all data points of a
+        data source
+        """
+        return self.get_rows_by_data_point_fqns(
+            [
+                data_point_fqn
+                for data_point_fqn in self.rows_by_data_point_fqn
+                if text in data_point_fqn
+            ]
+        )
+
+    def get_data_point_vector_records(
+        self, data_source_fqn: Optional[str]
+    ) -> List[DataPointVectorRecord]:
+        """
+        Records of the live rows of the data source's data points, of all data points if
+        not set. Rows are renumbered when the collection is compacted, so they are all
+        read at once.
+        """
+        with self._lock:
+            rows = self.get_rows_by_data_point_fqns(
+                [
+                    data_point_fqn
+                    for data_point_fqn in self.rows_by_data_point_fqn
+                    if data_source_fqn is None
+                    or get_data_source_fqn(data_point_fqn) == data_source_fqn
+                ]
+            )
+            return [
+                make_data_point_vector_record(
+                    self.ids[row],
+                    self.data_point_fqns[row],
+                    self.data_point_hashes[row],
+                )
+                for row in sorted(rows)
+                if self.data_point_hashes[row]
+            ]
+
+    def get_document(self, row: int) -> Document:
+        metadata = json.loads(self.columns[_METADATA_COLUMN].get(row))
+        metadata["_id"] = self.ids[row]
+        return Document(
+            page_content=self.columns[_PAGE_CONTENT_COLUMN].get(row), metadata=metadata
+        )
+
+    def get_vectors(self, rows: List[int]) -> np.ndarray:
+        return np.asarray(self.vectors[rows], dtype=np.float32)
+
+    def search(
+        self, query_vector: List[float], k: int, rows: Optional[Set[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Returns the k (row, cosine similarity) pairs closest to the query, among the given
+        rows if any. Without rows, only the closest IVF lists are scanned once the IVF
+        index is trained.
+        """
+        query = _normalize(np.asarray(query_vector, dtype=np.float32))
+        with self._lock:
+            if rows is not None:
+                candidate_rows = np.fromiter(sorted(rows), dtype=np.int64)
+            elif self.centroids is not None:
+                probed_lists = np.argsort(-(self.centroids @ query))[
+                    : self.config.ivf_nprobe
+                ]
+                candidate_rows = np.flatnonzero(
+                    np.isin(self.assignments[: self.count], probed_lists)
+                )
+            else:
+                candidate_rows = None
+            total = self.count if candidate_rows is None else len(candidate_rows)
+            block_size = self.config.search_block_size
+            top_rows: List[np.ndarray] = []
+            top_scores: List[np.ndarray] = []
+            for start in range(0, total, block_size):
+                end = min(start + block_size, total)
+                if candidate_rows is None:
+                    block_rows = np.arange(start, end)
+                    block = self.vectors[start:end]
+                else:
+                    block_rows = candidate_rows[start:end]
+                    block = self.vectors[block_rows]
+                if block.dtype != np.float32:
+                    block = block.astype(np.float32)
+                scores = block @ query
+                scores[self.deleted[block_rows]] = -np.inf
+                if len(scores) > k:
+                    best = np.argpartition(-scores, k)[:k]
+                    block_rows, scores = block_rows[best], scores[best]
+                top_rows.append(block_rows)
+                top_scores.append(scores)
+        if not top_rows:
+            return []
+        rows_array = np.concatenate(top_rows)
+        scores_array = np.concatenate(top_scores)
+        order = np.argsort(-scores_array)[:k]
+        return [
+            (int(rows_array[i]), float(scores_array[i]))
+            for i in order
+            if np.isfinite(scores_array[i])
+        ]
+
+    def _get_nearest_centroids(self, vectors: np.ndarray) -> np.ndarray:
+        block_size = self.config.search_block_size
+        return np.concatenate(
+            [
+                np.argmax(
+                    np.asarray(vectors[start : start + block_size], dtype=np.float32)
+                    @ self.centroids.T,
+                    axis=1,
+                ).astype(np.int32)
+                for start in range(0, len(vectors), block_size)
+            ]
+        )
+
+    def _maybe_train_ivf(self):
+        # Trained once the collection is large enough and trained again whenever it
+        # doubled since
+        if self.config.ivf_min_points is None or self.live_count < max(
+            self.config.ivf_min_points, 2 * self.ivf_trained_count
+        ):
+            return
+        live_rows = np.flatnonzero(~self.deleted[: self.count])
+        n_lists = self.config.ivf_lists or max(1, int(np.sqrt(len(live_rows))))
+        logger.info(
+            f"[Embedded] Training IVF index of {n_lists} lists on {len(live_rows)} vectors in {self.directory}"
+        )
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(
+            rng.choice(
+                live_rows,
+                size=min(len(live_rows), n_lists * _KMEANS_SAMPLE_PER_LIST),
+                replace=False,
+            )
+        )
+        sample = np.asarray(self.vectors[sample_rows], dtype=np.float32)
+        # Spherical k-means: vectors and centroids are unit length, assignment by dot
+        # product
+        self.centroids = sample[rng.choice(len(sample), n_lists, replace=False)]
+        for _ in range(_KMEANS_ITERATIONS):
+            labels = self._get_nearest_centroids(sample)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=n_lists)
+            non_empty = counts > 0
+            self.centroids[non_empty] = _normalize(sums[non_empty])
+        for start in range(0, self.count, self.config.search_block_size):
+            end = min(start + self.config.search_block_size, self.count)
+            self.assignments[start:end] = self._get_nearest_centroids(
+                self.vectors[start:end]
+            )
+        np.save(os.path.join(self.directory, _CENTROIDS_FILE), self.centroids)
+        self.ivf_trained_count = len(live_rows)
+        self._save_meta()
+
+    def _compact(self):
+        """
+        Rewrites the collection without its deleted rows
+        """
+        logger.info(
+            f"[Embedded] Compacting {self.directory}: dropping {self.deleted_count} of {self.count} rows"
+        )
+        compacted_directory = f"{self.directory}{_COMPACTING_SUFFIX}"
+        shutil.rmtree(compacted_directory, ignore_errors=True)
+        compacted = _EmbeddedCollection(
+            compacted_directory, self.config, dimension=self.dimension
+        )
+        live_rows = np.flatnonzero(~self.deleted[: self.count])
+        for start in range(0, len(live_rows), DEFAULT_BATCH_SIZE_FOR_VECTOR_STORE):
+            rows = live_rows[
+                start : start + DEFAULT_BATCH_SIZE_FOR_VECTOR_STORE
+            ].tolist()
+            compacted.add(
+                ids=[self.ids[row] for row in rows],
+                vectors=self.get_vectors(rows),
+                documents=[self._get_stored_document(row) for row in rows],
+            )
+        compacted.close()
+        self.close()
+        replaced_directory = f"{self.directory}{_REPLACED_SUFFIX}"
+        os.replace(self.directory, replaced_directory)
+        os.replace(compacted_directory, self.directory)
+        shutil.rmtree(replaced_directory, ignore_errors=True)
+        self._load()
+
+    def get_live_rows(self) -> List[int]:
+        with self._lock:
+            return [row for row in range(self.count) if not self.deleted[row]]
+
+    def get_vector_records(self, rows: List[int]) -> List[VectorRecord]:
+        """
+        Records of the given rows that are still live, with their stored, normalized
+        vectors
+        """
+        with self._lock:
+            rows = [row for row in rows if row < self.count and not self.deleted[row]]
+            vectors = self.get_vectors(rows)
+            records = []
+            for row, vector in zip(rows, vectors):
+                document = self._get_stored_document(row)
+                records.append(
+                    VectorRecord(
+                        id=self.ids[row],
+                        page_content=document.page_content,
+                        metadata=document.metadata,
+                        vector=vector.tolist(),
+                    )
+                )
+            return records
+
+    def _get_stored_document(self, row: int) -> Document:
+        return Document(
+            page_content=self.columns[_PAGE_CONTENT_COLUMN].get(row),
+            metadata=json.loads(self.columns[_METADATA_COLUMN].get(row)),
+        )
+
+    def close(self):
+        for array in (self.vectors, self.deleted, self.assignments):
+            array.flush()
+        for column in self.columns.values():
+            column.close()
+
+
+class EmbeddedVectorStore(VectorStore):
+    """
+    Langchain vector store over an embedded collection. Filters are supported on the
+    data point fqn, either as `{"_data_point_fqn": fqn or [fqns]}` or as a Qdrant style
+    filter on `metadata._data_point_fqn` with value, any or text matches.
+    """
+
+    def __init__(
+        self,
+        collection: _EmbeddedCollection,
+        embeddings: Embeddings,
+    ):
+        self.collection = collection
+        self._embeddings = embeddings
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embeddings
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        self.collection.add(
+            ids=ids,
+            vectors=np.asarray(
+                self.embeddings.embed_documents(texts), dtype=np.float32
+            ),
+            documents=[
+                Document(page_content=text, metadata=metadata)
+                for text, metadata in zip(texts, metadatas)
+            ],
+        )
+        return ids
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        directory: Optional[str] = None,
+        config: Optional[EmbeddedVectorDBConfig] = None,
+        **kwargs: Any,
+    ) -> "EmbeddedVectorStore":
+        """
+        Adds the texts to the collection in `directory`, creating it if it does not
+        exist. Within the app, stores are built with `EmbeddedVectorDB.get_vector_store`
+        instead.
+        """
+        if directory is None:
+            raise ValueError("directory of the collection is required")
+        texts = list(texts)
+        if not texts:
+            raise ValueError("No texts to add")
+        vectors = np.asarray(embedding.embed_documents(texts), dtype=np.float32)
+        store = cls(
+            collection=_EmbeddedCollection(
+                directory,
+                config or EmbeddedVectorDBConfig(),
+                dimension=vectors.shape[1],
+            ),
+            embeddings=embedding,
+        )
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        store.collection.add(
+            ids=ids,
+            vectors=vectors,
+            documents=[
+                Document(page_content=text, metadata=metadata)
+                for text, metadata in zip(texts, metadatas)
+            ],
+        )
+        return store
+
+    def _get_filter_rows(self, filter: Any) -> Optional[Set[int]]:
+        if not filter:
+            return None
+        if hasattr(filter, "model_dump"):
+            filter = filter.model_dump(exclude_none=True)
+        if DATA_POINT_FQN_METADATA_KEY in filter:
+            value = filter[DATA_POINT_FQN_METADATA_KEY]
+            return self.collection.get_rows_by_data_point_fqns(
+                value if isinstance(value, list) else [value]
+            )
+        unsupported_keys = set(filter) - {"must", "should"}
+        if unsupported_keys:
+            raise ValueError(f"Unsupported filter on {unsupported_keys}")
+        must_rows, should_rows = None, None
+        for clause in ("must", "should"):
+            for condition in filter.get(clause) or []:
+                if condition.get("key") not in (
+                    DATA_POINT_FQN_METADATA_KEY,
+                    f"metadata.{DATA_POINT_FQN_METADATA_KEY}",
+                ):
+                    raise ValueError(f"Unsupported filter condition {condition}")
+                match = condition.get("match") or {}
+                if "value" in match:
+                    rows = self.collection.get_rows_by_data_point_fqns([match["value"]])
+                elif "any" in match:
+                    rows = self.collection.get_rows_by_data_point_fqns(match["any"])
+                elif "text" in match:
+                    rows = self.collection.get_rows_matching_data_point_fqn_text(
+                        match["text"]
+                    )
+                else:
+                    raise ValueError(f"Unsupported filter match {match}")
+                if clause == "must":
+                    must_rows = rows if must_rows is None else must_rows & rows
+                else:
+                    should_rows = rows if should_rows is None else should_rows | rows
+        if must_rows is None:
+            return should_rows
+        return must_rows if should_rows is None else must_rows & should_rows
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        self.collection.refresh()
+        return [
+            (self.collection.get_document(row), score)
+            for row, score in self.collection.search(
+                embedding, k=k, rows=self._get_filter_rows(filter)
+            )
+        ]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(
+            self.embeddings.embed_query(query), k=k, filter=filter
+        )
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return [
+            document
+            for document, _ in self.similarity_search_with_score_by_vector(
+                embedding, k=k, filter=filter
+            )
+        ]
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return self.similarity_search_by_vector(
+            self.embeddings.embed_query(query), k=k, filter=filter
+        )
+
+    def max_marginal_relevance_search(
+        self,
+        query: str,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        query_vector = self.embeddings.embed_query(query)
+        self.collection.refresh()
+        results = self.collection.search(
+            query_vector, k=fetch_k, rows=self._get_filter_rows(filter)
+        )
+        if not results:
+            return []
+        rows = [row for row, _ in results]
+        selected = maximal_marginal_relevance(
+            np.asarray(query_vector, dtype=np.float32),
+            self.collection.get_vectors(rows),
+            k=k,
+            lambda_mult=lambda_mult,
+        )
+        return [self.collection.get_document(rows[i]) for i in selected]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] to a relevance score in [0, 1]
+        return lambda score: (score + 1) / 2
+
+
+class EmbeddedVectorDB(BaseVectorDB):
+    """
+    In process vector db for development machines and single node benchmarks: no server,
+    vectors are memory mapped from local files. Searches are brute force over blocks of
+    vectors until a collection is large enough for an IVF index. A collection is written
+    by one process at a time, other processes, e.g. the server next to ingestion
+    workers, reload it before each search or listing once it changed.
+    """
+
+    def __init__(self, config: VectorDBConfig):
+        logger.debug(f"Opening embedded vector db using config: {config.model_dump()}")
+        self.config = EmbeddedVectorDBConfig.model_validate(config.config or {})
+        os.makedirs(self.config.path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._collections: Dict[str, _EmbeddedCollection] = {}
+        for name in os.listdir(self.config.path):
+            for suffix in (_COMPACTING_SUFFIX, _REPLACED_SUFFIX):
+                if name.endswith(suffix):
+                    _recover_compaction(
+                        self._get_collection_directory(name[: -len(suffix)])
+                    )
+                    break
+
+    def _get_collection_directory(self, collection_name: str) -> str:
+        return os.path.join(self.config.path, collection_name)
+
+    def _get_collection(self, collection_name: str) -> _EmbeddedCollection:
+        with self._lock:
+            directory = self._get_collection_directory(collection_name)
+            collection = self._collections.get(collection_name)
+            if not os.path.exists(os.path.join(directory, _META_FILE)):
+                # Deleted by another process
+                if collection is not None:
+                    self._collections.pop(collection_name).close()
+                raise ValueError(f"Collection {collection_name} does not exist")
+            if collection is None:
+                collection = _EmbeddedCollection(directory, self.config)
+                self._collections[collection_name] = collection
+            else:
+                collection.refresh()
+            return collection
+
+    def create_collection(
+        self,
+        collection_name: str,
+        embeddings: Embeddings,
+        vector_index_config: Optional[VectorIndexConfig] = None,
+    ):
+        # Index settings are only supported on Qdrant
+        logger.debug(f"[Embedded] Creating new collection {collection_name}")
+        directory = self._get_collection_directory(collection_name)
+        if os.path.exists(os.path.join(directory, _META_FILE)):
+            raise ValueError(f"Collection {collection_name} already exists")
+        vector_size = len(embeddings.embed_documents(["Initial document"])[0])
+        logger.debug(f"Vector size: {vector_size}")
+        with self._lock:
+            self._collections[collection_name] = _EmbeddedCollection(
+                directory, self.config, dimension=vector_size
+            )
+        logger.debug(f"[Embedded] Created new collection {collection_name}")
+
+    def upsert_documents(
+        self,
+        collection_name: str,
+        documents: List[Document],
+        embeddings: Embeddings,
+        incremental: bool = True,
+    ):
+        """
+        Adds the documents. In incremental mode, the earlier vectors of their data
+        points are then deleted.
+        """
+        if len(documents) == 0:
+            logger.warning("No documents to index")
+            return
+        logger.debug(
+            f"[Embedded] Adding {len(documents)} documents to collection {collection_name}"
+        )
+        collection = self._get_collection(collection_name)
+        outdated_rows = (
+            collection.get_rows_by_data_point_fqns(
+                {
+                    document.metadata.get(DATA_POINT_FQN_METADATA_KEY)
+                    for document in documents
+                    if document.metadata.get(DATA_POINT_FQN_METADATA_KEY)
+                }
+            )
+            if incremental
+            else set()
+        )
+        for i in range(0, len(documents), EMBEDDING_BATCH_SIZE):
+            documents_to_be_processed = documents[i : i + EMBEDDING_BATCH_SIZE]
+            collection.add(
+                ids=[str(uuid.uuid4()) for _ in documents_to_be_processed],
+                vectors=np.asarray(
+                    embeddings.embed_documents(
+                        [
+                            document.page_content
+                            for document in documents_to_be_processed
+                        ]
+                    ),
+                    dtype=np.float32,
+                ),
+                documents=documents_to_be_processed,
+            )
+        if outdated_rows:
+            logger.debug(
+                f"[Embedded] Deleting {len(outdated_rows)} outdated vectors from collection {collection_name}"
+            )
+            collection.delete(outdated_rows)
+        logger.debug(
+            f"[Embedded] Added {len(documents)} documents to collection {collection_name}"
+        )
+
+    def get_collections(self) -> List[str]:
+        return sorted(
+            name
+            for name in os.listdir(self.config.path)
+            if not name.endswith((_COMPACTING_SUFFIX, _REPLACED_SUFFIX))
+            and os.path.exists(os.path.join(self.config.path, name, _META_FILE))
+        )
+
+    def delete_collection(self, collection_name: str):
+        logger.debug(f"[Embedded] Deleting {collection_name} collection")
+        with self._lock:
+            collection = self._collections.pop(collection_name, None)
+            if collection is not None:
+                collection.close()
+            shutil.rmtree(
+                self._get_collection_directory(collection_name), ignore_errors=True
+            )
+        logger.debug(f"[Embedded] Deleted {collection_name} collection")
+
+    def get_vector_store(self, collection_name: str, embeddings: Embeddings):
+        logger.debug(
+            f"[Embedded] Getting vector store for collection {collection_name}"
+        )
+        return EmbeddedVectorStore(
+            collection=self._get_collection(collection_name), embeddings=embeddings
+        )
+
+    def get_vector_client(self):
+        return self
+
+    def iter_vector_records(
+        self,
+        collection_name: str,
+        batch_size: int = DEFAULT_BATCH_SIZE_FOR_VECTOR_STORE,
+    ) -> Iterator[List[VectorRecord]]:
+        """
+        Streams the rows live at the start of the iteration and not deleted since
+        """
+        logger.debug(
+            f"[Embedded] Reading vector records of collection {collection_name}"
+        )
+        collection = self._get_collection(collection_name)
+        rows = collection.get_live_rows()
+        for i in range(0, len(rows), batch_size):
+            yield collection.get_vector_records(rows[i : i + batch_size])
+
+    def upsert_vector_records(
+        self, collection_name: str, vector_records: List[VectorRecord]
+    ):
+        logger.debug(
+            f"[Embedded] Writing {len(vector_records)} vector records to collection {collection_name}"
+        )
+        self._get_collection(collection_name).add(
+            ids=[record.id for record in vector_records],
+            vectors=np.asarray(
+                [record.vector for record in vector_records], dtype=np.float32
+            ),
+            documents=[
+                Document(page_content=record.page_content, metadata=record.metadata)
+                for record in vector_records
+            ],
+        )
+
+    def iter_data_point_vectors(
+        self,
+        collection_name: str,
+        data_source_fqn: Optional[str],
+        batch_size: int = DEFAULT_BATCH_SIZE_FOR_VECTOR_STORE,
+    ) -> Iterator[List[DataPointVectorRecord]]:
+        logger.debug(
+            f"[Embedded] Listing all data point vectors for collection {collection_name}"
+        )
+        data_point_vectors = self._get_collection(
+            collection_name
+        ).get_data_point_vector_records(data_source_fqn)
+        for i in range(0, len(data_point_vectors), batch_size):
+            yield data_point_vectors[i : i + batch_size]
+        logger.debug(
+            f"[Embedded] Listed {len(data_point_vectors)} data point vectors for collection {collection_name}"
+        )
+
+    def delete_data_point_vectors(
+        self,
+        collection_name: str,
+        data_point_vectors: List[DataPointVector],
+        batch_size: int = DEFAULT_BATCH_SIZE_FOR_VECTOR_STORE,
+    ):
+        logger.debug(
+            f"[Embedded] Deleting {len(data_point_vectors)} data point vectors"
+        )
+        collection = self._get_collection(collection_name)
+        collection.delete(
+            collection.row_by_id[data_point_vector.data_point_vector_id]
+            for data_point_vector in data_point_vectors
+            if data_point_vector.data_point_vector_id in collection.row_by_id
+        )
+        logger.debug(f"[Embedded] Deleted {len(data_point_vectors)} data point vectors")
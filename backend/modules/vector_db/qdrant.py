@@ -1,23 +1,87 @@
-from typing import List
+import hashlib
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Union
 from urllib.parse import urlparse
 
+import httpx
+from langchain.callbacks.manager import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain.docstore.document import Document
 from langchain.embeddings.base import Embeddings
+from langchain.schema import BaseRetriever
 from langchain_community.vectorstores.qdrant import Qdrant
-from qdrant_client import QdrantClient, models
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
 from qdrant_client.http.models import Distance, VectorParams
 
-from backend.constants import DATA_POINT_FQN_METADATA_KEY, DATA_POINT_HASH_METADATA_KEY
+from backend.constants import (
+    DATA_POINT_FQN_METADATA_KEY,
+    DATA_POINT_HASH_METADATA_KEY,
+    DATA_SOURCE_FQN_METADATA_KEY,
+    FQN_SEPARATOR,
+)
 from backend.logger import logger
 from backend.modules.vector_db.base import BaseVectorDB
-from backend.types.core import DataPointVector, QdrantClientConfig, VectorDBConfig
+from backend.modules.vector_db.bm25 import BM25SparseEncoder
+from backend.modules.vector_db.data_point_index import (
+    DataPointVectorRecord,
+    make_data_point_vector_record,
+)
+from backend.settings import settings
+from backend.types.core import (
+    DataPointVector,
+    QdrantClientConfig,
+    VectorDBConfig,
+    VectorIndexConfig,
+    VectorQuantizationConfig,
+    VectorQuantizationType,
+    VectorRecord,
+)
+from backend.utils import get_data_source_fqn, run_in_executor
 
 MAX_SCROLL_LIMIT = int(1e6)
 BATCH_SIZE = 1000
+# Same batch size as the langchain Qdrant wrapper uses when adding documents
+UPSERT_BATCH_SIZE = 64
+# Namespace of the deterministic point ids, never change it or re-runs stop overwriting points
+POINT_ID_NAMESPACE = uuid.UUID("5b3f1e2a-8c4d-5e6f-9a7b-0c1d2e3f4a5b")
+# Options of QdrantClientConfig that configure the async client rather than being client kwargs
+ASYNC_CLIENT_CONFIG_FIELDS = {
+    "async_client",
+    "max_connections",
+    "max_keepalive_connections",
+}
+# Name of the BM25 sparse vector, the dense vector stays unnamed
+SPARSE_VECTOR_NAME = "bm25"
+# Rank constant of reciprocal rank fusion
+RRF_K = 60
+# Shadow collections are named <collection name>__shadow__<shadow id>
+SHADOW_COLLECTION_INFIX = "__shadow__"
+# Qdrant's default, in KB of vectors per segment. Shadow collections are bulk loaded with
+# indexing disabled (threshold 0) and indexed once all points are written
+INDEXING_THRESHOLD = 20000
+SHADOW_COLLECTION_OPTIMIZE_TIMEOUT = 3600
+SHADOW_COLLECTION_OPTIMIZE_POLL_INTERVAL = 5
+# Qdrant vacuums segments once 20% of their points are deleted, and only when they hold at
+# least 1000 vectors by default. Compacting lowers both until the collection is optimized
+COMPACT_DELETED_THRESHOLD = 0.01
+COMPACT_VACUUM_MIN_VECTOR_NUMBER = 100
 
 
 class QdrantVectorDB(BaseVectorDB):
+    deterministic_point_ids = True
+
     def __init__(self, config: VectorDBConfig):
         logger.debug(f"Connecting to qdrant using config: {config.model_dump()}")
+        # Only set up in remote mode, a local database can be opened by a single client
+        self.async_qdrant_client: Optional[AsyncQdrantClient] = None
+        # Created on first use, only collections with sparse vectors need it
+        self._bm25_encoder: Optional[BM25SparseEncoder] = None
+        # collection name -> whether the collection has a BM25 sparse vector
+        self._has_sparse_vectors: Dict[str, bool] = {}
         if config.local is True:
             # TODO: make this path customizable
             self.qdrant_client = QdrantClient(
@@ -36,12 +100,71 @@ class QdrantVectorDB(BaseVectorDB):
                         qdrant_kwargs.port = parsed_port
                     else:
                         qdrant_kwargs.port = 443 if url.startswith("https://") else 6333
-            self.qdrant_client = QdrantClient(
-                url=url, api_key=api_key, **qdrant_kwargs.model_dump()
-            )
+            client_kwargs = qdrant_kwargs.model_dump(exclude=ASYNC_CLIENT_CONFIG_FIELDS)
+            self.qdrant_client = QdrantClient(url=url, api_key=api_key, **client_kwargs)
+            if qdrant_kwargs.async_client:
+                logger.debug(
+                    f"[Qdrant] Creating async client with {qdrant_kwargs.max_connections} max connections"
+                )
+                # One client, and so one connection pool, shared by all concurrent queries
+                self.async_qdrant_client = AsyncQdrantClient(
+                    url=url,
+                    api_key=api_key,
+                    limits=httpx.Limits(
+                        max_connections=qdrant_kwargs.max_connections,
+                        max_keepalive_connections=qdrant_kwargs.max_keepalive_connections,
+                    ),
+                    **client_kwargs,
+                )
 
-    def create_collection(self, collection_name: str, embeddings: Embeddings):
+    def create_collection(
+        self,
+        collection_name: str,
+        embeddings: Embeddings,
+        vector_index_config: Optional[VectorIndexConfig] = None,
+    ):
+        """
+        Creates the collection as an alias over a versioned physical collection, so re-indexing
+        can later serve a shadow collection under the same name with a single alias update
+        """
+        if self._get_alias_target(
+            collection_name
+        ) is not None or self.qdrant_client.collection_exists(
+            collection_name=collection_name
+        ):
+            raise ValueError(f"Collection {collection_name} already exists")
+        physical_collection_name = (
+            f"{collection_name}{SHADOW_COLLECTION_INFIX}{uuid.uuid4().hex}"
+        )
+        self._create_collection(
+            collection_name=physical_collection_name,
+            embeddings=embeddings,
+            vector_index_config=vector_index_config,
+        )
+        self.qdrant_client.update_collection_aliases(
+            change_aliases_operations=[
+                models.CreateAliasOperation(
+                    create_alias=models.CreateAlias(
+                        collection_name=physical_collection_name,
+                        alias_name=collection_name,
+                    )
+                )
+            ]
+        )
+        self._has_sparse_vectors.pop(collection_name, None)
+        logger.debug(
+            f"[Qdrant] Collection {collection_name} is served from {physical_collection_name}"
+        )
+
+    def _create_collection(
+        self,
+        collection_name: str,
+        embeddings: Embeddings,
+        vector_index_config: Optional[VectorIndexConfig] = None,
+        optimizers_config: Optional[models.OptimizersConfigDiff] = None,
+    ):
         logger.debug(f"[Qdrant] Creating new collection {collection_name}")
+        vector_index_config = vector_index_config or VectorIndexConfig()
 
         # Calculate embedding size
         logger.debug(f"[Qdrant] Embedding a dummy doc to get vector dimensions")
@@ -54,150 +177,548 @@ class QdrantVectorDB(BaseVectorDB):
             vectors_config=VectorParams(
                 size=vector_size,  # embedding dimension
                 distance=Distance.COSINE,
-                on_disk=True,
+                on_disk=vector_index_config.on_disk,
             ),
-            replication_factor=3,
-        )
-        self.qdrant_client.create_payload_index(
-            collection_name=collection_name,
-            field_name=f"metadata.{DATA_POINT_FQN_METADATA_KEY}",
-            field_schema=models.PayloadSchemaType.KEYWORD,
+            replication_factor=vector_index_config.replication_factor,
+            on_disk_payload=vector_index_config.on_disk_payload,
+            hnsw_config=(
+                models.HnswConfigDiff(
+                    m=vector_index_config.hnsw_m,
+                    ef_construct=vector_index_config.hnsw_ef_construct,
+                )
+                if vector_index_config.hnsw_m is not None
+                or vector_index_config.hnsw_ef_construct is not None
+                else None
+            ),
+            quantization_config=self._get_quantization_config(
+                vector_index_config.quantization
+            ),
+            sparse_vectors_config=(
+                {
+                    SPARSE_VECTOR_NAME: models.SparseVectorParams(
+                        index=models.SparseIndexParams(
+                            on_disk=vector_index_config.on_disk
+                        )
+                    )
+                }
+                if vector_index_config.sparse_vectors
+                else None
+            ),
+            optimizers_config=optimizers_config,
         )
+        self._has_sparse_vectors[collection_name] = vector_index_config.sparse_vectors
+        for field_name in (DATA_POINT_FQN_METADATA_KEY, DATA_SOURCE_FQN_METADATA_KEY):
+            self.qdrant_client.create_payload_index(
+                collection_name=collection_name,
+                field_name=f"metadata.{field_name}",
+                field_schema=models.PayloadSchemaType.KEYWORD,
+            )
         logger.debug(f"[Qdrant] Created new collection {collection_name}")
 
-    def _get_records_to_be_upserted(
-        self, collection_name: str, data_point_fqns: List[str], incremental: bool
+    def create_shadow_collection(
+        self,
+        collection_name: str,
+        shadow_id: str,
+        embeddings: Embeddings,
+        vector_index_config: Optional[VectorIndexConfig] = None,
+    ) -> str:
+        shadow_collection_name = (
+            f"{collection_name}{SHADOW_COLLECTION_INFIX}{shadow_id}"
+        )
+        if self.qdrant_client.collection_exists(collection_name=shadow_collection_name):
+            logger.debug(
+                f"[Qdrant] Reusing shadow collection {shadow_collection_name} of {collection_name}"
+            )
+            return shadow_collection_name
+        # No HNSW index is built while bulk loading, it is built once in swap_shadow_collection
+        self._create_collection(
+            collection_name=shadow_collection_name,
+            embeddings=embeddings,
+            vector_index_config=vector_index_config,
+            optimizers_config=models.OptimizersConfigDiff(indexing_threshold=0),
+        )
+        return shadow_collection_name
+
+    def swap_shadow_collection(
+        self,
+        collection_name: str,
+        shadow_collection_name: str,
+        expected_point_count: Optional[int] = None,
     ):
-        if not incremental:
-            return []
-        # For incremental deletion, we delete the documents with the same document_id
+        """
+        Indexes the shadow collection, waits for all of its points to be indexed and points the
+        alias named after the collection to it, in one atomic alias update. Only collections
+        created before they were aliases are still physical collections under their own name:
+        their first swap deletes it right before the alias takes its name, so queries fail in
+        between.
+
+        Shadow points are written without waiting, a final awaited write makes sure all of them
+        are applied before the collection is counted and indexed. The swap is aborted if the
+        shadow collection does not hold `expected_point_count` points.
+        """
+        # Updates of a collection are applied in order, so once this no-op delete is applied
+        # all earlier writes are too
+        self.qdrant_client.delete(
+            collection_name=shadow_collection_name,
+            points_selector=models.PointIdsList(points=[]),
+            wait=True,
+        )
+        if expected_point_count is not None:
+            point_count = self.qdrant_client.count(
+                collection_name=shadow_collection_name, exact=True
+            ).count
+            if point_count != expected_point_count:
+                raise Exception(
+                    f"[Qdrant] Shadow collection {shadow_collection_name} holds {point_count} "
+                    f"points, {expected_point_count} were written, not swapping it in"
+                )
         logger.debug(
-            f"[Qdrant] Incremental Ingestion: Fetching documents for {len(data_point_fqns)} data point fqns for collection {collection_name}"
+            f"[Qdrant] Indexing shadow collection {shadow_collection_name} of {collection_name}"
         )
-        stop = False
-        offset = None
-        record_ids_to_be_upserted = []
-        while stop is not True:
-            records, next_offset = self.qdrant_client.scroll(
-                collection_name=collection_name,
-                scroll_filter=models.Filter(
-                    should=[
-                        models.FieldCondition(
-                            key=f"metadata.{DATA_POINT_FQN_METADATA_KEY}",
-                            match=models.MatchAny(
-                                any=data_point_fqns,
-                            ),
-                        ),
-                    ]
+        self.qdrant_client.update_collection(
+            collection_name=shadow_collection_name,
+            optimizer_config=models.OptimizersConfigDiff(
+                indexing_threshold=INDEXING_THRESHOLD
+            ),
+        )
+        self._wait_for_collection_optimized(shadow_collection_name, indexed=True)
+
+        previous_collection_name = self._get_alias_target(collection_name)
+        alias_operations = []
+        if previous_collection_name is not None:
+            alias_operations.append(
+                models.DeleteAliasOperation(
+                    delete_alias=models.DeleteAlias(alias_name=collection_name)
+                )
+            )
+        elif self.qdrant_client.collection_exists(collection_name=collection_name):
+            logger.warning(
+                f"[Qdrant] Replacing legacy physical collection {collection_name} by an alias"
+            )
+            self.qdrant_client.delete_collection(collection_name=collection_name)
+        alias_operations.append(
+            models.CreateAliasOperation(
+                create_alias=models.CreateAlias(
+                    collection_name=shadow_collection_name, alias_name=collection_name
+                )
+            )
+        )
+        self.qdrant_client.update_collection_aliases(
+            change_aliases_operations=alias_operations
+        )
+        logger.debug(
+            f"[Qdrant] Collection {collection_name} is served from {shadow_collection_name}"
+        )
+        if (
+            previous_collection_name is not None
+            and previous_collection_name != shadow_collection_name
+        ):
+            self.qdrant_client.delete_collection(
+                collection_name=previous_collection_name
+            )
+        # BM25 statistics are looked up under the name queries use
+        if self.has_sparse_vectors(shadow_collection_name):
+            self.bm25_encoder.rename_collection(shadow_collection_name, collection_name)
+        self._has_sparse_vectors.pop(collection_name, None)
+        self._has_sparse_vectors.pop(shadow_collection_name, None)
+
+    def compact_collection(self, collection_name: str):
+        """
+        Vacuums the segments holding deleted points, by lowering the thresholds of the vacuum
+        optimizer until the collection is optimized, then restoring the collection's own thresholds
+        """
+        physical_collection_name = (
+            self._get_alias_target(collection_name) or collection_name
+        )
+        logger.debug(f"[Qdrant] Compacting collection {physical_collection_name}")
+        optimizer_config = self.qdrant_client.get_collection(
+            collection_name=physical_collection_name
+        ).config.optimizer_config
+        self.qdrant_client.update_collection(
+            collection_name=physical_collection_name,
+            optimizer_config=models.OptimizersConfigDiff(
+                deleted_threshold=COMPACT_DELETED_THRESHOLD,
+                vacuum_min_vector_number=COMPACT_VACUUM_MIN_VECTOR_NUMBER,
+            ),
+        )
+        try:
+            self._wait_for_collection_optimized(physical_collection_name)
+        finally:
+            self.qdrant_client.update_collection(
+                collection_name=physical_collection_name,
+                optimizer_config=models.OptimizersConfigDiff(
+                    deleted_threshold=optimizer_config.deleted_threshold,
+                    vacuum_min_vector_number=optimizer_config.vacuum_min_vector_number,
                 ),
-                limit=BATCH_SIZE,
-                offset=offset,
-                with_payload=False,
-                with_vectors=False,
             )
-            for record in records:
-                record_ids_to_be_upserted.append(record.id)
-                if len(record_ids_to_be_upserted) > MAX_SCROLL_LIMIT:
-                    stop = True
-                    break
-            if next_offset is None:
-                stop = True
-            else:
-                offset = next_offset
+        logger.debug(f"[Qdrant] Compacted collection {physical_collection_name}")
 
-        logger.debug(
-            f"[Qdrant] Incremental Ingestion: collection={collection_name} Addition={len(data_point_fqns)}, Updates={len(record_ids_to_be_upserted)}"
+    def _wait_for_collection_optimized(
+        self, collection_name: str, indexed: bool = False
+    ):
+        """
+        Waits for the collection to be GREEN and, if `indexed`, for all of its vectors to be
+        indexed. A collection may report GREEN before its optimizer picked up a config change.
+        """
+        deadline = time.time() + SHADOW_COLLECTION_OPTIMIZE_TIMEOUT
+        while True:
+            collection_info = self.qdrant_client.get_collection(
+                collection_name=collection_name
+            )
+            status = collection_info.status
+            if status == models.CollectionStatus.GREEN and (
+                not indexed or self._is_collection_indexed(collection_info)
+            ):
+                return
+            if status == models.CollectionStatus.RED:
+                raise Exception(
+                    f"[Qdrant] Failed to optimize collection {collection_name}"
+                )
+            if time.time() > deadline:
+                raise Exception(
+                    f"[Qdrant] Collection {collection_name} was not optimized within {SHADOW_COLLECTION_OPTIMIZE_TIMEOUT}s"
+                )
+            time.sleep(SHADOW_COLLECTION_OPTIMIZE_POLL_INTERVAL)
+
+    @staticmethod
+    def _is_collection_indexed(collection_info: models.CollectionInfo) -> bool:
+        points_count = collection_info.points_count or 0
+        if (collection_info.indexed_vectors_count or 0) >= points_count:
+            return True
+        # Segments below the indexing threshold are never indexed, they are searched in full
+        vector_size = collection_info.config.params.vectors.size
+        return points_count * vector_size * 4 < INDEXING_THRESHOLD * 1024
+
+    def _get_alias_target(self, alias_name: str) -> Optional[str]:
+        for alias in self.qdrant_client.get_aliases().aliases:
+            if alias.alias_name == alias_name:
+                return alias.collection_name
+        return None
+
+    def _get_shadow_collection_names(self, collection_name: str) -> List[str]:
+        return [
+            collection.name
+            for collection in self.qdrant_client.get_collections().collections
+            if collection.name.startswith(f"{collection_name}{SHADOW_COLLECTION_INFIX}")
+        ]
+
+    def _get_quantization_config(
+        self, quantization: Optional[VectorQuantizationConfig]
+    ) -> Optional[models.QuantizationConfig]:
+        if quantization is None:
+            return None
+        logger.debug(f"[Qdrant] Using {quantization.type} quantization")
+        if quantization.type == VectorQuantizationType.SCALAR:
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8,
+                    quantile=quantization.quantile,
+                    always_ram=quantization.always_ram,
+                )
+            )
+        if quantization.type == VectorQuantizationType.PRODUCT:
+            return models.ProductQuantization(
+                product=models.ProductQuantizationConfig(
+                    compression=models.CompressionRatio(quantization.compression),
+                    always_ram=quantization.always_ram,
+                )
+            )
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(
+                always_ram=quantization.always_ram,
+            )
+        )
+
+    @property
+    def bm25_encoder(self) -> BM25SparseEncoder:
+        if self._bm25_encoder is None:
+            self._bm25_encoder = BM25SparseEncoder(settings.BM25_CONFIG)
+        return self._bm25_encoder
+
+    def has_sparse_vectors(self, collection_name: str) -> bool:
+        """
+        Whether the collection stores a BM25 sparse vector next to the dense one
+        """
+        if collection_name not in self._has_sparse_vectors:
+            collection_info = self.qdrant_client.get_collection(
+                collection_name=collection_name
+            )
+            self._has_sparse_vectors[collection_name] = SPARSE_VECTOR_NAME in (
+                collection_info.config.params.sparse_vectors or {}
+            )
+        return self._has_sparse_vectors[collection_name]
+
+    def _get_point_ids(self, documents: List[Document]) -> List[str]:
+        """
+        Deterministic point ids, derived from the data point fqn and hash and the index and content
+        of the chunk within its data point. Writing the same chunks again overwrites the same points.
+        """
+        point_ids = []
+        chunk_indexes: Dict[str, int] = defaultdict(int)
+        for document in documents:
+            data_point_fqn = document.metadata.get(DATA_POINT_FQN_METADATA_KEY) or ""
+            chunk_index = chunk_indexes[data_point_fqn]
+            chunk_indexes[data_point_fqn] += 1
+            chunk_hash = hashlib.sha256(
+                document.page_content.encode("utf-8")
+            ).hexdigest()
+            point_ids.append(
+                str(
+                    uuid.uuid5(
+                        POINT_ID_NAMESPACE,
+                        FQN_SEPARATOR.join(
+                            [
+                                data_point_fqn,
+                                document.metadata.get(DATA_POINT_HASH_METADATA_KEY)
+                                or "",
+                                str(chunk_index),
+                                chunk_hash,
+                            ]
+                        ),
+                    )
+                )
+            )
+        return point_ids
+
+    def _get_payload_metadata(self, metadata: dict) -> dict:
+        """
+        Metadata of a point, with the data source fqn of its data point as a separate keyword
+        field, for chunks written without it, e.g. when copied from another vector db
+        """
+        data_point_fqn = metadata.get(DATA_POINT_FQN_METADATA_KEY)
+        if not data_point_fqn or metadata.get(DATA_SOURCE_FQN_METADATA_KEY):
+            return metadata
+        return {
+            **metadata,
+            DATA_SOURCE_FQN_METADATA_KEY: get_data_source_fqn(data_point_fqn),
+        }
+
+    def _has_payload_index(self, collection_name: str, field_name: str) -> bool:
+        payload_schema = (
+            self.qdrant_client.get_collection(
+                collection_name=collection_name
+            ).payload_schema
+            or {}
         )
-        return record_ids_to_be_upserted
+        return f"metadata.{field_name}" in payload_schema
+
+    def _delete_stale_points(
+        self, collection_name: str, point_ids_by_data_point_fqn: Dict[str, List[str]]
+    ):
+        """
+        Deletes the points of the given data points that were not just written: chunks of an
+        older version and the tail of chunks beyond the current chunk count
+        """
+        data_point_fqns = list(point_ids_by_data_point_fqn)
+        for i in range(0, len(data_point_fqns), BATCH_SIZE):
+            batch = data_point_fqns[i : i + BATCH_SIZE]
+            self.qdrant_client.delete(
+                collection_name=collection_name,
+                points_selector=models.FilterSelector(
+                    filter=models.Filter(
+                        must=[
+                            models.FieldCondition(
+                                key=f"metadata.{DATA_POINT_FQN_METADATA_KEY}",
+                                match=models.MatchAny(any=batch),
+                            ),
+                        ],
+                        # Only the points just written for the data points of this batch
+                        must_not=[
+                            models.HasIdCondition(
+                                has_id=[
+                                    point_id
+                                    for data_point_fqn in batch
+                                    for point_id in point_ids_by_data_point_fqn[
+                                        data_point_fqn
+                                    ]
+                                ]
+                            )
+                        ],
+                    )
+                ),
+            )
 
     def upsert_documents(
         self,
         collection_name: str,
-        documents,
+        documents: List[Document],
         embeddings: Embeddings,
         incremental: bool = True,
     ):
+        """
+        Upserts documents under deterministic point ids, so writing a data point again is idempotent.
+        All chunks of a data point must be upserted in the same call: once they are written, any other
+        point of the same data points is deleted. `incremental` is ignored, both modes behave the same.
+        """
         if len(documents) == 0:
             logger.warning("No documents to index")
             return
-        # get record IDs to be upserted
         logger.debug(
             f"[Qdrant] Adding {len(documents)} documents to collection {collection_name}"
         )
-        data_point_fqns = []
-        for document in documents:
-            if document.metadata.get(DATA_POINT_FQN_METADATA_KEY):
-                data_point_fqns.append(
-                    document.metadata.get(DATA_POINT_FQN_METADATA_KEY)
-                )
-        record_ids_to_be_upserted: List[str] = self._get_records_to_be_upserted(
-            collection_name=collection_name,
-            data_point_fqns=data_point_fqns,
-            incremental=incremental,
-        )
-
-        # Add Documents
-        Qdrant(
-            client=self.qdrant_client,
-            collection_name=collection_name,
-            embeddings=embeddings,
-        ).add_documents(documents=documents)
+        point_ids = self._get_point_ids(documents)
+        has_sparse_vectors = self.has_sparse_vectors(collection_name)
+        for i in range(0, len(documents), UPSERT_BATCH_SIZE):
+            documents_to_be_processed = documents[i : i + UPSERT_BATCH_SIZE]
+            texts = [document.page_content for document in documents_to_be_processed]
+            vectors = embeddings.embed_documents(texts)
+            if has_sparse_vectors:
+                vectors = [
+                    {
+                        "": vector,
+                        SPARSE_VECTOR_NAME: models.SparseVector(
+                            indices=indices, values=values
+                        ),
+                    }
+                    for vector, (indices, values) in zip(
+                        vectors,
+                        self.bm25_encoder.encode_documents(collection_name, texts),
+                    )
+                ]
+            self.qdrant_client.upsert(
+                collection_name=collection_name,
+                points=[
+                    models.PointStruct(
+                        id=point_id,
+                        vector=vector,
+                        payload={
+                            "page_content": document.page_content,
+                            "metadata": self._get_payload_metadata(document.metadata),
+                        },
+                    )
+                    for point_id, vector, document in zip(
+                        point_ids[i : i + UPSERT_BATCH_SIZE],
+                        vectors,
+                        documents_to_be_processed,
+                    )
+                ],
+                # Shadow collections are not queried until swapped in, their writes are not awaited
+                wait=SHADOW_COLLECTION_INFIX not in collection_name,
+            )
         logger.debug(
             f"[Qdrant] Added {len(documents)} documents to collection {collection_name}"
         )
 
         # Delete Documents
-        if len(record_ids_to_be_upserted):
+        point_ids_by_data_point_fqn: Dict[str, List[str]] = defaultdict(list)
+        for point_id, document in zip(point_ids, documents):
+            data_point_fqn = document.metadata.get(DATA_POINT_FQN_METADATA_KEY)
+            if data_point_fqn:
+                point_ids_by_data_point_fqn[data_point_fqn].append(point_id)
+        if point_ids_by_data_point_fqn:
             logger.debug(
-                f"[Qdrant] Deleting {len(documents)} outdated documents from collection {collection_name}"
+                f"[Qdrant] Deleting stale points of {len(point_ids_by_data_point_fqn)} data points from collection {collection_name}"
+            )
+            self._delete_stale_points(
+                collection_name=collection_name,
+                point_ids_by_data_point_fqn=point_ids_by_data_point_fqn,
             )
-            for i in range(0, len(record_ids_to_be_upserted), BATCH_SIZE):
-                record_ids_to_be_processed = record_ids_to_be_upserted[
-                    i : i + BATCH_SIZE
-                ]
-                self.qdrant_client.delete(
-                    collection_name=collection_name,
-                    points_selector=models.PointIdsList(
-                        points=record_ids_to_be_processed,
-                    ),
-                )
             logger.debug(
-                f"[Qdrant] Deleted {len(documents)} outdated documents from collection {collection_name}"
+                f"[Qdrant] Deleted stale points of {len(point_ids_by_data_point_fqn)} data points from collection {collection_name}"
             )
 
     def get_collections(self) -> List[str]:
         logger.debug(f"[Qdrant] Fetching collections")
         collections = self.qdrant_client.get_collections().collections
         logger.debug(f"[Qdrant] Fetched {len(collections)} collections")
-        return [collection.name for collection in collections]
+        # Re-indexed collections are served through an alias to their current shadow collection
+        return [
+            collection.name
+            for collection in collections
+            if SHADOW_COLLECTION_INFIX not in collection.name
+        ] + [alias.alias_name for alias in self.qdrant_client.get_aliases().aliases]
 
     def delete_collection(self, collection_name: str):
         logger.debug(f"[Qdrant] Deleting {collection_name} collection")
-        self.qdrant_client.delete_collection(collection_name=collection_name)
+        self._has_sparse_vectors.pop(collection_name, None)
+        # Deleting the shadow collection an alias points to deletes the alias too
+        if self._get_alias_target(collection_name) is None:
+            self.qdrant_client.delete_collection(collection_name=collection_name)
+        # BM25 statistics are always deleted, the collection may have been ingested by another
+        # process, and a new collection with the same name must not inherit them
+        for shadow_collection_name in self._get_shadow_collection_names(
+            collection_name
+        ):
+            self.qdrant_client.delete_collection(collection_name=shadow_collection_name)
+            self._has_sparse_vectors.pop(shadow_collection_name, None)
+            self.bm25_encoder.delete_collection(shadow_collection_name)
+        self.bm25_encoder.delete_collection(collection_name)
         logger.debug(f"[Qdrant] Deleted {collection_name} collection")
 
     def get_vector_store(self, collection_name: str, embeddings: Embeddings):
         logger.debug(f"[Qdrant] Getting vector store for collection {collection_name}")
+        # With an async client, async searches of the retrievers no longer block a worker thread
         return Qdrant(
             client=self.qdrant_client,
             embeddings=embeddings,
             collection_name=collection_name,
+            async_client=self.async_qdrant_client,
+        )
+
+    def get_hybrid_retriever(self, vector_store: Qdrant, search_kwargs: dict):
+        logger.debug(
+            f"[Qdrant] Getting hybrid retriever for collection {vector_store.collection_name}"
+        )
+        if not self.has_sparse_vectors(vector_store.collection_name):
+            raise ValueError(
+                f"Collection {vector_store.collection_name} has no sparse vectors, create it with "
+                f"`sparse_vectors` enabled in its vector index config to use hybrid search"
+            )
+        return QdrantHybridRetriever(
+            vectorstore=vector_store,
+            bm25_encoder=self.bm25_encoder,
+            **{
+                key: value
+                for key, value in search_kwargs.items()
+                if key in ("k", "fetch_k", "filter", "search_params")
+            },
         )
 
     def get_vector_client(self):
         logger.debug(f"[Qdrant] Getting Qdrant client")
         return self.qdrant_client
 
-    def list_data_point_vectors(
-        self, collection_name: str, data_source_fqn: str, batch_size: int = BATCH_SIZE
-    ) -> List[DataPointVector]:
+    def iter_data_point_vectors(
+        self,
+        collection_name: str,
+        data_source_fqn: Optional[str],
+        batch_size: int = BATCH_SIZE,
+    ) -> Iterator[List[DataPointVectorRecord]]:
         logger.debug(
             f"[Qdrant] Listing all data point vectors for collection {collection_name}"
         )
-        stop = False
+        # The data source fqn field is indexed once all points carry it, i.e. for new
+        # collections and after backfill_data_source_fqn
+        if data_source_fqn is None:
+            scroll_filter = None
+        elif self._has_payload_index(collection_name, DATA_SOURCE_FQN_METADATA_KEY):
+            scroll_filter = models.Filter(
+                must=[
+                    models.FieldCondition(
+                        key=f"metadata.{DATA_SOURCE_FQN_METADATA_KEY}",
+                        match=models.MatchValue(value=data_source_fqn),
+                    ),
+                ]
+            )
+        else:
+            logger.warning(
+                f"[Qdrant] Collection {collection_name} has no {DATA_SOURCE_FQN_METADATA_KEY} index, "
+                f"scanning it for the data points of {data_source_fqn}. Run "
+                f"backend.migration.qdrant_backfill_data_source_fqn to index them"
+            )
+            scroll_filter = models.Filter(
+                should=[
+                    models.FieldCondition(
+                        key=f"metadata.{DATA_POINT_FQN_METADATA_KEY}",
+                        match=models.MatchText(
+                            text=data_source_fqn,
+                        ),
+                    ),
+                ]
+            )
         offset = None
-        data_point_vectors: List[DataPointVector] = []
-        while stop is not True:
+        count = 0
+        while True:
             records, next_offset = self.qdrant_client.scroll(
                 collection_name=collection_name,
                 limit=batch_size,
@@ -205,44 +726,39 @@ class QdrantVectorDB(BaseVectorDB):
                     f"metadata.{DATA_POINT_FQN_METADATA_KEY}",
                     f"metadata.{DATA_POINT_HASH_METADATA_KEY}",
                 ],
-                scroll_filter=models.Filter(
-                    should=[
-                        models.FieldCondition(
-                            key=f"metadata.{DATA_POINT_FQN_METADATA_KEY}",
-                            match=models.MatchText(
-                                text=data_source_fqn,
-                            ),
-                        ),
-                    ]
-                ),
+                scroll_filter=scroll_filter,
                 with_vectors=False,
                 offset=offset,
             )
+            data_point_vectors: List[DataPointVectorRecord] = []
             for record in records:
                 metadata: dict = record.payload.get("metadata")
                 if (
                     metadata
                     and metadata.get(DATA_POINT_FQN_METADATA_KEY)
                     and metadata.get(DATA_POINT_HASH_METADATA_KEY)
+                    # A full text match also matches data sources sharing tokens with this one
+                    and (
+                        data_source_fqn is None
+                        or get_data_source_fqn(metadata[DATA_POINT_FQN_METADATA_KEY])
+                        == data_source_fqn
+                    )
                 ):
                     data_point_vectors.append(
-                        DataPointVector(
-                            data_point_vector_id=record.id,
-                            data_point_fqn=metadata.get(DATA_POINT_FQN_METADATA_KEY),
-                            data_point_hash=metadata.get(DATA_POINT_HASH_METADATA_KEY),
+                        make_data_point_vector_record(
+                            record.id,
+                            metadata.get(DATA_POINT_FQN_METADATA_KEY),
+                            metadata.get(DATA_POINT_HASH_METADATA_KEY),
                         )
                     )
-                if len(data_point_vectors) > MAX_SCROLL_LIMIT:
-                    stop = True
-                    break
+            count += len(data_point_vectors)
+            yield data_point_vectors
             if next_offset is None:
-                stop = True
-            else:
-                offset = next_offset
+                break
+            offset = next_offset
         logger.debug(
-            f"[Qdrant] Listing {len(data_point_vectors)} data point vectors for collection {collection_name}"
+            f"[Qdrant] Listed {count} data point vectors for collection {collection_name}"
         )
-        return data_point_vectors
 
     def delete_data_point_vectors(
         self,
@@ -277,6 +793,165 @@ class QdrantVectorDB(BaseVectorDB):
             f"[Qdrant] Deleted {vectors_to_be_deleted_count} data point vectors"
         )
 
+    def iter_vector_records(
+        self, collection_name: str, batch_size: int = BATCH_SIZE
+    ) -> Iterator[List[VectorRecord]]:
+        logger.debug(f"[Qdrant] Reading vector records of collection {collection_name}")
+        offset = None
+        while True:
+            records, offset = self.qdrant_client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                with_payload=True,
+                with_vectors=True,
+                offset=offset,
+            )
+            yield [
+                VectorRecord(
+                    id=str(record.id),
+                    page_content=record.payload.get("page_content") or "",
+                    metadata=record.payload.get("metadata") or {},
+                    # Only the dense vector, the BM25 vector is derived from the text
+                    vector=(
+                        record.vector[""]
+                        if isinstance(record.vector, dict)
+                        else record.vector
+                    ),
+                )
+                for record in records
+            ]
+            if offset is None:
+                return
+
+    def _get_point_id(self, id: str) -> Union[str, int]:
+        """
+        Qdrant point ids are uuids or unsigned integers, other ids map to a uuid derived from them
+        """
+        try:
+            return str(uuid.UUID(id))
+        except ValueError:
+            if id.isdigit():
+                return int(id)
+            return str(uuid.uuid5(POINT_ID_NAMESPACE, id))
+
+    def upsert_vector_records(
+        self, collection_name: str, vector_records: List[VectorRecord]
+    ):
+        logger.debug(
+            f"[Qdrant] Writing {len(vector_records)} vector records to collection {collection_name}"
+        )
+        has_sparse_vectors = self.has_sparse_vectors(collection_name)
+        for i in range(0, len(vector_records), UPSERT_BATCH_SIZE):
+            vector_records_to_be_processed = vector_records[i : i + UPSERT_BATCH_SIZE]
+            vectors = [record.vector for record in vector_records_to_be_processed]
+            if has_sparse_vectors:
+                vectors = [
+                    {
+                        "": vector,
+                        SPARSE_VECTOR_NAME: models.SparseVector(
+                            indices=indices, values=values
+                        ),
+                    }
+                    for vector, (indices, values) in zip(
+                        vectors,
+                        self.bm25_encoder.encode_documents(
+                            collection_name,
+                            [
+                                record.page_content
+                                for record in vector_records_to_be_processed
+                            ],
+                        ),
+                    )
+                ]
+            self.qdrant_client.upsert(
+                collection_name=collection_name,
+                points=[
+                    models.PointStruct(
+                        id=self._get_point_id(record.id),
+                        vector=vector,
+                        payload={
+                            "page_content": record.page_content,
+                            "metadata": self._get_payload_metadata(record.metadata),
+                        },
+                    )
+                    for record, vector in zip(vector_records_to_be_processed, vectors)
+                ],
+                wait=SHADOW_COLLECTION_INFIX not in collection_name,
+            )
+
+    def backfill_data_source_fqn(
+        self, collection_name: str, batch_size: int = BATCH_SIZE
+    ) -> int:
+        """
+        Adds the data source fqn field to the points of a collection written before it existed,
+        then indexes it, which switches listing data points to exact matches on the index.
+        Points already carrying the field are left as they are, so an interrupted backfill can be
+        run again.
+
+        Args:
+            collection_name (str): Collection to backfill
+            batch_size (int, optional): Number of points read and updated at a time. Defaults to BATCH_SIZE.
+
+        Returns:
+            int: Number of points updated
+        """
+        logger.debug(
+            f"[Qdrant] Backfilling {DATA_SOURCE_FQN_METADATA_KEY} of collection {collection_name}"
+        )
+        updated_count = 0
+        offset = None
+        while True:
+            records, offset = self.qdrant_client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                scroll_filter=models.Filter(
+                    must=[
+                        models.IsEmptyCondition(
+                            is_empty=models.PayloadField(
+                                key=f"metadata.{DATA_SOURCE_FQN_METADATA_KEY}"
+                            )
+                        ),
+                    ]
+                ),
+                with_payload=[f"metadata.{DATA_POINT_FQN_METADATA_KEY}"],
+                with_vectors=False,
+                offset=offset,
+            )
+            point_ids_by_data_source_fqn: Dict[
+                str, List[Union[str, int]]
+            ] = defaultdict(list)
+            for record in records:
+                data_point_fqn = (record.payload.get("metadata") or {}).get(
+                    DATA_POINT_FQN_METADATA_KEY
+                )
+                if data_point_fqn:
+                    point_ids_by_data_source_fqn[
+                        get_data_source_fqn(data_point_fqn)
+                    ].append(record.id)
+            for data_source_fqn, point_ids in point_ids_by_data_source_fqn.items():
+                self.qdrant_client.set_payload(
+                    collection_name=collection_name,
+                    payload={DATA_SOURCE_FQN_METADATA_KEY: data_source_fqn},
+                    points=point_ids,
+                    key="metadata",
+                )
+                updated_count += len(point_ids)
+            logger.debug(
+                f"[Qdrant] Backfilled {updated_count} points of collection {collection_name}"
+            )
+            if offset is None:
+                break
+        # Indexed last: the index marks the collection as backfilled for listing
+        self.qdrant_client.create_payload_index(
+            collection_name=collection_name,
+            field_name=f"metadata.{DATA_SOURCE_FQN_METADATA_KEY}",
+            field_schema=models.PayloadSchemaType.KEYWORD,
+        )
+        logger.info(
+            f"[Qdrant] Backfilled {DATA_SOURCE_FQN_METADATA_KEY} of {updated_count} points in collection {collection_name}"
+        )
+        return updated_count
+
     def list_documents_in_collection(
         self, collection_name: str, base_document_id: str = None
     ) -> List[str]:
@@ -411,3 +1086,104 @@ class QdrantVectorDB(BaseVectorDB):
             f"[Qdrant] Listing {len(document_vector_points)} document vector points for collection {collection_name}"
         )
         return document_vector_points
+
+
+class QdrantHybridRetriever(BaseRetriever):
+    """
+    Retrieves chunks by dense similarity and BM25 keyword relevance and fuses both rankings
+    with reciprocal rank fusion. Both searches are sent to Qdrant in a single batch request.
+    """
+
+    vectorstore: Qdrant
+    bm25_encoder: BM25SparseEncoder
+    k: int = 4
+    # Candidates taken from each ranking before fusion
+    fetch_k: int = 20
+    filter: Optional[models.Filter] = None
+    search_params: Optional[models.SearchParams] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_search_requests(
+        self, dense_vector: List[float], sparse_vector
+    ) -> List[models.SearchRequest]:
+        indices, values = sparse_vector
+        requests = [
+            models.SearchRequest(
+                vector=dense_vector,
+                filter=self.filter,
+                params=self.search_params,
+                limit=max(self.fetch_k, self.k),
+                with_payload=True,
+            )
+        ]
+        if indices:
+            requests.append(
+                models.SearchRequest(
+                    vector=models.NamedSparseVector(
+                        name=SPARSE_VECTOR_NAME,
+                        vector=models.SparseVector(indices=indices, values=values),
+                    ),
+                    filter=self.filter,
+                    limit=max(self.fetch_k, self.k),
+                    with_payload=True,
+                )
+            )
+        return requests
+
+    def _fuse(self, results: List[List[models.ScoredPoint]]) -> List[Document]:
+        scores: Dict[str, float] = defaultdict(float)
+        points: Dict[str, models.ScoredPoint] = {}
+        for scored_points in results:
+            for rank, scored_point in enumerate(scored_points):
+                scores[scored_point.id] += 1 / (RRF_K + rank + 1)
+                points[scored_point.id] = scored_point
+        documents = []
+        for point_id in sorted(scores, key=scores.get, reverse=True)[: self.k]:
+            payload = points[point_id].payload or {}
+            metadata = dict(payload.get(self.vectorstore.metadata_payload_key) or {})
+            metadata["_id"] = point_id
+            metadata["relevance_score"] = scores[point_id]
+            documents.append(
+                Document(
+                    page_content=payload.get(self.vectorstore.content_payload_key, ""),
+                    metadata=metadata,
+                )
+            )
+        return documents
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        collection_name = self.vectorstore.collection_name
+        requests = self._get_search_requests(
+            self.vectorstore.embeddings.embed_query(query),
+            self.bm25_encoder.encode_query(collection_name, query),
+        )
+        return self._fuse(
+            self.vectorstore.client.search_batch(
+                collection_name=collection_name, requests=requests
+            )
+        )
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        if self.vectorstore.async_client is None:
+            return await super()._aget_relevant_documents(
+                query, run_manager=run_manager
+            )
+        collection_name = self.vectorstore.collection_name
+        requests = self._get_search_requests(
+            await self.vectorstore.embeddings.aembed_query(query),
+            # Statistics are read from the metadata store, keep the round trip off the event loop
+            await run_in_executor(
+                None, self.bm25_encoder.encode_query, collection_name, query
+            ),
+        )
+        return self._fuse(
+            await self.vectorstore.async_client.search_batch(
+                collection_name=collection_name, requests=requests
+            )
+        )
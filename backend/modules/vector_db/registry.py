@@ -0,0 +1,55 @@
+import threading
+from typing import Dict, Tuple
+
+from langchain.schema.vectorstore import VectorStore
+
+from backend.logger import logger
+from backend.modules.model_gateway.model_gateway import model_gateway
+from backend.modules.vector_db.base import BaseVectorDB
+
+
+class VectorStoreRegistry:
+    """
+    Process wide cache of the langchain vector stores of collections, keyed by
+    (collection name, embedder name).
+
+    The vector stores share the embedders of the model gateway, so their HTTP clients and
+    connections to the embedding endpoint are reused across queries. Entries of a collection
+    are dropped with `invalidate` when it is deleted or recreated, a changed embedder
+    resolves to a new entry.
+    """
+
+    def __init__(self, vector_db: BaseVectorDB):
+        self.vector_db = vector_db
+        self._vector_stores: Dict[Tuple[str, str], VectorStore] = {}
+        self._lock = threading.Lock()
+
+    def get_vector_store(self, collection_name: str, embedder_name: str) -> VectorStore:
+        key = (collection_name, embedder_name)
+        vector_store = self._vector_stores.get(key)
+        if vector_store is not None:
+            return vector_store
+        with self._lock:
+            vector_store = self._vector_stores.get(key)
+            if vector_store is None:
+                logger.debug(
+                    f"Caching vector store of collection {collection_name} with embedder {embedder_name}"
+                )
+                vector_store = self.vector_db.get_vector_store(
+                    collection_name=collection_name,
+                    embeddings=model_gateway.get_embedder_from_model_config(
+                        model_name=embedder_name
+                    ),
+                )
+                # Entries of a collection embedded with an older embedder are stale
+                for cached_key in list(self._vector_stores):
+                    if cached_key[0] == collection_name:
+                        del self._vector_stores[cached_key]
+                self._vector_stores[key] = vector_store
+            return vector_store
+
+    def invalidate(self, collection_name: str):
+        with self._lock:
+            for cached_key in list(self._vector_stores):
+                if cached_key[0] == collection_name:
+                    del self._vector_stores[cached_key]
@@ -1,5 +1,6 @@
 import json
-from typing import Any, Dict, Iterable, List, Optional
+import struct
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 import singlestoredb as s2
 from langchain.docstore.document import Document
@@ -9,15 +10,39 @@ from langchain_community.vectorstores.singlestoredb import SingleStoreDB
 from backend.constants import DATA_POINT_FQN_METADATA_KEY, DATA_POINT_HASH_METADATA_KEY
 from backend.logger import logger
 from backend.modules.vector_db.base import BaseVectorDB
-from backend.types.core import DataPointVector, VectorDBConfig
+from backend.modules.vector_db.data_point_index import (
+    DataPointVectorRecord,
+    make_data_point_vector_record,
+)
+from backend.types.core import (
+    DataPointVector,
+    VectorDBConfig,
+    VectorIndexConfig,
+    VectorRecord,
+)
+from backend.utils import get_data_source_fqn
 
-MAX_SCROLL_LIMIT = int(1e6)
 BATCH_SIZE = 1000
+# Rows per multi-row INSERT, keeps statements well below the max packet size for large vectors
+BULK_INSERT_BATCH_SIZE = 500
+DATA_POINT_COLUMNS_DEFINITION = """data_source_fqn VARCHAR(1024), data_point_fqn VARCHAR(2048),
+data_point_hash VARCHAR(255), KEY (data_source_fqn) USING HASH,
+KEY (data_point_fqn) USING HASH, KEY (data_point_hash) USING HASH"""
+
+
+def pack_vector(vector: List[float]) -> bytes:
+    """Packs a vector as binary little endian float32, the storage format of SingleStore vectors"""
+    return struct.pack(f"<{len(vector)}f", *vector)
 
 
 class SSDB(SingleStoreDB):
     def _create_table(self: SingleStoreDB) -> None:
-        """Create table if it doesn't exist."""
+        """Create table if it doesn't exist.
+
+        Besides content, vector and metadata, the data source fqn, data point fqn and data point
+        hash are kept in hash indexed columns, so data point vectors are listed and deleted
+        without scanning the metadata JSON.
+        """
         conn = self.connection_pool.connect()
         try:
             cur = conn.cursor()
@@ -32,13 +57,14 @@ class SSDB(SingleStoreDB):
                     cur.execute(
                         """CREATE TABLE IF NOT EXISTS {}
                         (id BIGINT AUTO_INCREMENT PRIMARY KEY, {} TEXT CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci,
-                        {} VECTOR({}, F32) NOT NULL, {} JSON,
+                        {} VECTOR({}, F32) NOT NULL, {} JSON, {},
                         VECTOR INDEX {} ({}) {});""".format(
                             self.table_name,
                             self.content_field,
                             self.vector_field,
                             self.vector_size,
                             self.metadata_field,
+                            DATA_POINT_COLUMNS_DEFINITION,
                             self.vector_index_name,
                             self.vector_field,
                             index_options,
@@ -48,11 +74,12 @@ class SSDB(SingleStoreDB):
                     cur.execute(
                         """CREATE TABLE IF NOT EXISTS {}
                         (id BIGINT AUTO_INCREMENT PRIMARY KEY, {} TEXT CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci,
-                        {} BLOB, {} JSON);""".format(
+                        {} BLOB, {} JSON, {});""".format(
                             self.table_name,
                             self.content_field,
                             self.vector_field,
                             self.metadata_field,
+                            DATA_POINT_COLUMNS_DEFINITION,
                         ),
                     )
             finally:
@@ -65,45 +92,61 @@ class SSDB(SingleStoreDB):
         texts: Iterable[str],
         metadatas: Optional[List[Dict[Any, Any]]] = None,
         embeddings: Optional[List[List[float]]] = None,
+        flush: bool = True,
         **kwargs: Any,
     ) -> List[str]:
         """Add more texts to the vectorstore.
 
+        Rows are inserted in multi-row batches within a single transaction, with vectors packed
+        as binary little endian float32, the format JSON_ARRAY_PACK produces.
+
         Args:
             texts (Iterable[str]): Iterable of strings/text to add to the vectorstore.
             metadatas (Optional[List[Dict]], optional): Optional list of metadatas.
                 Defaults to None.
             embeddings (Optional[List[List[float]]], optional): Optional pre-generated
                 embeddings. Defaults to None.
+            flush (bool, optional): Flush the vector index once the rows are written.
+                Bulk writers flush once at the end instead. Defaults to True.
 
         Returns:
             List[str]: empty list
         """
+        texts = list(texts)
+        if embeddings is None:
+            embeddings = self.embedding.embed_documents(texts)
+        rows = []
+        for i, (text, embedding) in enumerate(zip(texts, embeddings)):
+            metadata = metadatas[i] if metadatas else {}
+            data_point_fqn = metadata.get(DATA_POINT_FQN_METADATA_KEY)
+            rows.append(
+                (
+                    text,
+                    pack_vector(embedding),
+                    json.dumps(metadata),
+                    get_data_source_fqn(data_point_fqn) if data_point_fqn else None,
+                    data_point_fqn,
+                    metadata.get(DATA_POINT_HASH_METADATA_KEY),
+                )
+            )
         conn = self.connection_pool.connect()
         try:
             cur = conn.cursor()
             try:
-                # Write data to singlestore db
-                for i, text in enumerate(texts):
-                    # Use provided values by default or fallback
-                    metadata = metadatas[i] if metadatas else {}
-                    embedding = (
-                        embeddings[i]
-                        if embeddings
-                        else self.embedding.embed_documents([text])[0]
-                    )
-                    # Overriding insert statement to handle autoincrement id
-                    cur.execute(
-                        "INSERT INTO {} (content, vector, metadata) VALUES (%s, JSON_ARRAY_PACK(%s), %s)".format(
-                            self.table_name
-                        ),
-                        (
-                            text,
-                            "[{}]".format(",".join(map(str, embedding))),
-                            json.dumps(metadata),
-                        ),
-                    )
-                if self.use_vector_index:
+                cur.execute("BEGIN")
+                try:
+                    for i in range(0, len(rows), BULK_INSERT_BATCH_SIZE):
+                        # Overriding insert statement to handle autoincrement id
+                        cur.executemany(
+                            "INSERT INTO {} (content, vector, metadata, data_source_fqn, data_point_fqn, data_point_hash) "
+                            "VALUES (%s, %s, %s, %s, %s, %s)".format(self.table_name),
+                            rows[i : i + BULK_INSERT_BATCH_SIZE],
+                        )
+                    cur.execute("COMMIT")
+                except Exception:
+                    cur.execute("ROLLBACK")
+                    raise
+                if flush and self.use_vector_index:
                     cur.execute("OPTIMIZE TABLE {} FLUSH;".format(self.table_name))
             finally:
                 cur.close()
@@ -111,12 +154,30 @@ class SSDB(SingleStoreDB):
             conn.close()
         return []
 
+    def flush(self):
+        """Flush the rows written so far into the vector index"""
+        conn = self.connection_pool.connect()
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute("OPTIMIZE TABLE {} FLUSH;".format(self.table_name))
+            finally:
+                cur.close()
+        finally:
+            conn.close()
+
 
 class SingleStoreVectorDB(BaseVectorDB):
     def __init__(self, config: VectorDBConfig):
         self.host = config.url
 
-    def create_collection(self, collection_name: str, embeddings: Embeddings):
+    def create_collection(
+        self,
+        collection_name: str,
+        embeddings: Embeddings,
+        vector_index_config: Optional[VectorIndexConfig] = None,
+    ):
+        # Index settings are only supported on Qdrant
         logger.debug(f"[SingleStore] Creating new collection {collection_name}...")
 
         # Calculate embedding size
@@ -143,26 +204,43 @@ class SingleStoreVectorDB(BaseVectorDB):
         embeddings: Embeddings,
         incremental: bool = True,
     ):
+        """
+        Adds the documents. In incremental mode, the earlier rows of their data points are then deleted.
+        """
         if len(documents) == 0:
             logger.warning("No documents to index")
             return
-        # get record IDs to be upserted
         logger.debug(
             f"[SingleStore] Adding {len(documents)} documents to collection {collection_name}"
         )
-        data_point_fqns = []
-        for document in documents:
-            if document.metadata.get(DATA_POINT_FQN_METADATA_KEY):
-                data_point_fqns.append(
-                    document.metadata.get(DATA_POINT_FQN_METADATA_KEY)
-                )
+        outdated_data_point_vectors = (
+            self._get_data_point_vectors(
+                collection_name=collection_name,
+                data_point_fqns=list(
+                    {
+                        document.metadata.get(DATA_POINT_FQN_METADATA_KEY)
+                        for document in documents
+                        if document.metadata.get(DATA_POINT_FQN_METADATA_KEY)
+                    }
+                ),
+            )
+            if incremental
+            else []
+        )
 
         try:
-            SSDB.from_documents(
+            # The index is flushed once per ingestion run, see flush_collection
+            SSDB(
                 embedding=embeddings,
-                documents=documents,
-                table_name=collection_name,
                 host=self.host,
+                table_name=collection_name,
+            ).add_texts(
+                texts=[document.page_content for document in documents],
+                metadatas=[document.metadata for document in documents],
+                embeddings=embeddings.embed_documents(
+                    [document.page_content for document in documents]
+                ),
+                flush=False,
             )
             logger.debug(
                 f"[SingleStore] Added {len(documents)} documents to collection {collection_name}"
@@ -171,6 +249,55 @@ class SingleStoreVectorDB(BaseVectorDB):
             logger.exception(
                 f"[SingleStore] Failed to add documents to collection {collection_name}: {e}"
             )
+            raise
+        if outdated_data_point_vectors:
+            self.delete_data_point_vectors(
+                collection_name=collection_name,
+                data_point_vectors=outdated_data_point_vectors,
+            )
+
+    def _get_data_point_vectors(
+        self,
+        collection_name: str,
+        data_point_fqns: List[str],
+        batch_size: int = BATCH_SIZE,
+    ) -> List[DataPointVector]:
+        """
+        Lists the rows of the given data points
+        """
+        data_point_vectors: List[DataPointVector] = []
+        conn = s2.connect(self.host)
+        try:
+            curr = conn.cursor()
+            try:
+                for i in range(0, len(data_point_fqns), batch_size):
+                    batch = data_point_fqns[i : i + batch_size]
+                    curr.execute(
+                        f"SELECT id, data_point_fqn, data_point_hash FROM {collection_name} "
+                        f"WHERE data_point_fqn IN ({', '.join(['%s'] * len(batch))})",
+                        batch,
+                    )
+                    data_point_vectors.extend(
+                        DataPointVector(
+                            data_point_vector_id=str(id),
+                            data_point_fqn=data_point_fqn,
+                            data_point_hash=data_point_hash or "",
+                        )
+                        for id, data_point_fqn, data_point_hash in curr.fetchall()
+                    )
+            finally:
+                curr.close()
+        finally:
+            conn.close()
+        return data_point_vectors
+
+    def flush_collection(self, collection_name: str):
+        logger.debug(f"[SingleStore] Flushing vector index of {collection_name}")
+        SSDB(
+            embedding=None,
+            host=self.host,
+            table_name=collection_name,
+        ).flush()
 
     def get_collections(self) -> List[str]:
         conn = s2.connect(self.host)
@@ -218,52 +345,57 @@ class SingleStoreVectorDB(BaseVectorDB):
     def get_vector_client(self):
         return s2.connect(self.host)
 
-    def list_data_point_vectors(
+    def iter_data_point_vectors(
         self,
         collection_name: str,
-        data_source_fqn: str,
+        data_source_fqn: Optional[str],
         batch_size: int = BATCH_SIZE,
-    ) -> List[DataPointVector]:
+    ) -> Iterator[List[DataPointVectorRecord]]:
         logger.debug(
             f"[SingleStore] Listing all data point vectors for collection {collection_name}"
         )
-        data_point_vectors: List[DataPointVector] = []
         logger.debug(f"data_source_fqn: {data_source_fqn}")
+        count = 0
 
-        # Get all data point vectors from table upto MAX_SCROLL_LIMIT
-        conn = s2.connect(self.host)
+        # Unbuffered connection, rows are streamed from the server in batches
+        conn = s2.connect(self.host, buffered=False)
         try:
             curr = conn.cursor()
-
-            # Remove all data point vectors with the same data_source_fqn
-            curr.execute(
-                f"SELECT * FROM {collection_name} WHERE JSON_EXTRACT_JSON(metadata, '{DATA_POINT_FQN_METADATA_KEY}') LIKE '%{data_source_fqn}%' LIMIT {MAX_SCROLL_LIMIT}"
-            )
-
-            for record in curr:
-                # id, content, vector, metadata
-                id, _, _, metadata = record
-                if (
-                    metadata
-                    and metadata.get(DATA_POINT_FQN_METADATA_KEY)
-                    and metadata.get(DATA_POINT_HASH_METADATA_KEY)
-                ):
-                    data_point_vectors.append(
-                        DataPointVector(
-                            data_point_vector_id=id,
-                            data_point_fqn=metadata.get(DATA_POINT_FQN_METADATA_KEY),
-                            data_point_hash=metadata.get(DATA_POINT_HASH_METADATA_KEY),
-                        )
+            try:
+                if data_source_fqn is None:
+                    curr.execute(
+                        f"SELECT id, data_point_fqn, data_point_hash FROM {collection_name}"
                     )
+                else:
+                    curr.execute(
+                        f"SELECT id, data_point_fqn, data_point_hash FROM {collection_name} "
+                        "WHERE data_source_fqn = %s",
+                        (data_source_fqn,),
+                    )
+                while True:
+                    records = curr.fetchmany(batch_size)
+                    if not records:
+                        break
+                    data_point_vectors = [
+                        make_data_point_vector_record(
+                            str(id), data_point_fqn, data_point_hash
+                        )
+                        for id, data_point_fqn, data_point_hash in records
+                        if data_point_fqn and data_point_hash
+                    ]
+                    count += len(data_point_vectors)
+                    yield data_point_vectors
+            finally:
+                curr.close()
         except Exception as e:
             logger.exception(f"[SingleStore] Failed to list data point vectors: {e}")
+            raise
         finally:
             conn.close()
 
         logger.debug(
-            f"[SingleStore] Listing {len(data_point_vectors)} data point vectors for collection {collection_name}"
+            f"[SingleStore] Listed {count} data point vectors for collection {collection_name}"
         )
-        return data_point_vectors
 
     def delete_data_point_vectors(
         self,
@@ -285,10 +417,20 @@ class SingleStoreVectorDB(BaseVectorDB):
             try:
                 vectors_to_be_deleted_count = len(data_point_vectors)
                 curr = conn.cursor()
-
-                curr.execute(
-                    f"DELETE FROM {collection_name} WHERE id in ({', '.join(data_point_vector.data_point_vector_id for data_point_vector in data_point_vectors)})"
-                )
+                try:
+                    for i in range(0, vectors_to_be_deleted_count, batch_size):
+                        ids = [
+                            data_point_vector.data_point_vector_id
+                            for data_point_vector in data_point_vectors[
+                                i : i + batch_size
+                            ]
+                        ]
+                        curr.execute(
+                            f"DELETE FROM {collection_name} WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                            ids,
+                        )
+                finally:
+                    curr.close()
                 logger.debug(
                     f"[SingleStore] Deleted {vectors_to_be_deleted_count} data point vectors"
                 )
@@ -296,5 +438,68 @@ class SingleStoreVectorDB(BaseVectorDB):
                 logger.exception(
                     f"[SingleStore] Failed to delete data point vectors: {e}"
                 )
+                raise
             finally:
                 conn.close()
+
+    def iter_vector_records(
+        self,
+        collection_name: str,
+        batch_size: int = BATCH_SIZE,
+    ) -> Iterator[List[VectorRecord]]:
+        logger.debug(
+            f"[SingleStore] Reading vector records of collection {collection_name}"
+        )
+        conn = s2.connect(self.host, buffered=False)
+        try:
+            curr = conn.cursor()
+            try:
+                curr.execute(
+                    f"SELECT id, content, JSON_ARRAY_UNPACK(vector), metadata FROM {collection_name}"
+                )
+                while True:
+                    records = curr.fetchmany(batch_size)
+                    if not records:
+                        break
+                    yield [
+                        VectorRecord(
+                            id=str(id),
+                            page_content=content or "",
+                            metadata=(
+                                json.loads(metadata)
+                                if isinstance(metadata, str)
+                                else metadata or {}
+                            ),
+                            vector=(
+                                json.loads(vector)
+                                if isinstance(vector, str)
+                                else vector
+                            ),
+                        )
+                        for id, content, vector, metadata in records
+                    ]
+            finally:
+                curr.close()
+        finally:
+            conn.close()
+
+    def upsert_vector_records(
+        self, collection_name: str, vector_records: List[VectorRecord]
+    ):
+        """
+        Rows get new auto increment ids, writing the same records again adds them again.
+        The vector index is flushed by flush_collection once all records are written
+        """
+        logger.debug(
+            f"[SingleStore] Writing {len(vector_records)} vector records to collection {collection_name}"
+        )
+        SSDB(
+            embedding=None,
+            host=self.host,
+            table_name=collection_name,
+        ).add_texts(
+            texts=[record.page_content for record in vector_records],
+            metadatas=[record.metadata for record in vector_records],
+            embeddings=[record.vector for record in vector_records],
+            flush=False,
+        )
@@ -1,13 +1,39 @@
-from typing import Any, Dict, List
+import datetime
+import threading
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
 
 import weaviate
 from langchain.embeddings.base import Embeddings
 from langchain_community.vectorstores.weaviate import Weaviate
 from langchain_core.documents import Document
 
-from backend.constants import DATA_POINT_FQN_METADATA_KEY
+from backend.constants import DATA_POINT_FQN_METADATA_KEY, DATA_POINT_HASH_METADATA_KEY
+from backend.logger import logger
 from backend.modules.vector_db.base import BaseVectorDB
-from backend.types.core import DataPointVector, VectorDBConfig
+from backend.modules.vector_db.data_point_index import (
+    DataPointVectorRecord,
+    make_data_point_vector_record,
+)
+from backend.types.core import (
+    DataPointVector,
+    VectorDBConfig,
+    VectorIndexConfig,
+    VectorRecord,
+    WeaviateClientConfig,
+)
+from backend.utils import get_data_source_fqn
+
+BATCH_SIZE = 1000
+TEXT_KEY = "text"
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
 
 
 def decapitalize(s):
@@ -28,15 +54,36 @@ class WeaviateVectorDB(BaseVectorDB):
                 else {}
             ),
         )
+        self.client_config = WeaviateClientConfig.model_validate(config.config or {})
+        # The batch of a client is shared, imports of concurrent upserts must not interleave
+        self._batch_lock = threading.Lock()
 
-    def create_collection(self, collection_name: str, embeddings: Embeddings):
+    def create_collection(
+        self,
+        collection_name: str,
+        embeddings: Embeddings,
+        vector_index_config: Optional[VectorIndexConfig] = None,
+    ):
+        # Index settings are only supported on Qdrant
         self.weaviate_client.schema.create_class(
             {
                 "class": collection_name.capitalize(),
+                # Vectors are computed by the embedder and imported with the objects
+                "vectorizer": "none",
                 "properties": [
+                    {
+                        "name": TEXT_KEY,
+                        "dataType": ["text"],
+                    },
                     {
                         "name": f"{DATA_POINT_FQN_METADATA_KEY}",
                         "dataType": ["text"],
+                        "tokenization": "field",
+                    },
+                    {
+                        "name": f"{DATA_POINT_HASH_METADATA_KEY}",
+                        "dataType": ["text"],
+                        "tokenization": "field",
                     },
                 ],
             }
@@ -55,16 +102,147 @@ class WeaviateVectorDB(BaseVectorDB):
         - collection_name: Name of the collection
         - documents: List of documents
         - embeddings: Embeddings object
-        - incremental: If True, the documents will be added incrementally, otherwise the collection will be replaced
+        - incremental: If True, the earlier objects of the data points of the documents are deleted once the documents are imported
         Returns:
         - None
         """
-        Weaviate.from_documents(
+        if len(documents) == 0:
+            logger.warning("No documents to index")
+            return
+        logger.debug(
+            f"[Weaviate] Adding {len(documents)} documents to collection {collection_name}"
+        )
+        outdated_data_point_vectors = (
+            self._get_data_point_vectors(
+                collection_name=collection_name,
+                data_point_fqns=list(
+                    {
+                        document.metadata.get(DATA_POINT_FQN_METADATA_KEY)
+                        for document in documents
+                        if document.metadata.get(DATA_POINT_FQN_METADATA_KEY)
+                    }
+                ),
+            )
+            if incremental
+            else []
+        )
+        vectors = embeddings.embed_documents(
+            [document.page_content for document in documents]
+        )
+        self._import_objects(
+            collection_name=collection_name,
             documents=documents,
-            embedding=embeddings,
-            client=self.weaviate_client,
-            index_name=collection_name.capitalize(),
+            vectors=vectors,
+        )
+        logger.debug(
+            f"[Weaviate] Added {len(documents)} documents to collection {collection_name}"
         )
+        if outdated_data_point_vectors:
+            self.delete_data_point_vectors(
+                collection_name=collection_name,
+                data_point_vectors=outdated_data_point_vectors,
+            )
+
+    def _get_data_point_vectors(
+        self,
+        collection_name: str,
+        data_point_fqns: List[str],
+        batch_size: int = BATCH_SIZE,
+    ) -> List[DataPointVector]:
+        """
+        Lists the objects of the given data points. Filtered queries are paged by offset, which
+        is capped by the QUERY_MAXIMUM_RESULTS of the cluster, 10000 by default
+        """
+        class_name = collection_name.capitalize()
+        data_point_vectors: List[DataPointVector] = []
+        for i in range(0, len(data_point_fqns), batch_size):
+            where = {
+                "path": [f"{DATA_POINT_FQN_METADATA_KEY}"],
+                "operator": "ContainsAny",
+                "valueTextArray": data_point_fqns[i : i + batch_size],
+            }
+            offset = 0
+            while True:
+                response = (
+                    self.weaviate_client.query.get(
+                        class_name,
+                        [
+                            f"{DATA_POINT_FQN_METADATA_KEY}",
+                            f"{DATA_POINT_HASH_METADATA_KEY}",
+                        ],
+                    )
+                    .with_where(where)
+                    .with_additional(["id"])
+                    .with_limit(batch_size)
+                    .with_offset(offset)
+                    .do()
+                )
+                if "errors" in response:
+                    raise Exception(
+                        f"[Weaviate] Failed to list data point vectors: {response['errors']}"
+                    )
+                objects = response.get("data", {}).get("Get", {}).get(class_name) or []
+                data_point_vectors.extend(
+                    DataPointVector(
+                        data_point_vector_id=obj["_additional"]["id"],
+                        data_point_fqn=obj.get(DATA_POINT_FQN_METADATA_KEY) or "",
+                        data_point_hash=obj.get(DATA_POINT_HASH_METADATA_KEY) or "",
+                    )
+                    for obj in objects
+                )
+                if len(objects) < batch_size:
+                    break
+                offset += batch_size
+        return data_point_vectors
+
+    def _import_objects(
+        self,
+        collection_name: str,
+        documents: List[Document],
+        vectors: List[List[float]],
+        ids: Optional[List[str]] = None,
+    ):
+        """
+        Imports the documents with their vectors through the batch of the client, under the given
+        ids if any. Raises if Weaviate reports errors for any of them
+        """
+        errors = []
+
+        def collect_errors(results: Optional[List[Dict[str, Any]]]):
+            for result in results or []:
+                for error in (
+                    result.get("result", {}).get("errors", {}).get("error", [])
+                ):
+                    errors.append(error.get("message"))
+
+        with self._batch_lock:
+            self.weaviate_client.batch.configure(
+                batch_size=self.client_config.batch_size,
+                dynamic=self.client_config.dynamic,
+                num_workers=self.client_config.num_workers,
+                timeout_retries=self.client_config.timeout_retries,
+                callback=collect_errors,
+            )
+            with self.weaviate_client.batch as batch:
+                for i, (document, vector) in enumerate(zip(documents, vectors)):
+                    data_object = {TEXT_KEY: document.page_content}
+                    for key, value in document.metadata.items():
+                        data_object[key] = (
+                            value.isoformat()
+                            if isinstance(value, datetime.datetime)
+                            else value
+                        )
+                    batch.add_data_object(
+                        data_object=data_object,
+                        class_name=collection_name.capitalize(),
+                        vector=vector,
+                        uuid=ids[i] if ids else None,
+                    )
+        if errors:
+            raise Exception(
+                f"[Weaviate] Failed to import {len(errors)} of {len(documents)} documents "
+                f"into collection {collection_name}: {errors[0]}"
+            )
 
     def get_collections(self) -> List[str]:
         collections = self.weaviate_client.schema.get().get("classes", [])
@@ -81,9 +259,12 @@ class WeaviateVectorDB(BaseVectorDB):
             client=self.weaviate_client,
             embedding=embeddings,
             index_name=collection_name.capitalize(),  # Weaviate stores the index name as capitalized
-            text_key="text",
+            text_key=TEXT_KEY,
             by_text=False,
-            attributes=[f"{DATA_POINT_FQN_METADATA_KEY}"],
+            attributes=[
+                f"{DATA_POINT_FQN_METADATA_KEY}",
+                f"{DATA_POINT_HASH_METADATA_KEY}",
+            ],
         )
 
     def list_documents_in_collection(
@@ -130,18 +311,173 @@ class WeaviateVectorDB(BaseVectorDB):
     def get_vector_client(self):
         return self.weaviate_client
 
-    def list_data_point_vectors(
+    def iter_data_point_vectors(
         self,
         collection_name: str,
-        data_source_fqn: str,
-        batch_size: int = 1000,
-    ) -> List[DataPointVector]:
-        pass
+        data_source_fqn: Optional[str],
+        batch_size: int = BATCH_SIZE,
+    ) -> Iterator[List[DataPointVectorRecord]]:
+        logger.debug(
+            f"[Weaviate] Listing all data point vectors for collection {collection_name}"
+        )
+        class_name = collection_name.capitalize()
+        count = 0
+        # https://weaviate.io/developers/weaviate/manage-data/read-all-objects
+        # The cursor API does not support filters, data points are matched on the client
+        after = None
+        while True:
+            query = (
+                self.weaviate_client.query.get(
+                    class_name,
+                    [
+                        f"{DATA_POINT_FQN_METADATA_KEY}",
+                        f"{DATA_POINT_HASH_METADATA_KEY}",
+                    ],
+                )
+                .with_additional(["id"])
+                .with_limit(batch_size)
+            )
+            if after is not None:
+                query = query.with_after(after)
+            response = query.do()
+            if "errors" in response:
+                raise Exception(
+                    f"[Weaviate] Failed to list data point vectors: {response['errors']}"
+                )
+            objects = response.get("data", {}).get("Get", {}).get(class_name) or []
+            data_point_vectors: List[DataPointVectorRecord] = []
+            for obj in objects:
+                data_point_fqn = obj.get(DATA_POINT_FQN_METADATA_KEY)
+                data_point_hash = obj.get(DATA_POINT_HASH_METADATA_KEY)
+                if (
+                    data_point_fqn
+                    and data_point_hash
+                    and (
+                        data_source_fqn is None
+                        or get_data_source_fqn(data_point_fqn) == data_source_fqn
+                    )
+                ):
+                    data_point_vectors.append(
+                        make_data_point_vector_record(
+                            obj["_additional"]["id"], data_point_fqn, data_point_hash
+                        )
+                    )
+            count += len(data_point_vectors)
+            yield data_point_vectors
+            if len(objects) < batch_size:
+                break
+            after = objects[-1]["_additional"]["id"]
+        logger.debug(
+            f"[Weaviate] Listed {count} data point vectors for collection {collection_name}"
+        )
 
     def delete_data_point_vectors(
         self,
         collection_name: str,
         data_point_vectors: List[DataPointVector],
-        batch_size: int = 100,
+        batch_size: int = BATCH_SIZE,
     ):
-        pass
+        """
+        Delete data point vectors from the collection
+        """
+        logger.debug(
+            f"[Weaviate] Deleting {len(data_point_vectors)} data point vectors"
+        )
+        vectors_to_be_deleted_count = len(data_point_vectors)
+        deleted_vectors_count = 0
+        # A batch delete is capped by the QUERY_MAXIMUM_RESULTS of the cluster, 10000 by default
+        for i in range(0, vectors_to_be_deleted_count, batch_size):
+            data_point_vectors_to_be_processed = data_point_vectors[i : i + batch_size]
+            # https://weaviate.io/developers/weaviate/manage-data/delete#delete-multiple-objects
+            self.weaviate_client.batch.delete_objects(
+                class_name=collection_name.capitalize(),
+                where={
+                    "path": ["id"],
+                    "operator": "ContainsAny",
+                    "valueTextArray": [
+                        data_point_vector.data_point_vector_id
+                        for data_point_vector in data_point_vectors_to_be_processed
+                    ],
+                },
+            )
+            deleted_vectors_count = deleted_vectors_count + len(
+                data_point_vectors_to_be_processed
+            )
+            logger.debug(
+                f"[Weaviate] Deleted [{deleted_vectors_count}/{vectors_to_be_deleted_count}] data point vectors"
+            )
+        logger.debug(
+            f"[Weaviate] Deleted {vectors_to_be_deleted_count} data point vectors"
+        )
+
+    def iter_vector_records(
+        self,
+        collection_name: str,
+        batch_size: int = BATCH_SIZE,
+    ) -> Iterator[List[VectorRecord]]:
+        logger.debug(
+            f"[Weaviate] Reading vector records of collection {collection_name}"
+        )
+        class_name = collection_name.capitalize()
+        # Metadata of the chunks is stored as properties of the objects
+        properties = [
+            prop["name"]
+            for prop in self.weaviate_client.schema.get(class_name).get(
+                "properties", []
+            )
+        ]
+        after = None
+        while True:
+            query = (
+                self.weaviate_client.query.get(class_name, properties)
+                .with_additional(["id", "vector"])
+                .with_limit(batch_size)
+            )
+            if after is not None:
+                query = query.with_after(after)
+            response = query.do()
+            if "errors" in response:
+                raise Exception(
+                    f"[Weaviate] Failed to read vector records: {response['errors']}"
+                )
+            objects = response.get("data", {}).get("Get", {}).get(class_name) or []
+            yield [
+                VectorRecord(
+                    id=obj["_additional"]["id"],
+                    page_content=obj.get(TEXT_KEY) or "",
+                    metadata={
+                        key: value
+                        for key, value in obj.items()
+                        if key not in (TEXT_KEY, "_additional") and value is not None
+                    },
+                    vector=obj["_additional"]["vector"],
+                )
+                for obj in objects
+            ]
+            if len(objects) < batch_size:
+                return
+            after = objects[-1]["_additional"]["id"]
+
+    def upsert_vector_records(
+        self, collection_name: str, vector_records: List[VectorRecord]
+    ):
+        logger.debug(
+            f"[Weaviate] Writing {len(vector_records)} vector records to collection {collection_name}"
+        )
+        self._import_objects(
+            collection_name=collection_name,
+            documents=[
+                Document(page_content=record.page_content, metadata=record.metadata)
+                for record in vector_records
+            ],
+            vectors=[record.vector for record in vector_records],
+            # Object ids are uuids, other ids map to a uuid derived from them
+            ids=[
+                (
+                    record.id
+                    if _is_uuid(record.id)
+                    else str(uuid.uuid5(uuid.NAMESPACE_URL, record.id))
+                )
+                for record in vector_records
+            ],
+        )
@@ -1,25 +1,26 @@
 import multiprocessing as mp
 from contextlib import asynccontextmanager
-from backend.server.auth import get_current_user
-from fastapi import FastAPI, Depends
-from fastapi import APIRouter
+
+from fastapi import APIRouter, Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+from backend.indexer.collections.scheduler import IngestionJobScheduler
 from backend.modules.query_controllers.query_controller import QUERY_CONTROLLER_REGISTRY
+from backend.server.auth import get_current_user
 from backend.server.routers.collection import router as collection_router
-from backend.server.routers.knowledge import router as knowledge_router
-from backend.server.routers.users import router as users_router
-from backend.server.routers.teams import router as teams_router
-from backend.server.routers.plans import router as plans_router
-
 from backend.server.routers.components import router as components_router
 from backend.server.routers.data_source import router as datasource_router
 from backend.server.routers.internal import router as internal_router
+from backend.server.routers.knowledge import router as knowledge_router
+from backend.server.routers.plans import router as plans_router
 from backend.server.routers.rag_apps import router as rag_apps_router
+from backend.server.routers.teams import router as teams_router
+from backend.server.routers.users import router as users_router
 from backend.settings import settings
 from backend.utils import AsyncProcessPoolExecutor
 
+
 @asynccontextmanager
 async def _process_pool_lifespan_manager(app: FastAPI):
     app.state.process_pool = None
@@ -29,7 +30,14 @@ async def _process_pool_lifespan_manager(app: FastAPI):
             # Setting to spawn because we don't want to fork - it can cause issues with the event loop
             mp_context=mp.get_context("spawn"),
         )
+    # Ingestion runs are queued here and executed in the process pool
+    app.state.ingestion_scheduler = IngestionJobScheduler(
+        config=settings.INGESTION_SCHEDULER_CONFIG,
+        pool=app.state.process_pool,
+    )
+    await app.state.ingestion_scheduler.start()
     yield  # FastAPI runs here
+    await app.state.ingestion_scheduler.stop()
     if app.state.process_pool is not None:
         app.state.process_pool.shutdown(wait=True)
 
@@ -3,18 +3,22 @@ from fastapi.responses import JSONResponse
 from backend.server.auth import get_current_user
 from backend.modules.metadata_store.collections.prismastore import CollectionPrismaStore
 
+from backend.constants import ALL_DATA_SOURCES_FQN
+from backend.indexer.collections.garbage_collection import garbage_collect_collection
 from backend.indexer.collections.indexer import ingest_data as ingest_data_to_collection
 from backend.logger import logger
 from backend.modules.metadata_store.client import get_client
 from backend.modules.model_gateway.model_gateway import model_gateway
-from backend.modules.vector_db.client import VECTOR_STORE_CLIENT
+from backend.modules.vector_db.client import VECTOR_STORE_CLIENT, VECTOR_STORE_REGISTRY
 from backend.types.collection import (
     AssociateDataSourceWithCollection,
     AssociateDataSourceWithCollectionDto,
     CreateCollection,
     CreateCollectionDto,
+    GarbageCollectCollectionDto,
     ListCollectionDataIngestionRunsDto,
     IngestDataToCollectionDto,
+    ListIngestionJobsDto,
     UnassociateDataSourceWithCollectionDto,
 )
 
@@ -87,11 +91,14 @@ async def create_collection(collection: CreateCollectionDto, user: dict = Depend
             )
         )
         logger.info(f"Creating collection {collection.name} on vector db...")
+        # A collection recreated under the same name must not be served by a cached vector store
+        VECTOR_STORE_REGISTRY.invalidate(collection_name=collection.name)
         VECTOR_STORE_CLIENT.create_collection(
             collection_name=collection.name,
             embeddings=model_gateway.get_embedder_from_model_config(
                 model_name=collection.embedder_config.name
             ),
+            vector_index_config=collection.embedder_config.vector_index_config,
         )
         logger.info(f"Created collection... {created_collection}")
 
@@ -176,11 +183,13 @@ async def ingest_data(
         process_pool = request.app.state.process_pool
     except AttributeError:
         process_pool = None
+    ingestion_scheduler = getattr(request.app.state, "ingestion_scheduler", None)
     try:
         return await ingest_data_to_collection(
             ingest_data_to_collection_dto, 
             user,
-            pool=process_pool
+            pool=process_pool,
+            scheduler=ingestion_scheduler,
         )
     except HTTPException as exp:
         raise exp
@@ -189,6 +198,54 @@ async def ingest_data(
         raise HTTPException(status_code=500, detail=str(exp))
 
 
+@router.post("/garbage_collect")
+async def garbage_collect(
+    garbage_collect_collection_dto: GarbageCollectCollectionDto,
+    request: Request,
+    user: dict = Depends(get_current_user),
+):
+    """
+    Report the orphaned vectors of the collection. Unless it is a dry run, an ingestion job
+    is queued to delete them, the report is then a dry run of what that job finds.
+    """
+    try:
+        # Fail before doing any work if the deletes cannot be queued
+        ingestion_scheduler = (
+            _get_ingestion_scheduler(request)
+            if not garbage_collect_collection_dto.dry_run
+            else None
+        )
+        client = await get_client()
+        client = CollectionPrismaStore(client)
+        collection = await client.aget_collection_by_name_and_user(
+            user, garbage_collect_collection_dto.collection_name
+        )
+        if not collection:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Collection with name {garbage_collect_collection_dto.collection_name} does not exist",
+            )
+        report = await garbage_collect_collection(
+            inputs=garbage_collect_collection_dto.model_copy(update={"dry_run": True}),
+            collection=collection,
+            client=client,
+        )
+        ingestion_job_id = None
+        if ingestion_scheduler is not None:
+            ingestion_job = await ingestion_scheduler.submit(
+                tenant_id=user["sub"], ingestion_config=garbage_collect_collection_dto
+            )
+            ingestion_job_id = ingestion_job.id
+        return JSONResponse(
+            content={"report": report.model_dump(), "ingestion_job_id": ingestion_job_id}
+        )
+    except HTTPException as exp:
+        raise exp
+    except Exception as exp:
+        logger.exception("Failed to garbage collect collection")
+        raise HTTPException(status_code=500, detail=str(exp))
+
+
 @router.delete("/{collection_name}")
 async def delete_collection_by_user(user: dict = Depends(get_current_user), collection_name: str = Path(title="Collection name")):
     """Delete collection given its name"""
@@ -197,6 +254,7 @@ async def delete_collection_by_user(user: dict = Depends(get_current_user), coll
         client = CollectionPrismaStore(client)
         await client.adelete_collection_by_user(user, collection_name, include_runs=True)
         VECTOR_STORE_CLIENT.delete_collection(collection_name=collection_name)
+        VECTOR_STORE_REGISTRY.invalidate(collection_name=collection_name)
         return JSONResponse(content={"deleted": True})
     except HTTPException as exp:
         raise exp
@@ -235,9 +293,131 @@ async def get_collection_status(
             detail=f"Data ingestion run {data_ingestion_run_name} not found",
         )
 
+    content = {
+        "status": data_ingestion_run.status.value,
+        "message": f"Data ingestion job run {data_ingestion_run.name} in {data_ingestion_run.status.value}. Check logs for more details.",
+        "progress": (
+            data_ingestion_run.progress.model_dump()
+            if data_ingestion_run.progress
+            else None
+        ),
+    }
+    if data_ingestion_run.data_source_fqn == ALL_DATA_SOURCES_FQN:
+        child_data_ingestion_runs = await client.aget_child_data_ingestion_runs(
+            parent_data_ingestion_run_name=data_ingestion_run.name
+        )
+        content["child_data_ingestion_runs"] = [
+            {
+                "name": child_data_ingestion_run.name,
+                "data_source_fqn": child_data_ingestion_run.data_source_fqn,
+                "status": child_data_ingestion_run.status.value,
+                "progress": (
+                    child_data_ingestion_run.progress.model_dump()
+                    if child_data_ingestion_run.progress
+                    else None
+                ),
+            }
+            for child_data_ingestion_run in child_data_ingestion_runs
+        ]
+    return JSONResponse(content=content)
+
+@router.post("/data_ingestion_runs/{data_ingestion_run_name}/resume")
+async def resume_data_ingestion_run(
+    request: Request,
+    data_ingestion_run_name: str = Path(title="Data Ingestion Run name"),
+    user: dict = Depends(get_current_user),
+):
+    """Resume a failed data ingestion run from its checkpoint"""
+    try:
+        process_pool = request.app.state.process_pool
+    except AttributeError:
+        process_pool = None
+    ingestion_scheduler = getattr(request.app.state, "ingestion_scheduler", None)
+    try:
+        client = await get_client()
+        client = CollectionPrismaStore(client)
+        data_ingestion_run = await client.aget_data_ingestion_run(
+            data_ingestion_run_name=data_ingestion_run_name, no_cache=True
+        )
+        if data_ingestion_run is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Data ingestion run {data_ingestion_run_name} not found",
+            )
+        return await ingest_data_to_collection(
+            IngestDataToCollectionDto(
+                collection_name=data_ingestion_run.collection_name,
+                data_source_fqn=data_ingestion_run.data_source_fqn,
+                data_ingestion_mode=data_ingestion_run.data_ingestion_mode,
+                raise_error_on_failure=data_ingestion_run.raise_error_on_failure,
+                resume_data_ingestion_run_name=data_ingestion_run.name,
+            ),
+            user,
+            pool=process_pool,
+            scheduler=ingestion_scheduler,
+        )
+    except HTTPException as exp:
+        raise exp
+    except Exception as exp:
+        logger.exception("Failed to resume data ingestion run")
+        raise HTTPException(status_code=500, detail=str(exp))
+
+
+def _get_ingestion_scheduler(request: Request):
+    ingestion_scheduler = getattr(request.app.state, "ingestion_scheduler", None)
+    if ingestion_scheduler is None:
+        raise HTTPException(
+            status_code=400, detail="Ingestion job scheduler is not running"
+        )
+    return ingestion_scheduler
+
+
+@router.post("/ingestion_jobs/list")
+async def list_ingestion_jobs(
+    list_ingestion_jobs_dto: ListIngestionJobsDto,
+    request: Request,
+    user: dict = Depends(get_current_user),
+):
+    """List the ingestion jobs of the current user"""
+    ingestion_jobs = await _get_ingestion_scheduler(request).list_jobs(
+        tenant_id=user["sub"],
+        status=list_ingestion_jobs_dto.status,
+        limit=list_ingestion_jobs_dto.limit,
+    )
     return JSONResponse(
-        content={
-            "status": data_ingestion_run.status.value,
-            "message": f"Data ingestion job run {data_ingestion_run.name} in {data_ingestion_run.status.value}. Check logs for more details.",
-        }
-    )
\ No newline at end of file
+        content={"ingestion_jobs": [obj.model_dump(mode="json") for obj in ingestion_jobs]}
+    )
+
+
+@router.get("/ingestion_jobs/{ingestion_job_id}")
+async def get_ingestion_job(
+    request: Request,
+    ingestion_job_id: str = Path(title="Ingestion job id"),
+    user: dict = Depends(get_current_user),
+):
+    """Get status for given ingestion job"""
+    ingestion_job = await _get_ingestion_scheduler(request).get_job(
+        ingestion_job_id
+    )
+    if ingestion_job is None or ingestion_job.tenant_id != user["sub"]:
+        raise HTTPException(
+            status_code=404, detail=f"Ingestion job {ingestion_job_id} not found"
+        )
+    return JSONResponse(content={"ingestion_job": ingestion_job.model_dump(mode="json")})
+
+
+@router.post("/ingestion_jobs/{ingestion_job_id}/cancel")
+async def cancel_ingestion_job(
+    request: Request,
+    ingestion_job_id: str = Path(title="Ingestion job id"),
+    user: dict = Depends(get_current_user),
+):
+    """Cancel a queued or running ingestion job"""
+    ingestion_scheduler = _get_ingestion_scheduler(request)
+    ingestion_job = await ingestion_scheduler.get_job(ingestion_job_id)
+    if ingestion_job is None or ingestion_job.tenant_id != user["sub"]:
+        raise HTTPException(
+            status_code=404, detail=f"Ingestion job {ingestion_job_id} not found"
+        )
+    ingestion_job = await ingestion_scheduler.cancel(ingestion_job_id)
+    return JSONResponse(content={"ingestion_job": ingestion_job.model_dump(mode="json")})
@@ -125,3 +125,14 @@ def get_enabled_models(
     return JSONResponse(
         content={"models": serialized_models},
     )
+
+
+@router.get("/embedding-cache/stats")
+def get_embedding_cache_stats(user: dict = Depends(get_current_user)):
+    """Get size and hit / miss counters of the embedding cache"""
+    if model_gateway.embedding_cache is None:
+        return JSONResponse(
+            content={"error": "Embedding cache is not configured"},
+            status_code=404,
+        )
+    return JSONResponse(content={"stats": model_gateway.embedding_cache.stats()})
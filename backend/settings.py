@@ -1,10 +1,16 @@
 import os
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from pydantic import ConfigDict, model_validator
 from pydantic_settings import BaseSettings
 
-from backend.types.core import MetadataStoreConfig, VectorDBConfig
+from backend.types.core import (
+    BM25Config,
+    EmbeddingCacheConfig,
+    IngestionSchedulerConfig,
+    MetadataStoreConfig,
+    VectorDBConfig,
+)
 
 
 class Settings(BaseSettings):
@@ -19,6 +25,8 @@ class Settings(BaseSettings):
     ML_REPO_NAME: str = ""
     VECTOR_DB_CONFIG: VectorDBConfig
     GRAPHRAG_CONFIG: VectorDBConfig
+    EMBEDDING_CACHE_CONFIG: Optional[EmbeddingCacheConfig] = None
+    BM25_CONFIG: BM25Config = BM25Config()
     JWT_SECRET_KEY: str = "jwt.secret"
     LOCAL: bool = False
     TFY_HOST: str = ""
@@ -31,6 +39,7 @@ class Settings(BaseSettings):
     UNSTRUCTURED_IO_URL: str = ""
     UNSTRUCTURED_IO_API_KEY: str = ""
     PROCESS_POOL_WORKERS: int = 1
+    INGESTION_SCHEDULER_CONFIG: IngestionSchedulerConfig = IngestionSchedulerConfig()
     AUTH0_DOMAIN:str="hantech.auth0.com"
     API_IDENTIFIER:str="JDDLTMncmXxrfSlAaFAtSygbkEETFYga"
     ALGORITHMS: list[str] = ["RS256"]
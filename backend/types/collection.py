@@ -11,12 +11,20 @@ from pydantic import (
 from typing_extensions import Annotated
 
 from backend.constants import FQN_SEPARATOR
-from backend.types.core import ConfiguredBaseModel, DataIngestionMode, ParserConfig, BaseDataIngestionRun,DataIngestionRunStatus
+from backend.types.core import ConfiguredBaseModel, DataIngestionMode, ParserConfig, BaseDataIngestionRun,DataIngestionRunStatus, IngestionPipelineConfig, ParseExecutionConfig, ChunkFlushConfig, IngestionJobStatus, FanOutIngestionConfig
 from backend.types.core import BaseCollection
 class CreateCollectionDataIngestionRun(BaseDataIngestionRun):
     collection_name: str = Field(
         title="Name of the collection",
     )
+    parent_data_ingestion_run_name: Optional[str] = Field(
+        default=None,
+        title="Name of the run ingesting all data sources of the collection, if this run is one of them",
+    )
+    fan_out_config: Optional[FanOutIngestionConfig] = Field(
+        default=None,
+        title="Configuration of the concurrent ingestion, if this run ingests all data sources of the collection",
+    )
 
 
 class ListCollectionDataIngestionRunsDto(ConfiguredBaseModel):
@@ -29,6 +37,32 @@ class ListCollectionDataIngestionRunsDto(ConfiguredBaseModel):
 
 
 
+class CollectionDataIngestionRunProgress(ConfiguredBaseModel):
+    """
+    Live progress counters of a data ingestion run
+    """
+
+    data_points_loaded: int = Field(default=0, title="Data points yielded by the loader")
+    data_points_skipped: int = Field(
+        default=0, title="Data points skipped as already up to date"
+    )
+    data_points_parsed: int = Field(default=0, title="Data points parsed into chunks")
+    data_points_failed: int = Field(default=0, title="Data points that failed to ingest")
+    chunks_embedded: int = Field(default=0, title="Chunks embedded")
+    vectors_written: int = Field(default=0, title="Vectors written to the vector store")
+    bytes_written: int = Field(
+        default=0, title="Size of the chunks written, including their metadata"
+    )
+    data_points_per_second: float = Field(
+        default=0, title="Average number of data points parsed per second"
+    )
+    vectors_per_second: float = Field(
+        default=0, title="Average number of vectors written per second"
+    )
+    started_at: float = Field(default=0, title="Start of the run, as a unix timestamp")
+    updated_at: float = Field(default=0, title="Last update, as a unix timestamp")
+
+
 class CollectionDataIngestionRun(BaseDataIngestionRun):
     collection_name: str = Field(
         title="Name of the collection",
@@ -41,6 +75,123 @@ class CollectionDataIngestionRun(BaseDataIngestionRun):
         None,
         title="Status of the data ingestion run",
     )
+    parent_data_ingestion_run_name: Optional[str] = Field(
+        default=None,
+        title="Name of the run ingesting all data sources of the collection, if this run is one of them",
+    )
+    fan_out_config: Optional[FanOutIngestionConfig] = Field(
+        default=None,
+        title="Configuration of the concurrent ingestion, if this run ingests all data sources of the collection",
+    )
+    progress: Optional[CollectionDataIngestionRunProgress] = Field(
+        default=None,
+        title="Live progress of the data ingestion run",
+    )
+
+
+class CollectionDataIngestionRunCheckpoint(ConfiguredBaseModel):
+    """
+    Progress of a data ingestion run, used to resume it after a failure
+    """
+
+    data_ingestion_run_name: str = Field(
+        title="Name of the data ingestion run",
+    )
+    data_point_fqn_to_hash: Dict[str, str] = Field(
+        title="Data points already ingested by the run, mapped to their hash",
+        default_factory=dict,
+    )
+    loader_cursor: int = Field(
+        title="Number of data points yielded by the loader when the last checkpoint was recorded",
+        default=0,
+    )
+
+
+class ListIngestionJobsDto(ConfiguredBaseModel):
+    status: Optional[IngestionJobStatus] = Field(
+        title="Only list jobs in this status", default=None
+    )
+    limit: int = Field(
+        title="Maximum number of jobs to list, most recent first", default=100, ge=1
+    )
+
+
+class GarbageCollectCollectionDto(ConfiguredBaseModel):
+    """
+    Configuration to delete the orphaned vectors of a collection
+    """
+
+    collection_name: str = Field(
+        title="Name of the collection",
+    )
+    dry_run: bool = Field(
+        default=True,
+        title="Only report the orphaned vectors, without deleting them",
+    )
+    batch_size: int = Field(
+        default=1000,
+        title="Number of vectors listed and deleted at a time",
+        ge=1,
+    )
+    max_deletes_per_second: Optional[float] = Field(
+        default=None,
+        title="Maximum number of vectors deleted per second, to limit the load on the vector db. Unlimited if not set",
+        gt=0,
+    )
+    compact: bool = Field(
+        default=True,
+        title="Reclaim the space of the deleted vectors once they are deleted, e.g. optimize the Qdrant collection",
+    )
+
+
+class CollectionGarbageCollectionReport(ConfiguredBaseModel):
+    """
+    Orphaned vectors found in a collection, and deleted unless it was a dry run
+    """
+
+    collection_name: str = Field(
+        title="Name of the collection",
+    )
+    dry_run: bool = Field(
+        title="Whether the orphaned vectors were only reported",
+    )
+    vector_count: int = Field(
+        default=0, title="Vectors of data points in the collection"
+    )
+    data_point_count: int = Field(
+        default=0, title="Data points in the collection"
+    )
+    unassociated_vector_counts: Dict[str, int] = Field(
+        default_factory=dict,
+        title="Vectors of data sources no longer associated with the collection, by data source fqn",
+    )
+    superseded_vector_count: int = Field(
+        default=0,
+        title="Vectors of data points that carry an outdated hash next to vectors with the latest hash",
+    )
+    superseded_data_point_count: int = Field(
+        default=0, title="Data points with superseded vectors"
+    )
+    unresolved_data_point_count: int = Field(
+        default=0,
+        title="Data points with vectors of several hashes whose latest hash is not known. "
+        "They are left to the next ingestion run, which rewrites them",
+    )
+    unresolved_data_point_fqns: List[str] = Field(
+        default_factory=list,
+        title="Fully qualified names of the first unresolved data points",
+    )
+    skipped_data_source_fqns: List[str] = Field(
+        default_factory=list,
+        title="Associated data sources not checked for superseded vectors, as a data ingestion run is in progress",
+    )
+    deleted_vector_count: int = Field(
+        default=0, title="Vectors deleted"
+    )
+    compacted: bool = Field(
+        default=False, title="Whether the collection was compacted after deleting"
+    )
+    duration_seconds: float = Field(default=0, title="Duration of the garbage collection")
 
 
 class IngestDataToCollectionDto(ConfiguredBaseModel):
@@ -77,6 +228,37 @@ class IngestDataToCollectionDto(ConfiguredBaseModel):
         default=100,
     )
 
+    pipeline_config: Optional[IngestionPipelineConfig] = Field(
+        default=None,
+        title="Run the ingestion as a staged pipeline with the given concurrency per stage",
+    )
+
+    chunk_flush_config: Optional[ChunkFlushConfig] = Field(
+        default=None,
+        title="Upsert chunks whenever a chunk count or byte budget is reached to cap ingestion memory",
+    )
+
+    parse_execution_config: ParseExecutionConfig = Field(
+        default_factory=ParseExecutionConfig,
+        title="Parse files inline or in a pool of worker processes",
+    )
+
+    fan_out_config: Optional[FanOutIngestionConfig] = Field(
+        default=None,
+        title="Ingest all associated data sources concurrently under one parent run. "
+        "Only applies when no data source fqn is given",
+    )
+
+    priority: int = Field(
+        default=0,
+        title="Priority of the ingestion job. Jobs with a higher priority are started first",
+    )
+
+    resume_data_ingestion_run_name: Optional[str] = Field(
+        default=None,
+        title="Name of a failed data ingestion run to resume. Data points it already ingested are skipped",
+    )
+
 
 class AssociateDataSourceWithCollection(ConfiguredBaseModel):
     """
@@ -74,6 +74,76 @@ class AssociatedDataSources(ConfiguredBaseModel):
     data_source: Optional[DataSource] = Field(
         None, title="Data source associated with the collection"
     )
+
+
+class VectorQuantizationType(str, Enum):
+    """
+    Vector quantization schemes
+    """
+
+    SCALAR = "scalar"
+    PRODUCT = "product"
+    BINARY = "binary"
+
+
+class VectorQuantizationConfig(ConfiguredBaseModel):
+    """
+    Vector quantization configuration
+    """
+
+    type: VectorQuantizationType = Field(
+        default=VectorQuantizationType.SCALAR,
+        title="Quantization scheme: scalar (int8), product or binary",
+    )
+    always_ram: bool = Field(
+        default=True,
+        title="Keep the quantized vectors in RAM while the original vectors stay on disk",
+    )
+    quantile: Optional[float] = Field(
+        default=None,
+        title="Quantile of the values used to compute the scalar quantization bounds, e.g. 0.99",
+    )
+    compression: Literal["x4", "x8", "x16", "x32", "x64"] = Field(
+        default="x16",
+        title="Compression ratio of product quantization",
+    )
+
+
+class VectorIndexConfig(ConfiguredBaseModel):
+    """
+    Vector index configuration of a collection
+    """
+
+    on_disk: bool = Field(
+        default=True,
+        title="Store the original vectors on disk instead of in RAM",
+    )
+    on_disk_payload: Optional[bool] = Field(
+        default=None,
+        title="Store the payload on disk instead of in RAM. Uses the vector db default if not set",
+    )
+    replication_factor: int = Field(
+        default=3,
+        title="Number of replicas of each shard",
+    )
+    hnsw_m: Optional[int] = Field(
+        default=None,
+        title="Number of edges per node of the HNSW graph. Uses the vector db default if not set",
+    )
+    hnsw_ef_construct: Optional[int] = Field(
+        default=None,
+        title="Number of neighbours considered while building the HNSW graph. Uses the vector db default if not set",
+    )
+    quantization: Optional[VectorQuantizationConfig] = Field(
+        default=None,
+        title="Vector quantization, none if not set",
+    )
+    sparse_vectors: bool = Field(
+        default=False,
+        title="Store a BM25 sparse vector of every chunk next to the dense one, enables hybrid search",
+    )
+
+
 class EmbedderConfig(ConfiguredBaseModel):
     """
     Embedder configuration
@@ -81,6 +151,10 @@ class EmbedderConfig(ConfiguredBaseModel):
 
     name: str
     parameters: Dict[str, Any] = Field(default_factory=dict)
+    vector_index_config: Optional[VectorIndexConfig] = Field(
+        default=None,
+        title="Index settings of the collection vectors, vector db defaults if not set",
+    )
 
     @model_validator(mode="before")
     @classmethod
@@ -193,6 +267,112 @@ class DataIngestionMode(str, Enum):
     FULL = "FULL"
 
 
+class ParseExecutionMode(str, Enum):
+    """
+    Where data points are parsed during ingestion
+    """
+
+    INLINE = "INLINE"
+    PROCESS_POOL = "PROCESS_POOL"
+
+
+class ParseExecutionConfig(ConfiguredBaseModel):
+    """
+    Configuration for executing parsers during ingestion
+    """
+
+    mode: ParseExecutionMode = Field(
+        default=ParseExecutionMode.INLINE,
+        title="INLINE parses on the event loop, PROCESS_POOL sends every file to a pool of worker processes",
+    )
+    workers: int = Field(
+        default=4,
+        title="Number of worker processes used in PROCESS_POOL mode. "
+        "With the staged pipeline, keep parser_concurrency at least this high to keep all workers busy",
+        ge=1,
+    )
+    timeout: Optional[float] = Field(
+        default=None,
+        title="Timeout in seconds for parsing a single file. No timeout if not set",
+        gt=0,
+    )
+
+
+class ChunkFlushConfig(ConfiguredBaseModel):
+    """
+    Configuration to upsert parsed chunks as soon as a budget is reached instead of once per loader batch.
+    Chunks of a data point are always upserted together, so a single data point larger than
+    the budget is flushed on its own.
+    """
+
+    max_chunks: int = Field(
+        default=512,
+        title="Upsert once this many chunks are buffered",
+        ge=1,
+    )
+    max_bytes: int = Field(
+        default=64 * 1024**2,
+        title="Upsert once the buffered chunks, including their metadata, reach this size in bytes",
+        ge=1,
+    )
+
+
+class FanOutIngestionConfig(ConfiguredBaseModel):
+    """
+    Configuration to ingest all data sources of a collection concurrently, under one parent run
+    """
+
+    max_parallel_sources: int = Field(
+        default=4,
+        title="Maximum number of data sources ingested at the same time",
+        ge=1,
+    )
+    max_concurrent_embedding_requests: int = Field(
+        default=4,
+        title="Maximum number of embedding requests in flight, shared by all data sources",
+        ge=1,
+    )
+    shadow_reindex: bool = Field(
+        default=False,
+        title="Rebuild the collection in a new physical collection, bulk loaded with indexing deferred, "
+        "and swap it in once all data sources are ingested. Queries keep hitting the current data until then",
+    )
+
+
+class IngestionPipelineConfig(ConfiguredBaseModel):
+    """
+    Configuration for the staged ingestion pipeline.
+    Loader, parsers, embedders and vector store writers run concurrently and are
+    connected by bounded queues, so a slow stage applies backpressure to the ones before it.
+    """
+
+    parser_concurrency: int = Field(
+        default=4,
+        title="Number of data points parsed concurrently",
+        ge=1,
+    )
+    embedder_concurrency: int = Field(
+        default=2,
+        title="Number of concurrent embedding requests",
+        ge=1,
+    )
+    writer_concurrency: int = Field(
+        default=1,
+        title="Number of concurrent vector store upserts",
+        ge=1,
+    )
+    queue_size: int = Field(
+        default=16,
+        title="Maximum number of items buffered between two stages",
+        ge=1,
+    )
+    embedding_batch_size: int = Field(
+        default=256,
+        title="Number of chunks to embed in one request. Chunks of a data point are never split across batches",
+        ge=1,
+    )
+
+
 class DataPoint(ConfiguredBaseModel):
     """
     Data point describes a single data point in the data source
@@ -246,6 +426,26 @@ class DataPointVector(ConfiguredBaseModel):
     )
 
 
+class VectorRecord(ConfiguredBaseModel):
+    """
+    A stored vector together with its chunk, as moved between vector dbs without embedding it again
+    """
+
+    id: str = Field(
+        title="Identifier of the vector in the vector store it was read from",
+    )
+    page_content: str = Field(
+        title="Text of the chunk",
+    )
+    metadata: Dict[str, Any] = Field(
+        default_factory=dict,
+        title="Metadata of the chunk, including its data point fqn and hash",
+    )
+    vector: List[float] = Field(
+        title="Dense vector of the chunk",
+    )
+
+
 class LoadedDataPoint(DataPoint):
     """
     Loaded data point describes a single data point in the data source after loading it as local file
@@ -323,6 +523,155 @@ class QdrantClientConfig(ConfiguredBaseModel):
     prefix: Optional[str] = None
     prefer_grpc: bool = False
     timeout: int = 300
+    # Serve queries with a shared AsyncQdrantClient instead of running the blocking client in threads
+    async_client: bool = Field(
+        default=False,
+        title="Serve queries through a shared async Qdrant client",
+    )
+    max_connections: int = Field(
+        default=256,
+        title="Maximum number of HTTP connections of the async client",
+    )
+    max_keepalive_connections: int = Field(
+        default=64,
+        title="Maximum number of idle HTTP connections kept alive by the async client",
+    )
+
+
+class WeaviateClientConfig(ConfiguredBaseModel):
+    """
+    Weaviate extra configuration
+    """
+
+    batch_size: int = Field(
+        default=100,
+        title="Number of objects per import batch, the initial size when dynamic batching is enabled",
+        ge=1,
+    )
+    dynamic: bool = Field(
+        default=True,
+        title="Adjust the import batch size to the import rate of the cluster",
+    )
+    num_workers: int = Field(
+        default=2,
+        title="Number of threads sending import batches concurrently",
+        ge=1,
+    )
+    timeout_retries: int = Field(
+        default=3,
+        title="Number of retries of an import batch that timed out",
+        ge=0,
+    )
+
+
+class EmbeddedVectorDBConfig(ConfiguredBaseModel):
+    """
+    Embedded (in process, memory mapped) vector db configuration
+    """
+
+    path: str = Field(
+        default="./embedded_vector_db",
+        title="Directory holding one sub directory per collection",
+    )
+    dtype: Literal["float32", "float16"] = Field(
+        default="float32",
+        title="Storage type of the vectors, float16 halves disk and page cache use",
+    )
+    search_block_size: int = Field(
+        default=8192,
+        title="Number of vectors scored per matrix multiplication during brute force search",
+        ge=1,
+    )
+    ivf_min_points: Optional[int] = Field(
+        default=200_000,
+        title="Train an IVF index once a collection holds this many vectors, brute force search only if not set",
+        ge=1,
+    )
+    ivf_lists: Optional[int] = Field(
+        default=None,
+        title="Number of IVF lists, about the square root of the number of vectors if not set",
+        ge=1,
+    )
+    ivf_nprobe: int = Field(
+        default=16,
+        title="Number of IVF lists scanned per query",
+        ge=1,
+    )
+
+
+class EmbeddingCacheConfig(ConfiguredBaseModel):
+    """
+    Embedding cache configuration
+    """
+
+    path: str = Field(
+        default="./embedding_cache/embeddings.sqlite",
+        title="Path of the SQLite file holding the cached embeddings",
+    )
+    max_entries: int = Field(
+        default=5_000_000,
+        title="Maximum number of cached embeddings before least recently used ones are evicted",
+        ge=1,
+    )
+    max_size_bytes: int = Field(
+        default=20 * 1024**3,
+        title="Maximum total size of cached vectors in bytes before least recently used ones are evicted",
+        ge=1,
+    )
+
+
+class BM25Config(ConfiguredBaseModel):
+    """
+    BM25 sparse vector configuration
+    """
+
+    k1: float = Field(
+        default=1.2,
+        title="Term frequency saturation",
+        ge=0,
+    )
+    b: float = Field(
+        default=0.75,
+        title="Document length normalization, between 0 and 1",
+        ge=0,
+        le=1,
+    )
+
+
+class IngestionSchedulerConfig(ConfiguredBaseModel):
+    """
+    Ingestion job scheduler configuration
+    """
+
+    path: str = Field(
+        default="./ingestion_jobs/jobs.sqlite",
+        title="Path of the SQLite file holding the ingestion job queue",
+    )
+    max_concurrent_jobs: int = Field(
+        default=4,
+        title="Maximum number of ingestion jobs running at the same time across all tenants",
+        ge=1,
+    )
+    max_concurrent_jobs_per_tenant: int = Field(
+        default=1,
+        title="Maximum number of ingestion jobs running at the same time for a single tenant",
+        ge=1,
+    )
+    max_attempts: int = Field(
+        default=3,
+        title="Number of times a job is attempted before it is marked as failed. Retries resume from the run checkpoint",
+        ge=1,
+    )
+    retry_backoff_seconds: float = Field(
+        default=30,
+        title="Delay before the first retry, doubled on every further attempt",
+        ge=0,
+    )
+    max_retry_backoff_seconds: float = Field(
+        default=600,
+        title="Upper bound of the delay between two attempts",
+        ge=0,
+    )
 
 
 class MetadataStoreConfig(ConfiguredBaseModel):
@@ -390,6 +739,43 @@ class DataIngestionRunStatus(str, enum.Enum):
     ERROR = "ERROR"
 
 
+class IngestionJobStatus(str, enum.Enum):
+    """
+    Status of a job in the ingestion job scheduler
+    """
+
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
+
+class IngestionJob(ConfiguredBaseModel):
+    """
+    A data ingestion run queued in the ingestion job scheduler
+    """
+
+    id: str = Field(title="Id of the job")
+    tenant_id: str = Field(title="Tenant that submitted the job")
+    priority: int = Field(
+        default=0, title="Jobs with a higher priority are started first"
+    )
+    status: IngestionJobStatus = Field(title="Status of the job")
+    attempts: int = Field(default=0, title="Number of attempts started so far")
+    max_attempts: int = Field(title="Maximum number of attempts")
+    collection_name: str = Field(title="Name of the collection")
+    data_ingestion_run_name: str = Field(
+        title="Name of the data ingestion run, empty for garbage collection jobs"
+    )
+    error: Optional[str] = Field(default=None, title="Error of the last attempt")
+    created_at: float = Field(title="Submission time, as a unix timestamp")
+    updated_at: float = Field(title="Last status change, as a unix timestamp")
+    next_attempt_at: float = Field(
+        title="Earliest time the job may be started, as a unix timestamp"
+    )
+
+
 class BaseDataIngestionRun(ConfiguredBaseModel):
     """
     Base data ingestion run configuration
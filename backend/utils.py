@@ -1,12 +1,13 @@
 import asyncio
 import zipfile
-from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures import Executor, ProcessPoolExecutor
 from contextvars import copy_context
 from functools import partial
 from typing import Callable, Optional, TypeVar, cast
 
 from typing_extensions import ParamSpec
 
+from backend.constants import FQN_SEPARATOR
 from backend.logger import logger
 
 P = ParamSpec("P")
@@ -33,6 +34,11 @@ def unflatten(dct, sub_dct_key_name, prefix=None):
     return new_dct
 
 
+def get_data_source_fqn(data_point_fqn: str) -> str:
+    """Data point fqns are `<data source type>::<data source uri>::<data point uri>`"""
+    return FQN_SEPARATOR.join(data_point_fqn.split(FQN_SEPARATOR, 2)[:2])
+
+
 def unzip_file(file_path, dest_dir):
     """
     Unzip the data given the input and output path.
@@ -102,15 +108,14 @@ class AsyncProcessPoolExecutor(ProcessPoolExecutor):
         # which might maintain reference to the previously closed event loop
         # and we end up with the following error: RuntimeError: Event loop is closed
         # even though asyncio.run(fn(*args, **kwargs)) would have launched a new event loop every time
-        future = Future()
+        # The result is sent back to the parent process, so it has to be picklable.
+        # Returning the result (or raising) lets callers await the submitted future directly.
         loop = asyncio.get_event_loop()
         try:
-            result = loop.run_until_complete(fn(*args, **kwargs))
-            future.set_result(result)
-        except Exception as e:
+            return loop.run_until_complete(fn(*args, **kwargs))
+        except Exception:
             logger.exception("Error in AsyncProcessPoolExecutor worker")
-            future.set_exception(e)
-        return future
+            raise
 
     def submit(self, fn, *args, **kwargs):
         return super().submit(self._async_to_sync, fn, *args, **kwargs)
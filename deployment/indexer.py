@@ -33,7 +33,7 @@ class Indexer:
                 build_spec=DockerFileBuild(
                     dockerfile_path="./backend/Dockerfile",
                     build_context_path="./",
-                    command='/bin/bash -c "set -e; prisma generate --schema ./backend/database/schema.prisma && python -m backend.indexer.main  --collection_name {{collection_name}} --data_source_fqn {{data_source_fqn}} --data_ingestion_run_name {{data_ingestion_run_name}} --data_ingestion_mode {{data_ingestion_mode}} --raise_error_on_failure  {{raise_error_on_failure}}"',
+                    command='/bin/bash -c "set -e; prisma generate --schema ./backend/database/schema.prisma && python -m backend.indexer.main  --collection_name {{collection_name}} --data_source_fqn {{data_source_fqn}} --data_ingestion_run_name {{data_ingestion_run_name}} --data_ingestion_mode {{data_ingestion_mode}} --raise_error_on_failure  {{raise_error_on_failure}} --batch_size {{batch_size}} --pipeline_config \'{{pipeline_config}}\' --chunk_flush_config \'{{chunk_flush_config}}\' --parse_execution_config \'{{parse_execution_config}}\' --resume_data_ingestion_run_name \'{{resume_data_ingestion_run_name}}\'"',
                 ),
             ),
             trigger=Manual(type="manual"),
@@ -50,6 +50,15 @@ class Indexer:
                 Param(
                     name="raise_error_on_failure", default="False", param_type="string"
                 ),
+                Param(name="batch_size", default="100", param_type="string"),
+                Param(name="pipeline_config", default="", param_type="string"),
+                Param(name="chunk_flush_config", default="", param_type="string"),
+                Param(name="parse_execution_config", default="", param_type="string"),
+                Param(
+                    name="resume_data_ingestion_run_name",
+                    default="",
+                    param_type="string",
+                ),
             ],
             env={
                 "LOG_LEVEL": "DEBUG",